@@ -4,185 +4,91 @@ Sistema de análisis y recomendaciones para agricultores
 Combina datos climáticos con requisitos de cultivos
 """
 
-from base_datos_cultivos import cultivos_panama, cultivos_por_temporada
-from conexion_clima import ClimaAPI
-from datetime import datetime
-import pandas as pd
+from base_datos_cultivos import cultivos_panama
+import numpy as np
+from motor_analisis import AnalizadorBase
+from config import ConfiguracionSistema
+from evapotranspiracion import necesidades_riego, tabla_riego
 
 
-class AnalizadorAgricola:
+class AnalizadorAgricola(AnalizadorBase):
     """
     Analiza condiciones climáticas y genera recomendaciones para agricultores
+    Adaptador con emojis y análisis de riesgos sobre el motor de análisis
     """
     
-    def __init__(self):
-        self.clima_api = ClimaAPI()
-        self.mes_actual = datetime.now().strftime('%B').lower()
-        
-        # Traducir mes al español
-        meses_es = {
-            'january': 'enero', 'february': 'febrero', 'march': 'marzo',
-            'april': 'abril', 'may': 'mayo', 'june': 'junio',
-            'july': 'julio', 'august': 'agosto', 'september': 'septiembre',
-            'october': 'octubre', 'november': 'noviembre', 'december': 'diciembre'
-        }
-        self.mes_actual = meses_es.get(self.mes_actual, self.mes_actual)
+    ESTILO = 'emojis'
+    DECIMALES_PUNTAJE = 1
+    COLORES_NIVEL = {'EXCELENTE': '🟢', 'BUENO': '🟡', 'REGULAR': '🟠', 'MALO': '🔴'}
     
-    
-    def evaluar_condiciones_cultivo(self, cultivo, clima_actual):
-        """
-        Evalúa si las condiciones actuales son adecuadas para un cultivo
-        
-        Returns:
-            dict: Evaluación con puntaje y alertas
-        """
-        datos_cultivo = cultivos_panama[cultivo]
-        
-        # Extraer valores climáticos
-        temp_actual = clima_actual['temperatura']
-        humedad_actual = clima_actual['humedad']
-        
-        # Inicializar evaluación
-        evaluacion = {
-            'cultivo': datos_cultivo['nombre'],
-            'puntaje': 100,
-            'nivel': 'EXCELENTE',
-            'alertas': [],
-            'recomendaciones': []
-        }
-        
-        # Evaluar temperatura
-        if temp_actual < datos_cultivo['temp_minima']:
-            deficit = datos_cultivo['temp_minima'] - temp_actual
-            evaluacion['puntaje'] -= deficit * 5
-            evaluacion['alertas'].append(f"🌡️ Temperatura BAJA ({temp_actual}°C). Mínimo requerido: {datos_cultivo['temp_minima']}°C")
-            evaluacion['recomendaciones'].append("Considerar protección térmica o esperar temperaturas más cálidas")
-        
-        elif temp_actual > datos_cultivo['temp_maxima']:
-            exceso = temp_actual - datos_cultivo['temp_maxima']
-            evaluacion['puntaje'] -= exceso * 3
-            evaluacion['alertas'].append(f"🌡️ Temperatura ALTA ({temp_actual}°C). Máximo tolerable: {datos_cultivo['temp_maxima']}°C")
-            evaluacion['recomendaciones'].append("Implementar sistemas de sombra o riego adicional")
-        
-        else:
-            evaluacion['recomendaciones'].append(f"✓ Temperatura ideal ({temp_actual}°C)")
-        
-        # Evaluar humedad
-        dif_humedad = abs(humedad_actual - datos_cultivo['humedad_optima'])
-        if dif_humedad > 20:
-            evaluacion['puntaje'] -= dif_humedad * 0.5
-            if humedad_actual < datos_cultivo['humedad_optima']:
-                evaluacion['alertas'].append(f"💧 Humedad BAJA ({humedad_actual}%). Óptimo: {datos_cultivo['humedad_optima']}%")
-                evaluacion['recomendaciones'].append("Aumentar frecuencia de riego")
-            else:
-                evaluacion['alertas'].append(f"💧 Humedad ALTA ({humedad_actual}%). Óptimo: {datos_cultivo['humedad_optima']}%")
-                evaluacion['recomendaciones'].append("Mejorar drenaje, riesgo de hongos")
-        
-        # Evaluar temporada de siembra
-        if self.mes_actual in [m.lower() for m in datos_cultivo['temporada_siembra']] or 'todo el año' in datos_cultivo['temporada_siembra']:
-            evaluacion['recomendaciones'].append(f"✓ Mes ideal para siembra ({self.mes_actual.capitalize()})")
-        else:
-            evaluacion['puntaje'] -= 15
-            meses = ', '.join(datos_cultivo['temporada_siembra'])
-            evaluacion['alertas'].append(f"📅 Fuera de temporada. Mejor sembrar en: {meses}")
-        
-        # Determinar nivel según puntaje
-        if evaluacion['puntaje'] >= 80:
-            evaluacion['nivel'] = 'EXCELENTE'
-            evaluacion['color'] = '🟢'
-        elif evaluacion['puntaje'] >= 60:
-            evaluacion['nivel'] = 'BUENO'
-            evaluacion['color'] = '🟡'
-        elif evaluacion['puntaje'] >= 40:
-            evaluacion['nivel'] = 'REGULAR'
-            evaluacion['color'] = '🟠'
-        else:
-            evaluacion['nivel'] = 'MALO'
-            evaluacion['color'] = '🔴'
-        
-        evaluacion['puntaje'] = max(0, round(evaluacion['puntaje'], 1))
-        
-        return evaluacion
+    MENSAJES = {
+        'temperatura_baja': ("🌡️ Temperatura BAJA ({valor}°C). Mínimo requerido: {limite}°C",
+                             "Considerar protección térmica o esperar temperaturas más cálidas"),
+        'temperatura_alta': ("🌡️ Temperatura ALTA ({valor}°C). Máximo tolerable: {limite}°C",
+                             "Implementar sistemas de sombra o riego adicional"),
+        'temperatura_ok': (None, "✓ Temperatura ideal ({valor}°C)"),
+        'humedad_baja': ("💧 Humedad BAJA ({valor}%). Óptimo: {limite}%",
+                         "Aumentar frecuencia de riego"),
+        'humedad_alta': ("💧 Humedad ALTA ({valor}%). Óptimo: {limite}%",
+                         "Mejorar drenaje, riesgo de hongos"),
+        'temporada': ("📅 Fuera de temporada. Mejor sembrar en: {meses}", None),
+        'temporada_ok': (None, "✓ Mes ideal para siembra ({mes})"),
+    }
     
     
     def analizar_riesgos_pronostico(self, pronostico_df, cultivo):
         """
         Analiza el pronóstico y detecta riesgos climáticos
         """
-        datos_cultivo = cultivos_panama[cultivo]
-        riesgos = []
-        
-        # Analizar lluvia excesiva
-        lluvia_total = pronostico_df['lluvia_3h'].sum()
-        if lluvia_total > 50:
-            if datos_cultivo['tolerancia_lluvia'] == 'baja':
-                riesgos.append({
-                    'nivel': 'ALTO',
-                    'tipo': 'Lluvia excesiva',
-                    'descripcion': f'Se esperan {lluvia_total:.1f}mm de lluvia. {datos_cultivo["nombre"]} tiene baja tolerancia.',
-                    'accion': 'Mejorar drenaje, posponer siembra o considerar otro cultivo'
-                })
-            elif datos_cultivo['tolerancia_lluvia'] == 'media':
-                riesgos.append({
-                    'nivel': 'MEDIO',
-                    'tipo': 'Lluvia considerable',
-                    'descripcion': f'Se esperan {lluvia_total:.1f}mm de lluvia.',
-                    'accion': 'Monitorear drenaje y preparar medidas preventivas'
-                })
-        
-        # Analizar sequía
-        dias_sin_lluvia = (pronostico_df['lluvia_3h'] == 0).sum() / 8  # Aproximado
-        if dias_sin_lluvia > 3:
-            if datos_cultivo['tolerancia_sequia'] == 'baja':
-                riesgos.append({
-                    'nivel': 'ALTO',
-                    'tipo': 'Sequía prolongada',
-                    'descripcion': f'Aproximadamente {int(dias_sin_lluvia)} días sin lluvia esperados.',
-                    'accion': 'Implementar sistema de riego constante'
-                })
-        
-        # Analizar temperaturas extremas
-        temp_max = pronostico_df['temp_maxima'].max()
-        temp_min = pronostico_df['temp_minima'].min()
-        
-        if temp_max > datos_cultivo['temp_maxima']:
-            riesgos.append({
-                'nivel': 'MEDIO',
-                'tipo': 'Calor extremo',
-                'descripcion': f'Temperaturas hasta {temp_max}°C (máx tolerable: {datos_cultivo["temp_maxima"]}°C)',
-                'accion': 'Aumentar riego, considerar mallas de sombra'
-            })
-        
-        if temp_min < datos_cultivo['temp_minima']:
-            riesgos.append({
-                'nivel': 'MEDIO',
-                'tipo': 'Temperatura baja',
-                'descripcion': f'Temperaturas hasta {temp_min}°C (mín requerida: {datos_cultivo["temp_minima"]}°C)',
-                'accion': 'Considerar protección o retrasar siembra'
-            })
-        
-        return riesgos
+        return self.analizar_riesgos_cultivos(pronostico_df, [cultivo])[cultivo]
     
     
-    def recomendar_cultivos(self, ciudad):
+    def analizar_riesgos_cultivos(self, pronostico_df, cultivos=None):
         """
-        Recomienda los mejores cultivos para sembrar ahora
+        Analiza los riesgos del pronóstico para varios cultivos a la vez
+        
+        Args:
+            pronostico_df (DataFrame): Pronóstico de obtener_pronostico_5dias
+            cultivos (list): Claves de cultivos (por defecto todo el catálogo)
+            
+        Returns:
+            dict: Lista de riesgos por clave de cultivo
         """
-        clima_actual = self.clima_api.obtener_clima_actual(ciudad)
+        return self.analizar_riesgos_ciudades({None: pronostico_df}, cultivos)[None]
+    
+    
+    def analizar_riesgos_ciudades(self, pronosticos, cultivos=None):
+        """
+        Riesgos del pronóstico para todas las ciudades y cultivos
         
-        if not clima_actual:
-            return None
+        El cálculo vectorizado lo hace MotorAnalisis.riesgos_ciudades; aquí
+        solo se construyen los textos de las combinaciones con riesgo.
         
-        # Evaluar todos los cultivos
-        evaluaciones = []
+        Args:
+            pronosticos (dict): DataFrame de pronóstico por ciudad
+            cultivos (list): Claves de cultivos (por defecto todo el catálogo)
+            
+        Returns:
+            dict: Por ciudad, un dict con la lista de riesgos de cada cultivo
+        """
+        riesgos = self.motor.riesgos_ciudades(pronosticos, cultivos)
+        ciudades = riesgos['ciudades']
+        cultivos = riesgos['cultivos']
+        indicadores = riesgos['indicadores']
         
-        for cultivo in cultivos_panama.keys():
-            eval_cultivo = self.evaluar_condiciones_cultivo(cultivo, clima_actual)
-            evaluaciones.append(eval_cultivo)
+        resultado = {ciudad: {cultivo: [] for cultivo in cultivos} for ciudad in ciudades}
         
-        # Ordenar por puntaje
-        evaluaciones.sort(key=lambda x: x['puntaje'], reverse=True)
+        for tipo, mascara in riesgos['activas'].items():
+            for i, j in zip(*np.nonzero(mascara)):
+                datos_cultivo = cultivos_panama[cultivos[j]]
+                riesgo = self._describir_riesgo(tipo, datos_cultivo, indicadores, i, j)
+                resultado[ciudades[i]][cultivos[j]].append(riesgo)
         
+        return resultado
+    
+    
+    def construir_recomendaciones(self, clima_actual, evaluaciones):
+        """Formato de recomendar_cultivos con ciudad y fecha de la observación"""
         return {
             'ciudad': clima_actual['ciudad'],
             'fecha': clima_actual['fecha_hora'],
@@ -191,6 +97,55 @@ class AnalizadorAgricola:
         }
     
     
+    def _describir_riesgo(self, tipo, datos_cultivo, indicadores, i, j):
+        """
+        Construye el diccionario de un riesgo detectado
+        
+        Args:
+            tipo (str): Nombre de la regla de riesgo activa
+            datos_cultivo (dict): Datos del cultivo en el catálogo
+            indicadores (dict): Indicadores de MotorAnalisis.riesgos_ciudades
+            i (int): Posición de la ciudad
+            j (int): Posición del cultivo
+        """
+        lluvia_total = indicadores['lluvia_total'][i]
+        temp_max = indicadores['temp_max'][i]
+        temp_min = indicadores['temp_min'][i]
+        
+        if tipo == 'inundacion':
+            dias = int(indicadores['dias_inundacion'][i, j])
+            return {
+                'nivel': 'ALTO' if dias >= ConfiguracionSistema.DIAS_RIESGO_ALTO else 'MEDIO',
+                'tipo': 'Lluvia excesiva',
+                'descripcion': (f'Se esperan {lluvia_total:.1f}mm de lluvia. Suelo encharcado {dias} día(s) '
+                                f'por encima de la tolerancia de {datos_cultivo["nombre"]} '
+                                f'({datos_cultivo["tolerancia_lluvia"]}).'),
+                'accion': 'Mejorar drenaje, posponer siembra o considerar otro cultivo'
+            }
+        if tipo == 'sequia':
+            dias = int(indicadores['dias_sequia'][i, j])
+            return {
+                'nivel': 'ALTO' if dias >= ConfiguracionSistema.DIAS_RIESGO_ALTO else 'MEDIO',
+                'tipo': 'Sequía prolongada',
+                'descripcion': (f'Humedad del suelo bajo el umbral de estrés durante {dias} día(s), '
+                                f'desde el día {int(indicadores["primer_dia_sequia"][i, j]) + 1} del pronóstico.'),
+                'accion': 'Implementar sistema de riego constante'
+            }
+        if tipo == 'calor':
+            return {
+                'nivel': 'MEDIO',
+                'tipo': 'Calor extremo',
+                'descripcion': f'Temperaturas hasta {temp_max}°C (máx tolerable: {datos_cultivo["temp_maxima"]}°C)',
+                'accion': 'Aumentar riego, considerar mallas de sombra'
+            }
+        return {
+            'nivel': 'MEDIO',
+            'tipo': 'Temperatura baja',
+            'descripcion': f'Temperaturas hasta {temp_min}°C (mín requerida: {datos_cultivo["temp_minima"]}°C)',
+            'accion': 'Considerar protección o retrasar siembra'
+        }
+    
+    
     def generar_reporte_completo(self, ciudad, cultivo):
         """
         Genera un reporte completo para un cultivo específico
@@ -203,11 +158,14 @@ class AnalizadorAgricola:
             return None
         
         # Evaluar condiciones actuales
-        evaluacion = self.evaluar_condiciones_cultivo(cultivo, clima_actual)
+        evaluacion = self.evaluar_cultivo_con_cache(cultivo, clima_actual)
         
         # Analizar riesgos
         riesgos = self.analizar_riesgos_pronostico(pronostico, cultivo)
         
+        # Riego diario del cultivo (ET0 x Kc menos lluvia efectiva)
+        riego = tabla_riego(necesidades_riego({ciudad: pronostico}, [cultivo]))
+        
         # Preparar reporte
         reporte = {
             'cultivo': cultivos_panama[cultivo]['nombre'],
@@ -216,6 +174,7 @@ class AnalizadorAgricola:
             'clima_actual': clima_actual,
             'evaluacion': evaluacion,
             'riesgos': riesgos,
+            'riego': riego[['fecha', 'et0', 'etc', 'lluvia_efectiva', 'riego_mm']],
             'pronostico_resumen': self.clima_api.obtener_resumen_diario(ciudad)
         }
         
@@ -270,6 +229,13 @@ def imprimir_reporte(reporte):
             print(f"      → {riesgo['accion']}")
         print()
     
+    # Riego
+    if 'riego' in reporte and not reporte['riego'].empty:
+        print("🚿 NECESIDAD DE RIEGO (mm/día):")
+        print(reporte['riego'].to_string(index=False))
+        print(f"  Total: {reporte['riego']['riego_mm'].sum():.1f} mm")
+        print()
+    
     # Pronóstico
     print("📅 PRONÓSTICO 5 DÍAS:")
     print(reporte['pronostico_resumen'])
@@ -292,14 +258,14 @@ if __name__ == "__main__":
     print("="*70)
     print("MEJORES CULTIVOS PARA SEMBRAR AHORA")
     print("="*70)
-    recomendaciones = analizador.recomendar_cultivos("Panama City")
+    recomendaciones = analizador.recomendar_cultivos_top("Panama City", k=5)
     
     if recomendaciones:
         print(f"Ubicación: {recomendaciones['ciudad']}")
         print(f"Fecha: {recomendaciones['fecha']}\n")
         
         print("TOP 5 CULTIVOS RECOMENDADOS:\n")
-        for i, eval in enumerate(recomendaciones['evaluaciones'][:5], 1):
+        for i, eval in enumerate(recomendaciones['evaluaciones'], 1):
             print(f"{i}. {eval['color']} {eval['cultivo']} - {eval['nivel']} ({eval['puntaje']}/100)")
             if eval['alertas']:
                 print(f"   Alertas: {len(eval['alertas'])}")
\ No newline at end of file
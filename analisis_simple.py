@@ -5,129 +5,36 @@ Version sin emojis y mas directa
 """
 
 from base_datos_cultivos import cultivos_panama, cultivos_por_temporada
-from conexion_clima import ClimaAPI
 from datetime import datetime
+from motor_analisis import AnalizadorBase
 
 
-class AnalizadorAgricola:
+class AnalizadorAgricola(AnalizadorBase):
     """
     Analiza condiciones climaticas y genera recomendaciones para agricultores
-    Version simplificada
+    Version simplificada: adaptador sin emojis sobre el motor de analisis
     """
     
-    def __init__(self):
-        self.clima_api = ClimaAPI()
-        self.mes_actual = datetime.now().strftime('%B').lower()
-        
-        # Traducir mes al español
-        meses_es = {
-            'january': 'enero', 'february': 'febrero', 'march': 'marzo',
-            'april': 'abril', 'may': 'mayo', 'june': 'junio',
-            'july': 'julio', 'august': 'agosto', 'september': 'septiembre',
-            'october': 'octubre', 'november': 'noviembre', 'december': 'diciembre'
-        }
-        self.mes_actual = meses_es.get(self.mes_actual, self.mes_actual)
+    ESTILO = 'simple'
     
-    def evaluar_condiciones_cultivo(self, cultivo, clima_actual):
-        """
-        Evalua si las condiciones actuales son adecuadas para un cultivo
-        
-        Returns:
-            dict: Evaluacion con puntaje y alertas
-        """
-        datos_cultivo = cultivos_panama[cultivo]
-        
-        # Extraer valores climaticos
-        temp_actual = clima_actual['temperatura']
-        humedad_actual = clima_actual['humedad']
-        
-        # Inicializar evaluacion
-        evaluacion = {
-            'cultivo': datos_cultivo['nombre'],
-            'puntaje': 100,
-            'nivel': 'EXCELENTE',
-            'alertas': [],
-            'recomendaciones': []
-        }
-        
-        # Evaluar temperatura
-        if temp_actual < datos_cultivo['temp_minima']:
-            deficit = datos_cultivo['temp_minima'] - temp_actual
-            evaluacion['puntaje'] -= deficit * 5
-            evaluacion['alertas'].append(f"Temperatura BAJA ({temp_actual}C). Minimo requerido: {datos_cultivo['temp_minima']}C")
-            evaluacion['recomendaciones'].append("Considerar proteccion termica o esperar temperaturas mas calidas")
-        
-        elif temp_actual > datos_cultivo['temp_maxima']:
-            exceso = temp_actual - datos_cultivo['temp_maxima']
-            evaluacion['puntaje'] -= exceso * 3
-            evaluacion['alertas'].append(f"Temperatura ALTA ({temp_actual}C). Maximo tolerable: {datos_cultivo['temp_maxima']}C")
-            evaluacion['recomendaciones'].append("Implementar sistemas de sombra o riego adicional")
-        
-        else:
-            evaluacion['recomendaciones'].append(f"Temperatura ideal ({temp_actual}C)")
-        
-        # Evaluar humedad
-        dif_humedad = abs(humedad_actual - datos_cultivo['humedad_optima'])
-        if dif_humedad > 20:
-            evaluacion['puntaje'] -= dif_humedad * 0.5
-            if humedad_actual < datos_cultivo['humedad_optima']:
-                evaluacion['alertas'].append(f"Humedad BAJA ({humedad_actual}%). Optimo: {datos_cultivo['humedad_optima']}%")
-                evaluacion['recomendaciones'].append("Aumentar frecuencia de riego")
-            else:
-                evaluacion['alertas'].append(f"Humedad ALTA ({humedad_actual}%). Optimo: {datos_cultivo['humedad_optima']}%")
-                evaluacion['recomendaciones'].append("Mejorar drenaje, riesgo de hongos")
-        
-        # Evaluar temporada de siembra
-        if self.mes_actual in [m.lower() for m in datos_cultivo['temporada_siembra']] or 'todo el año' in datos_cultivo['temporada_siembra']:
-            evaluacion['recomendaciones'].append(f"Mes ideal para siembra ({self.mes_actual.capitalize()})")
-        else:
-            evaluacion['puntaje'] -= 15
-            meses = ', '.join(datos_cultivo['temporada_siembra'])
-            evaluacion['alertas'].append(f"Fuera de temporada. Mejor sembrar en: {meses}")
-        
-        # Determinar nivel segun puntaje
-        if evaluacion['puntaje'] >= 80:
-            evaluacion['nivel'] = 'EXCELENTE'
-        elif evaluacion['puntaje'] >= 60:
-            evaluacion['nivel'] = 'BUENO'
-        elif evaluacion['puntaje'] >= 40:
-            evaluacion['nivel'] = 'REGULAR'
-        else:
-            evaluacion['nivel'] = 'MALO'
-        
-        # Asegurar que el puntaje no sea negativo
-        evaluacion['puntaje'] = max(0, evaluacion['puntaje'])
-        
-        return evaluacion
+    MENSAJES = {
+        'temperatura_baja': ("Temperatura BAJA ({valor}C). Minimo requerido: {limite}C",
+                             "Considerar proteccion termica o esperar temperaturas mas calidas"),
+        'temperatura_alta': ("Temperatura ALTA ({valor}C). Maximo tolerable: {limite}C",
+                             "Implementar sistemas de sombra o riego adicional"),
+        'temperatura_ok': (None, "Temperatura ideal ({valor}C)"),
+        'humedad_baja': ("Humedad BAJA ({valor}%). Optimo: {limite}%",
+                         "Aumentar frecuencia de riego"),
+        'humedad_alta': ("Humedad ALTA ({valor}%). Optimo: {limite}%",
+                         "Mejorar drenaje, riesgo de hongos"),
+        'temporada': ("Fuera de temporada. Mejor sembrar en: {meses}", None),
+        'temporada_ok': (None, "Mes ideal para siembra ({mes})"),
+    }
     
-    def recomendar_cultivos(self, ciudad):
-        """
-        Genera recomendaciones de cultivos basadas en el clima actual
-        
-        Args:
-            ciudad (str): Nombre de la ciudad
-            
-        Returns:
-            dict: Recomendaciones ordenadas por puntaje
-        """
-        # Obtener clima actual
-        clima = self.clima_api.obtener_clima_actual(ciudad)
-        
-        if not clima:
-            return None
-        
-        # Evaluar todos los cultivos
-        evaluaciones = []
-        
-        for cultivo_key in cultivos_panama.keys():
-            evaluacion = self.evaluar_condiciones_cultivo(cultivo_key, clima)
-            evaluaciones.append(evaluacion)
-        
-        # Ordenar por puntaje (mejor primero)
-        evaluaciones.sort(key=lambda x: x['puntaje'], reverse=True)
-        
+    def construir_recomendaciones(self, clima_actual, evaluaciones):
+        """Formato de recomendar_cultivos en la version simplificada"""
         return {
-            'clima_actual': clima,
+            'clima_actual': clima_actual,
             'evaluaciones': evaluaciones,
             'fecha_analisis': datetime.now().strftime('%d/%m/%Y %H:%M')
         }
@@ -153,7 +60,7 @@ class AnalizadorAgricola:
             return None
         
         # Evaluar cultivo
-        evaluacion = self.evaluar_condiciones_cultivo(cultivo, clima)
+        evaluacion = self.evaluar_cultivo_con_cache(cultivo, clima)
         
         # Obtener datos del cultivo
         datos_cultivo = cultivos_panama[cultivo]
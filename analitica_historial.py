@@ -0,0 +1,325 @@
+# analitica_historial.py
+"""
+Analitica sobre el historial de consultas
+Cada consulta guarda la temperatura y la humedad de su ciudad, asi que el
+historial es una serie de tiempo del clima por ciudad. Este modulo mantiene
+agregados por hora y por dia y la distribucion de niveles de recomendacion,
+guardados en un JSON que se actualiza solo con las consultas nuevas.
+"""
+
+import argparse
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from config import ConfiguracionSistema
+from historial import EstadoJSON, crear_historial
+
+
+NIVELES = ['EXCELENTE', 'BUENO', 'REGULAR', 'MALO']
+
+
+def _numero(valor):
+    """Valor numerico de una celda del historial (None si no hay)"""
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+class AnaliticaHistorial:
+    """
+    Agregados por ciudad del clima registrado en el historial
+    
+    Los agregados se guardan en un EstadoJSON. 'marca' es la posicion en el
+    historial de la ultima consulta agregada (consultas_nuevas): cada
+    actualizacion lee solo las consultas escritas despues, aunque su
+    fecha_hora sea anterior a la de consultas ya agregadas. La marca incluye
+    la generacion del historial; si el historial se vacio, los agregados se
+    descartan.
+    """
+    
+    def __init__(self, historial=None, archivo_json=None):
+        """
+        Args:
+            historial (HistorialConsultas): Historial a analizar (por defecto crear_historial())
+            archivo_json (str): Cache de agregados (por defecto ARCHIVO_ANALITICA_HISTORIAL)
+        """
+        self.historial = historial or crear_historial()
+        self.estado = EstadoJSON(archivo_json or ConfiguracionSistema.ARCHIVO_ANALITICA_HISTORIAL,
+                                 lambda: {'marca': None, 'procesadas': 0, 'horas': {}, 'dias': {}})
+    
+    @property
+    def datos(self):
+        """Agregados cargados"""
+        return self.estado.datos
+    
+    def agregar(self, consulta):
+        """
+        Suma una consulta a las cubetas de su hora y su dia
+        
+        Solo cuentan como observacion del clima las consultas con
+        temperatura y humedad (no ambas en 0, el valor por defecto).
+        """
+        ciudad = consulta.get('ciudad') or 'Sin ciudad'
+        fecha = consulta['fecha_hora']
+        temperatura = _numero(consulta.get('temperatura'))
+        humedad = _numero(consulta.get('humedad'))
+        observacion = temperatura is not None and humedad is not None and (temperatura, humedad) != (0, 0)
+        
+        for serie, periodo in (('horas', fecha[:13]), ('dias', fecha[:10])):
+            cubeta = self.datos[serie].setdefault(ciudad, {}).setdefault(periodo, {
+                'consultas': 0, 'observaciones': 0, 'suma_temperatura': 0.0, 'suma_humedad': 0.0,
+                'temp_minima': None, 'temp_maxima': None, 'niveles': {}
+            })
+            cubeta['consultas'] += 1
+            
+            if observacion:
+                cubeta['observaciones'] += 1
+                cubeta['suma_temperatura'] += temperatura
+                cubeta['suma_humedad'] += humedad
+                if cubeta['temp_minima'] is None or temperatura < cubeta['temp_minima']:
+                    cubeta['temp_minima'] = temperatura
+                if cubeta['temp_maxima'] is None or temperatura > cubeta['temp_maxima']:
+                    cubeta['temp_maxima'] = temperatura
+            
+            nivel = consulta.get('nivel')
+            if nivel:
+                cubeta['niveles'][nivel] = cubeta['niveles'].get(nivel, 0) + 1
+        
+        self.datos['procesadas'] += 1
+    
+    def actualizar(self):
+        """
+        Agrega las consultas nuevas del historial y guarda la cache
+        
+        Si otro proceso guardo agregados, se parte de los suyos. Si la
+        generacion del historial ya no es la de la marca (se limpio), se
+        empieza de cero. Al final se descartan las horas y dias fuera
+        de ANALITICA_HORAS_RETENIDAS y ANALITICA_DIAS_RETENIDOS.
+        
+        Returns:
+            int: Consultas nuevas agregadas
+        """
+        if self.estado.guardado_por_otro():
+            self.estado.cargar()
+        marca = self.datos['marca']
+        reiniciado = marca is not None and marca.get('generacion') != self.historial.generacion()
+        if reiniciado:
+            self.estado.reiniciar()
+        
+        nuevas = 0
+        for marca, consulta in self.historial.consultas_nuevas(self.datos['marca']):
+            self.agregar(consulta)
+            self.datos['marca'] = marca
+            nuevas += 1
+        
+        if nuevas or reiniciado:
+            self._descartar_antiguos()
+            self.estado.guardar()
+        return nuevas
+    
+    def _descartar_antiguos(self):
+        """Quita las cubetas fuera de la ventana retenida"""
+        config = ConfiguracionSistema
+        ahora = datetime.now()
+        limites = {
+            'horas': (ahora - timedelta(hours=config.ANALITICA_HORAS_RETENIDAS)).strftime('%Y-%m-%d %H'),
+            'dias': (ahora - timedelta(days=config.ANALITICA_DIAS_RETENIDOS)).strftime('%Y-%m-%d')
+        }
+        
+        for serie, limite in limites.items():
+            for ciudad in list(self.datos[serie]):
+                cubetas = self.datos[serie][ciudad]
+                for periodo in [p for p in cubetas if p < limite]:
+                    del cubetas[periodo]
+                if not cubetas:
+                    del self.datos[serie][ciudad]
+    
+    def _cubetas(self, serie, ciudad):
+        """Cubetas de una ciudad (sin distinguir mayusculas)"""
+        for nombre, cubetas in self.datos[serie].items():
+            if nombre.lower() == ciudad.lower():
+                return cubetas
+        return {}
+    
+    def ciudades(self):
+        """Ciudades con agregados diarios"""
+        return sorted(self.datos['dias'])
+    
+    def serie_ciudad(self, ciudad, frecuencia='dia'):
+        """
+        Serie de tiempo del clima registrado para una ciudad
+        
+        Args:
+            ciudad (str): Ciudad consultada
+            frecuencia (str): 'hora' o 'dia'
+        
+        Returns:
+            DataFrame: periodo, consultas, temperatura_promedio, humedad_promedio,
+                       temp_minima y temp_maxima (promedios vacios sin observaciones)
+        """
+        if frecuencia not in ('hora', 'dia'):
+            raise ValueError(f"Frecuencia desconocida: {frecuencia}")
+        
+        cubetas = self._cubetas('horas' if frecuencia == 'hora' else 'dias', ciudad)
+        filas = []
+        for periodo, cubeta in sorted(cubetas.items()):
+            observaciones = cubeta['observaciones']
+            filas.append({
+                'periodo': periodo + (':00' if frecuencia == 'hora' else ''),
+                'consultas': cubeta['consultas'],
+                'temperatura_promedio': round(cubeta['suma_temperatura'] / observaciones, 1) if observaciones else None,
+                'humedad_promedio': round(cubeta['suma_humedad'] / observaciones, 1) if observaciones else None,
+                'temp_minima': cubeta['temp_minima'],
+                'temp_maxima': cubeta['temp_maxima']
+            })
+        
+        return pd.DataFrame(filas, columns=['periodo', 'consultas', 'temperatura_promedio',
+                                            'humedad_promedio', 'temp_minima', 'temp_maxima'])
+    
+    def distribucion_niveles(self, ciudad=None, dias=None):
+        """
+        Evaluaciones por nivel de recomendacion en los ultimos dias
+        
+        Args:
+            ciudad (str): Ciudad (por defecto todas)
+            dias (int): Dias hacia atras (por defecto ANALITICA_DIAS_TENDENCIA)
+        
+        Returns:
+            dict: Nivel -> numero de evaluaciones (en el orden de NIVELES)
+        """
+        dias = dias or ConfiguracionSistema.ANALITICA_DIAS_TENDENCIA
+        desde = (datetime.now() - timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+        ciudades = [ciudad] if ciudad else self.ciudades()
+        
+        conteo = {nivel: 0 for nivel in NIVELES}
+        for nombre in ciudades:
+            for periodo, cubeta in self._cubetas('dias', nombre).items():
+                if periodo >= desde:
+                    for nivel, cantidad in cubeta['niveles'].items():
+                        conteo[nivel] = conteo.get(nivel, 0) + cantidad
+        return conteo
+    
+    def tendencias(self, dias=None):
+        """
+        Clima y evaluaciones de los ultimos dias frente a los anteriores
+        
+        Args:
+            dias (int): Dias de cada ventana (por defecto ANALITICA_DIAS_TENDENCIA)
+        
+        Returns:
+            DataFrame: Por ciudad, consultas, temperatura y humedad promedio de
+                       la ventana reciente, su cambio frente a la anterior y el
+                       porcentaje de evaluaciones EXCELENTE o BUENO
+        """
+        dias = dias or ConfiguracionSistema.ANALITICA_DIAS_TENDENCIA
+        hoy = datetime.now()
+        inicio_reciente = (hoy - timedelta(days=dias - 1)).strftime('%Y-%m-%d')
+        inicio_anterior = (hoy - timedelta(days=2 * dias - 1)).strftime('%Y-%m-%d')
+        
+        filas = []
+        for ciudad in self.ciudades():
+            ventanas = {'reciente': [0, 0, 0.0, 0.0, 0, 0], 'anterior': [0, 0, 0.0, 0.0, 0, 0]}
+            for periodo, cubeta in self.datos['dias'][ciudad].items():
+                if periodo < inicio_anterior:
+                    continue
+                suma = ventanas['reciente' if periodo >= inicio_reciente else 'anterior']
+                suma[0] += cubeta['consultas']
+                suma[1] += cubeta['observaciones']
+                suma[2] += cubeta['suma_temperatura']
+                suma[3] += cubeta['suma_humedad']
+                suma[4] += cubeta['niveles'].get('EXCELENTE', 0) + cubeta['niveles'].get('BUENO', 0)
+                suma[5] += sum(cubeta['niveles'].values())
+            
+            consultas, observaciones, temperatura, humedad, favorables, evaluaciones = ventanas['reciente']
+            if not consultas:
+                continue
+            
+            fila = {
+                'ciudad': ciudad,
+                'consultas': consultas,
+                'temperatura_promedio': round(temperatura / observaciones, 1) if observaciones else None,
+                'humedad_promedio': round(humedad / observaciones, 1) if observaciones else None,
+                'cambio_temperatura': None,
+                'cambio_humedad': None,
+                'pct_favorables': round(100 * favorables / evaluaciones) if evaluaciones else None
+            }
+            anterior = ventanas['anterior']
+            if observaciones and anterior[1]:
+                fila['cambio_temperatura'] = round(fila['temperatura_promedio'] - anterior[2] / anterior[1], 1)
+                fila['cambio_humedad'] = round(fila['humedad_promedio'] - anterior[3] / anterior[1], 1)
+            filas.append(fila)
+        
+        tabla = pd.DataFrame(filas, columns=['ciudad', 'consultas', 'temperatura_promedio', 'humedad_promedio',
+                                             'cambio_temperatura', 'cambio_humedad', 'pct_favorables'])
+        return tabla.sort_values('consultas', ascending=False).reset_index(drop=True)
+    
+    def mostrar_tendencias(self, ciudad=None, dias=None):
+        """
+        Muestra en consola las tendencias por ciudad, la distribucion de
+        niveles y, si se indica una ciudad, su clima de las ultimas horas
+        
+        Args:
+            ciudad (str): Ciudad para la serie por hora (opcional)
+            dias (int): Dias de cada ventana (por defecto ANALITICA_DIAS_TENDENCIA)
+        """
+        dias = dias or ConfiguracionSistema.ANALITICA_DIAS_TENDENCIA
+        self.actualizar()
+        tendencias = self.tendencias(dias)
+        
+        print(f"\nTENDENCIAS DEL CLIMA SEGUN EL HISTORIAL")
+        print(f"Ultimos {dias} dias frente a los {dias} anteriores")
+        print("=" * 62)
+        
+        if tendencias.empty:
+            print("No hay consultas recientes en el historial")
+            return
+        
+        def con_cambio(valor, cambio):
+            if valor is None or pd.isna(valor):
+                return "-"
+            if cambio is None or pd.isna(cambio):
+                return f"{valor:.1f}"
+            return f"{valor:.1f} ({(cambio or 0.0):+.1f})"  # Sin '-0.0'
+        
+        print(f"{'Ciudad':<18}{'Consultas':>10}  {'Temp (C)':<15}{'Humedad (%)':<15}{'Favorables':>10}")
+        print("-" * 62)
+        for fila in tendencias.itertuples():
+            favorables = f"{fila.pct_favorables:.0f}%" if not pd.isna(fila.pct_favorables) else "-"
+            print(f"{fila.ciudad[:17]:<18}{fila.consultas:>10}  "
+                  f"{con_cambio(fila.temperatura_promedio, fila.cambio_temperatura):<15}"
+                  f"{con_cambio(fila.humedad_promedio, fila.cambio_humedad):<15}{favorables:>10}")
+        
+        niveles = self.distribucion_niveles(dias=dias)
+        total = sum(niveles.values())
+        if total:
+            print(f"\nNiveles de recomendacion ({total} evaluaciones):")
+            for nivel, cantidad in niveles.items():
+                print(f"  - {nivel}: {cantidad} ({100 * cantidad / total:.0f}%)")
+        
+        if ciudad:
+            serie = self.serie_ciudad(ciudad, 'hora').tail(24)
+            serie = serie.dropna(subset=['temperatura_promedio'])
+            if not serie.empty:
+                print(f"\nClima registrado por hora en {ciudad} (ultimas {len(serie)} horas con datos):")
+                for fila in serie.itertuples():
+                    print(f"  {fila.periodo}  {fila.temperatura_promedio:5.1f}C  "
+                          f"{fila.humedad_promedio:5.1f}%  ({fila.consultas} consultas)")
+
+
+def main():
+    """Muestra las tendencias del historial desde la linea de comandos"""
+    parser = argparse.ArgumentParser(description='Tendencias del clima segun el historial de consultas')
+    parser.add_argument('--ciudad', help='Ciudad para la serie por hora')
+    parser.add_argument('--dias', type=int, help='Dias de cada ventana de comparacion')
+    args = parser.parse_args()
+    
+    historial = crear_historial()
+    analitica = AnaliticaHistorial(historial)
+    analitica.mostrar_tendencias(args.ciudad, args.dias)
+    historial.cerrar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# asignacion_tierras.py
+"""
+Optimizador de asignacion de tierras
+Reparte las hectareas de cada finca entre cultivos para maximizar la
+produccion esperada (rendimiento x idoneidad), con limites de agua y temporada.
+Resuelve muchas fincas a la vez sin servicios externos.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos, obtener_rendimientos
+from config import ConfiguracionSistema
+from motor_analisis import obtener_motor
+
+
+M3_POR_MM_HECTAREA = 10
+
+
+def _llenar_tierra(beneficio, tope, hectareas, agua):
+    """
+    Greedy de mochila fraccionaria para todas las fincas a la vez
+    
+    Ordena los cultivos de cada finca por beneficio por hectarea y asigna
+    hasta su tope mientras quede tierra; solo cultivos con beneficio positivo.
+    Con igual beneficio va primero el que usa menos agua.
+    
+    Args:
+        beneficio (ndarray): Beneficio por hectarea, fincas x cultivos
+        tope (ndarray): Hectareas maximas por cultivo, fincas x cultivos
+        hectareas (ndarray): Hectareas de cada finca
+        agua (ndarray): Riego por hectarea, fincas x cultivos (desempate)
+    
+    Returns:
+        ndarray: Hectareas asignadas, fincas x cultivos
+    """
+    orden = np.lexsort((agua, -beneficio), axis=1)
+    tope_ordenado = np.take_along_axis(np.where(beneficio > 0, tope, 0.0), orden, axis=1)
+    
+    usado_antes = np.cumsum(tope_ordenado, axis=1) - tope_ordenado
+    asignado_ordenado = np.clip(hectareas[:, np.newaxis] - usado_antes, 0.0, tope_ordenado)
+    
+    asignado = np.empty_like(asignado_ordenado)
+    np.put_along_axis(asignado, orden, asignado_ordenado, axis=1)
+    return asignado
+
+
+def resolver_asignacion(valor, agua, tope, hectareas, agua_disponible, iteraciones=None):
+    """
+    Programa lineal por finca resuelto con relajacion lagrangiana vectorizada
+    
+        max  sum(valor * x)
+        s.a. sum(x) <= hectareas, sum(agua * x) <= agua_disponible, 0 <= x <= tope
+    
+    Para un precio del agua lambda, el optimo es el greedy de tierra sobre
+    valor - lambda * agua. Lambda se busca por biseccion en todas las fincas
+    a la vez y el resultado final combina las soluciones a ambos lados del
+    quiebre para usar exactamente el agua disponible (optimo del programa lineal).
+    
+    Args:
+        valor (ndarray): Produccion esperada por hectarea, fincas x cultivos
+        agua (ndarray): Riego por hectarea (m3), fincas x cultivos
+        tope (ndarray): Hectareas maximas por cultivo, fincas x cultivos
+        hectareas (ndarray): Hectareas de cada finca
+        agua_disponible (ndarray): m3 de riego de cada finca (inf = sin limite)
+        iteraciones (int): Pasos de biseccion
+    
+    Returns:
+        ndarray: Hectareas asignadas, fincas x cultivos
+    """
+    iteraciones = iteraciones or ConfiguracionSistema.ASIGNACION_ITERACIONES
+    
+    sin_precio = _llenar_tierra(valor, tope, hectareas, agua)
+    agua_sin_precio = (sin_precio * agua).sum(axis=1)
+    restringidas = agua_sin_precio > agua_disponible + 1e-9
+    if not restringidas.any():
+        return sin_precio
+    
+    # Biseccion solo en las fincas donde el agua limita
+    v, a, t, h, w = (valor[restringidas], agua[restringidas], tope[restringidas],
+                     hectareas[restringidas], agua_disponible[restringidas])
+    bajo = np.zeros(len(v))
+    alto = np.max(np.where(a > 0, v / np.maximum(a, 1e-12), 0.0), axis=1) + 1.0
+    
+    for _ in range(iteraciones):
+        medio = (bajo + alto) / 2
+        x = _llenar_tierra(v - medio[:, np.newaxis] * a, t, h, a)
+        excede = (x * a).sum(axis=1) > w
+        bajo = np.where(excede, medio, bajo)
+        alto = np.where(excede, alto, medio)
+    
+    x_bajo = _llenar_tierra(v - bajo[:, np.newaxis] * a, t, h, a)
+    x_alto = _llenar_tierra(v - alto[:, np.newaxis] * a, t, h, a)
+    agua_bajo = (x_bajo * a).sum(axis=1)
+    agua_alto = (x_alto * a).sum(axis=1)
+    
+    # Mezcla convexa que usa exactamente el agua disponible
+    diferencia = agua_bajo - agua_alto
+    theta = np.where(diferencia > 1e-12, (w - agua_alto) / np.where(diferencia > 1e-12, diferencia, 1.0), 0.0)
+    theta = np.clip(theta, 0.0, 1.0)[:, np.newaxis]
+    
+    resultado = sin_precio.copy()
+    resultado[restringidas] = theta * x_bajo + (1 - theta) * x_alto
+    return resultado
+
+
+def optimizar_fincas(fincas, cultivos=None):
+    """
+    Asignacion optima de hectareas para un lote de fincas
+    
+    Args:
+        fincas (DataFrame): Columnas finca, hectareas, temperatura, humedad y
+                            mes (1-12 o nombre); opcionales agua_disponible
+                            (m3 de riego por temporada) y lluvia_esperada (mm)
+        cultivos (list): Claves de cultivos candidatos (por defecto los del
+                         catalogo con rendimiento en el dataset)
+    
+    Returns:
+        dict: 'asignacion' (una fila por finca y cultivo con hectareas > 0),
+              'resumen' (por finca) y 'tiempo_resolucion' en segundos
+    """
+    config = ConfiguracionSistema
+    arreglos = obtener_arreglos_cultivos()
+    rendimientos = obtener_rendimientos()
+    
+    if cultivos is None:
+        cultivos = [c for c in arreglos['claves'] if c in rendimientos]
+    indices = np.array([arreglos['claves'].index(c) for c in cultivos], dtype=int)
+    
+    hectareas = fincas['hectareas'].to_numpy(dtype=float)
+    meses = fincas['mes'].map(lambda m: config.MESES.index(m.lower()) + 1 if isinstance(m, str) else int(m))
+    meses = meses.to_numpy(dtype=int)
+    agua_disponible = (fincas['agua_disponible'].fillna(np.inf).to_numpy(dtype=float)
+                       if 'agua_disponible' in fincas else np.full(len(fincas), np.inf))
+    lluvia = (fincas['lluvia_esperada'].fillna(0).to_numpy(dtype=float)
+              if 'lluvia_esperada' in fincas else np.zeros(len(fincas)))
+    
+    inicio = time.perf_counter()
+    
+    # Idoneidad actual de todos los cultivos en todas las fincas (reglas compiladas)
+    evaluacion = obtener_motor().reglas_evaluacion.evaluar({
+        'temperatura': fincas['temperatura'].to_numpy(dtype=float),
+        'humedad': fincas['humedad'].to_numpy(dtype=float),
+        'mes': meses
+    })
+    idoneidad = np.clip(evaluacion['puntajes'][:, indices], 0, config.PUNTAJE_MAXIMO) / config.PUNTAJE_MAXIMO
+    
+    rendimiento = np.array([rendimientos.get(c, 0.0) for c in cultivos])
+    valor = rendimiento[np.newaxis, :] * idoneidad
+    
+    # Riego necesario para alcanzar la precipitacion minima del ciclo
+    deficit = np.maximum(arreglos['precipitacion_min'][indices][np.newaxis, :] - lluvia[:, np.newaxis], 0.0)
+    agua = deficit * M3_POR_MM_HECTAREA
+    
+    # Temporada: solo cultivos que se siembran en el mes de la finca
+    en_temporada = arreglos['mascara_meses'][indices][:, meses - 1].T
+    tope = np.where(en_temporada, hectareas[:, np.newaxis] * config.ASIGNACION_FRACCION_MAXIMA, 0.0)
+    
+    asignado = resolver_asignacion(valor, agua, tope, hectareas, agua_disponible)
+    tiempo = time.perf_counter() - inicio
+    
+    f, j = np.nonzero(asignado > 1e-6)
+    nombres_finca = fincas['finca'].to_numpy()
+    asignacion = pd.DataFrame({
+        'finca': nombres_finca[f],
+        'cultivo': np.asarray(cultivos)[j],
+        'hectareas': asignado[f, j].round(3),
+        'idoneidad': (idoneidad[f, j] * 100).round(1),
+        'produccion_t': (asignado[f, j] * valor[f, j]).round(2),
+        'riego_m3': (asignado[f, j] * agua[f, j]).round(1)
+    })
+    
+    resumen = pd.DataFrame({
+        'finca': nombres_finca,
+        'hectareas': hectareas,
+        'hectareas_asignadas': asignado.sum(axis=1).round(3),
+        'produccion_t': (asignado * valor).sum(axis=1).round(2),
+        'riego_m3': (asignado * agua).sum(axis=1).round(1),
+        'agua_disponible': agua_disponible
+    })
+    
+    return {'asignacion': asignacion, 'resumen': resumen, 'tiempo_resolucion': tiempo}
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n = 10000
+    fincas = pd.DataFrame({
+        'finca': [f"F{i:05d}" for i in range(n)],
+        'hectareas': rng.uniform(1, 50, n).round(1),
+        'temperatura': rng.normal(27, 2, n).round(1),
+        'humedad': rng.uniform(60, 95, n).round(0),
+        'mes': rng.integers(1, 13, n),
+        'agua_disponible': rng.uniform(0, 100000, n).round(0),
+        'lluvia_esperada': rng.uniform(200, 1200, n).round(0)
+    })
+    
+    resultado = optimizar_fincas(fincas)
+    
+    print("=== ASIGNACION DE TIERRAS ===")
+    primera = fincas['finca'].iloc[0]
+    print(fincas.iloc[0].to_dict())
+    print(resultado['asignacion'][resultado['asignacion']['finca'] == primera].to_string(index=False))
+    print(f"\n{n} fincas resueltas en {resultado['tiempo_resolucion'] * 1000:.1f} ms")
@@ -14,8 +14,11 @@ from base_datos_cultivos import cultivos_panama, listar_cultivos
 from conexion_clima import ClimaAPI
 from analisis_simple import AnalizadorAgricola, mostrar_reporte_simple
 from visualizaciones import VisualizadorAgricola
-from historial import HistorialConsultas
+from historial import crear_historial
+from analitica_historial import AnaliticaHistorial
 from config import ConfiguracionSistema, ValidadorSistema
+from tabla_idoneidad import obtener_tabla_idoneidad
+from lote_regional import cargar_recomendaciones_precalculadas
 
 
 class AsistenteAgricola:
@@ -39,7 +42,8 @@ class AsistenteAgricola:
         self.clima_api = ClimaAPI()
         self.analizador = AnalizadorAgricola()
         self.visualizador = VisualizadorAgricola()
-        self.historial = HistorialConsultas(ConfiguracionSistema.ARCHIVO_HISTORIAL)
+        self.historial = crear_historial()
+        self.analitica = AnaliticaHistorial(self.historial)
         self.ciudad_actual = "Panama City"
         
         print(ConfiguracionSistema.MENSAJES['carga_exitosa'] + "\n")
@@ -118,7 +122,13 @@ class AsistenteAgricola:
         print("Analizando condiciones climaticas actuales...")
         print("Evaluando cultivos disponibles...")
         
-        recomendaciones = self.analizador.recomendar_cultivos(self.ciudad_actual)
+        # Usar la tabla del lote regional si esta vigente, si no calcular en linea
+        recomendaciones = cargar_recomendaciones_precalculadas(self.ciudad_actual, k=5)
+        precalculadas = bool(recomendaciones)
+        if precalculadas:
+            print(f"Usando resultados precalculados ({recomendaciones['fecha_analisis']})")
+        else:
+            recomendaciones = self.analizador.recomendar_cultivos_top(self.ciudad_actual, k=5)
         
         if recomendaciones:
             clima = recomendaciones['clima_actual']
@@ -132,7 +142,7 @@ class AsistenteAgricola:
             print("-"*55)
             
             # Mostrar top 5 cultivos
-            for i, cultivo in enumerate(recomendaciones['evaluaciones'][:5], 1):
+            for i, cultivo in enumerate(recomendaciones['evaluaciones'], 1):
                 print(f"\n{i}. {cultivo['cultivo'].upper()}")
                 print(f"   Evaluacion: {cultivo['nivel']} ({cultivo['puntaje']}/100 puntos)")
                 
@@ -148,16 +158,18 @@ class AsistenteAgricola:
                     for alerta in cultivo['alertas'][:2]:
                         print(f"     ! {alerta}")
             
-            # Guardar consulta en historial
+            # Guardar consulta en historial; el clima del lote precalculado no es
+            # una observacion actual, asi que se guarda sin temperatura ni humedad
             mejor_cultivo = recomendaciones['evaluaciones'][0]
+            observacion = {} if precalculadas else {'temperatura': clima['temperatura'],
+                                                    'humedad': clima['humedad']}
             self.historial.guardar_consulta(
                 ciudad=self.ciudad_actual,
                 cultivo=mejor_cultivo['cultivo'],
-                temperatura=clima['temperatura'],
-                humedad=clima['humedad'],
                 puntaje=mejor_cultivo['puntaje'],
                 nivel=mejor_cultivo['nivel'],
-                tipo_consulta="recomendaciones_cultivos"
+                tipo_consulta="recomendaciones_cultivos",
+                **observacion
             )
             
         else:
@@ -382,12 +394,11 @@ class AsistenteAgricola:
                 
             elif opcion == '3':
                 cultivo_buscar = input("\nIngrese nombre o codigo del cultivo: ").lower().strip()
-                consultas = self.historial.obtener_historial(100)  # Buscar en ultimas 100
+                if cultivo_buscar in cultivos_panama:
+                    cultivo_buscar = cultivos_panama[cultivo_buscar]['nombre'].lower()
                 
-                consultas_filtradas = [
-                    c for c in consultas 
-                    if cultivo_buscar in c.get('cultivo', '').lower()
-                ]
+                # Busqueda en todo el historial (indexada en SQLite)
+                consultas_filtradas = self.historial.buscar_por_cultivo(cultivo_buscar)
                 
                 if consultas_filtradas:
                     print(f"\nEncontradas {len(consultas_filtradas)} consultas para '{cultivo_buscar}':")
@@ -425,9 +436,10 @@ class AsistenteAgricola:
             print("1. Cambiar ciudad")
             print("2. Verificar conexion API clima")
             print("3. Ver informacion del sistema")
-            print("4. Volver al menu principal")
+            print("4. Ver tendencias del clima (historial)")
+            print("5. Volver al menu principal")
             
-            opcion = input("\nSeleccione una opcion (1-4): ").strip()
+            opcion = input("\nSeleccione una opcion (1-5): ").strip()
             
             if opcion == '1':
                 self.cambiar_ciudad_sistema()
@@ -439,12 +451,16 @@ class AsistenteAgricola:
                 self.mostrar_info_sistema()
                 
             elif opcion == '4':
+                # Agregados en cache: solo se leen las consultas nuevas
+                self.analitica.mostrar_tendencias(self.ciudad_actual)
+                
+            elif opcion == '5':
                 break
                 
             else:
                 print("Opcion no valida")
             
-            if opcion != '4':
+            if opcion != '5':
                 self.pausar()
     
     def cambiar_ciudad_sistema(self):
@@ -522,9 +538,11 @@ class AsistenteAgricola:
         print(f"")
         print(f"Modulos cargados:")
         print(f"  - Base de datos: {len(cultivos_panama)} cultivos")
+        memoria_tabla = obtener_tabla_idoneidad().memoria_bytes()
+        print(f"  - Tabla de idoneidad: {memoria_tabla['total'] / 1024:.1f} KB")
         print(f"  - API Climatica: OpenWeatherMap")
         print(f"  - Visualizaciones: matplotlib")
-        print(f"  - Historial: CSV local")
+        print(f"  - Historial: {self.historial.DESCRIPCION}")
         print(f"")
         print(f"Configuracion actual:")
         print(f"  - Ciudad: {self.ciudad_actual}")
@@ -604,11 +622,15 @@ class AsistenteAgricola:
         print(f"Desarrollado para apoyar la agricultura en Panama")
         print("\n" + "="*55)
         
+        # Escribir en disco las consultas pendientes antes de terminar
+        self.historial.cerrar()
+        
         sys.exit(0)
 
 
 def main():
     """Funcion principal del programa"""
+    asistente = None
     try:
         print("Cargando Sistema Asistente Agricola...")
         print("Por favor espere...")
@@ -622,6 +644,8 @@ def main():
     except KeyboardInterrupt:
         print("\n\nSistema interrumpido por el usuario")
         print("Guardando datos...")
+        if asistente is not None:
+            asistente.historial.cerrar()
         print("Cerrando aplicacion de forma segura...")
         sys.exit(0)
         
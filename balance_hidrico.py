@@ -0,0 +1,202 @@
+# balance_hidrico.py
+"""
+Balance hidrico diario del suelo
+Simula un modelo de cubeta (agua util + encharcamiento) para muchas parcelas
+y todos los cultivos a la vez, avanzando un solo arreglo de estado por dia
+"""
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+from evapotranspiracion import (arreglos_pronostico, coeficientes_cultivo, et0_hargreaves,
+                                et0_pronostico, latitudes_ciudades, radiacion_extraterrestre)
+
+
+def umbrales_estres(indices):
+    """
+    Umbrales de estres de cada cultivo segun su tolerancia
+    
+    Args:
+        indices (ndarray): Indices de cultivos en el catalogo
+    
+    Returns:
+        tuple: (agua minima en mm antes de estres por sequia,
+                encharcamiento maximo en mm antes de estres por exceso)
+    """
+    config = ConfiguracionSistema
+    arreglos = obtener_arreglos_cultivos()
+    
+    # Tolerancias desconocidas se tratan como 'media'
+    sequia, lluvia = config.FRACCION_ESTRES_SEQUIA, config.ENCHARCAMIENTO_MAXIMO
+    fraccion = np.array([sequia.get(t, sequia['media']) for t in arreglos['tolerancia_sequia'][indices]])
+    encharcamiento = np.array([lluvia.get(t, lluvia['media']) for t in arreglos['tolerancia_lluvia'][indices]])
+    return fraccion * config.CAPACIDAD_SUELO_MM, encharcamiento
+
+
+def simular_balance(lluvia, et0, cultivos=None, humedad_inicial=None):
+    """
+    Avanza el balance hidrico dia a dia para parcelas x cultivos
+    
+    Cada dia: agua += lluvia efectiva - ETc. Lo que supera la capacidad de
+    campo pasa a encharcamiento, que drena DRENAJE_DIARIO_MM por dia. Un dia
+    cuenta como sequia si el agua queda bajo el umbral del cultivo y como
+    inundacion si el encharcamiento supera su tolerancia.
+    
+    Args:
+        lluvia (ndarray): Lluvia diaria en mm, parcelas x dias
+        et0 (ndarray): ET0 diaria en mm, parcelas x dias
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+        humedad_inicial (float | ndarray): Agua inicial en mm
+                                           (por defecto HUMEDAD_SUELO_INICIAL x capacidad)
+    
+    Returns:
+        dict: 'cultivos' y matrices parcelas x cultivos 'dias_sequia',
+              'dias_inundacion', 'primer_dia_sequia', 'primer_dia_inundacion'
+              (-1 si no ocurre) y 'agua_final'
+    """
+    config = ConfiguracionSistema
+    arreglos = obtener_arreglos_cultivos()
+    cultivos = list(cultivos or arreglos['claves'])
+    indices = np.array([arreglos['claves'].index(c) for c in cultivos], dtype=int)
+    
+    # Dias sin datos (fin del pronostico) no aportan lluvia ni evaporan
+    lluvia = np.nan_to_num(np.atleast_2d(np.asarray(lluvia, dtype=float))) * config.FRACCION_LLUVIA_EFECTIVA
+    et0 = np.nan_to_num(np.atleast_2d(np.asarray(et0, dtype=float)))
+    n_parcelas, n_dias = lluvia.shape
+    forma = (n_parcelas, len(cultivos))
+    
+    kc = coeficientes_cultivo(cultivos)
+    agua_minima, encharcamiento_maximo = umbrales_estres(indices)
+    capacidad = config.CAPACIDAD_SUELO_MM
+    
+    if humedad_inicial is None:
+        humedad_inicial = config.HUMEDAD_SUELO_INICIAL * capacidad
+    agua = np.broadcast_to(np.asarray(humedad_inicial, dtype=float), forma).copy()
+    encharcamiento = np.zeros(forma)
+    exceso = np.empty(forma)
+    estres = np.empty(forma, dtype=bool)
+    
+    dias_sequia = np.zeros(forma, dtype=int)
+    dias_inundacion = np.zeros(forma, dtype=int)
+    primer_dia_sequia = np.full(forma, -1)
+    primer_dia_inundacion = np.full(forma, -1)
+    
+    for dia in range(n_dias):
+        # Entradas y salidas del dia (ETc = ET0 x Kc por cultivo)
+        agua += lluvia[:, dia, np.newaxis]
+        agua -= et0[:, dia, np.newaxis] * kc
+        
+        # Lo que excede la capacidad de campo se acumula como encharcamiento
+        np.subtract(agua, capacidad, out=exceso)
+        np.maximum(exceso, 0.0, out=exceso)
+        np.clip(agua, 0.0, capacidad, out=agua)
+        encharcamiento += exceso
+        encharcamiento -= config.DRENAJE_DIARIO_MM
+        np.maximum(encharcamiento, 0.0, out=encharcamiento)
+        
+        np.less(agua, agua_minima, out=estres)
+        dias_sequia += estres
+        primer_dia_sequia[estres & (primer_dia_sequia < 0)] = dia
+        
+        np.greater(encharcamiento, encharcamiento_maximo, out=estres)
+        dias_inundacion += estres
+        primer_dia_inundacion[estres & (primer_dia_inundacion < 0)] = dia
+    
+    return {
+        'cultivos': cultivos,
+        'dias_sequia': dias_sequia,
+        'dias_inundacion': dias_inundacion,
+        'primer_dia_sequia': primer_dia_sequia,
+        'primer_dia_inundacion': primer_dia_inundacion,
+        'agua_final': agua
+    }
+
+
+def series_pronostico(pronosticos):
+    """
+    Lluvia y ET0 diarias de los pronosticos de varias ciudades
+    
+    En los dias incompletos (primero y ultimo) ambas cubren solo la
+    'fraccion' del dia con intervalos de pronostico.
+    
+    Returns:
+        dict: 'ciudades', 'fechas', 'lluvia', 'et0' y 'fraccion' (ciudades x dias)
+    """
+    datos = arreglos_pronostico(pronosticos)
+    if not datos['ciudades']:
+        return {'ciudades': [], 'fechas': [], 'lluvia': np.zeros((0, 0)), 'et0': np.zeros((0, 0)),
+                'fraccion': np.zeros((0, 0))}
+    return {
+        'ciudades': datos['ciudades'],
+        'fechas': datos['fechas'],
+        'lluvia': datos['lluvia'],
+        'et0': et0_pronostico(datos),
+        'fraccion': datos['fraccion']
+    }
+
+
+def series_temporada(pronosticos, climatologia, fecha_inicio, dias):
+    """
+    Lluvia y ET0 de una temporada: pronostico primero y luego climatologia
+    
+    La ET0 climatologica se estima con Hargreaves desde la temperatura media,
+    con la amplitud termica tipica AMPLITUD_TERMICA_CLIMATOLOGIA. Cada dia
+    del pronostico se ubica por su fecha; en los dias incompletos, la parte
+    sin intervalos de pronostico se completa con la climatologia.
+    
+    Args:
+        pronosticos (dict): DataFrame de pronostico por ciudad (puede estar vacio)
+        climatologia (dict): 'ciudades', 'precipitacion' y 'temperatura' (ciudades x 365)
+        fecha_inicio (datetime): Primer dia de la temporada
+        dias (int): Largo de la temporada
+    
+    Returns:
+        dict: 'ciudades', 'lluvia' y 'et0' (ciudades x dias)
+    """
+    ciudades = list(climatologia['ciudades'])
+    dia_año = fecha_inicio.timetuple().tm_yday - 1
+    indices = (dia_año + np.arange(dias)) % 365
+    
+    temperatura = np.asarray(climatologia['temperatura'], dtype=float)[:, indices]
+    amplitud = ConfiguracionSistema.AMPLITUD_TERMICA_CLIMATOLOGIA
+    ra = radiacion_extraterrestre(latitudes_ciudades(ciudades), indices + 1)
+    
+    lluvia = np.asarray(climatologia['precipitacion'], dtype=float)[:, indices]
+    et0 = et0_hargreaves(temperatura - amplitud / 2, temperatura + amplitud / 2, temperatura, ra)
+    
+    pronostico = series_pronostico({c: pronosticos[c] for c in ciudades if c in (pronosticos or {})})
+    desfase = (pd.to_datetime(pronostico['fechas']) - pd.Timestamp(fecha_inicio).normalize()).days.to_numpy()
+    en_temporada = (desfase >= 0) & (desfase < dias)
+    for k, ciudad in enumerate(pronostico['ciudades']):
+        i = ciudades.index(ciudad)
+        validos = en_temporada & ~np.isnan(pronostico['et0'][k])
+        d = desfase[validos]
+        resto = 1.0 - pronostico['fraccion'][k][validos]
+        lluvia[i, d] = pronostico['lluvia'][k][validos] + lluvia[i, d] * resto
+        et0[i, d] = pronostico['et0'][k][validos] + et0[i, d] * resto
+    
+    return {'ciudades': ciudades, 'lluvia': lluvia, 'et0': et0}
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    
+    # 10.000 parcelas durante una temporada de 180 dias
+    rng = np.random.default_rng(0)
+    n_parcelas, n_dias = 10000, 180
+    lluvia = rng.gamma(0.4, 20, size=(n_parcelas, n_dias))
+    et0 = rng.normal(4.5, 0.8, size=(n_parcelas, n_dias)).clip(1)
+    
+    inicio = time.perf_counter()
+    resultado = simular_balance(lluvia, et0)
+    duracion = time.perf_counter() - inicio
+    
+    print("=== BALANCE HIDRICO ===")
+    print(f"{n_parcelas} parcelas x {len(resultado['cultivos'])} cultivos x {n_dias} dias "
+          f"en {duracion:.2f} s")
+    for j, cultivo in enumerate(resultado['cultivos']):
+        print(f"  - {cultivo}: {resultado['dias_sequia'][:, j].mean():.1f} dias de sequia, "
+              f"{resultado['dias_inundacion'][:, j].mean():.1f} dias de inundacion (promedio)")
@@ -6,7 +6,12 @@ Datos cargados desde archivo CSV
 """
 
 import pandas as pd
+import numpy as np
+import hashlib
 import os
+import unicodedata
+
+from config import ConfiguracionSistema
 
 # Cargar datos desde CSV
 def cargar_cultivos_desde_csv():
@@ -192,6 +197,106 @@ def cargar_cultivos_por_defecto():
 cultivos_panama = cargar_cultivos_desde_csv()
 
 
+def calcular_version_catalogo(cultivos):
+    """
+    Calcula una huella del contenido del catalogo de cultivos
+    
+    Args:
+        cultivos (dict): Catalogo con la estructura de cultivos_panama
+        
+    Returns:
+        str: Version del catalogo (hash corto del contenido)
+    """
+    contenido = repr(sorted(cultivos.items())).encode('utf-8')
+    return hashlib.md5(contenido).hexdigest()[:12]
+
+
+_version_catalogo = calcular_version_catalogo(cultivos_panama)
+_arreglos_cache = {'version': None, 'arreglos': None}
+
+
+def obtener_version_catalogo():
+    """
+    Retorna la version del catalogo cargado actualmente
+    
+    Cambia cada vez que el catalogo se recarga con contenido distinto,
+    por lo que sirve como clave para invalidar calculos precalculados.
+    """
+    return _version_catalogo
+
+
+def actualizar_version_catalogo():
+    """
+    Recalcula la version tras modificar cultivos_panama en memoria
+    
+    Returns:
+        str: Nueva version del catalogo
+    """
+    global _version_catalogo
+    _version_catalogo = calcular_version_catalogo(cultivos_panama)
+    return _version_catalogo
+
+
+def recargar_cultivos():
+    """
+    Vuelve a leer el CSV de cultivos y actualiza el catalogo en memoria
+    
+    El diccionario cultivos_panama se actualiza en el mismo objeto para que
+    los modulos que ya lo importaron vean los datos nuevos.
+    
+    Returns:
+        str: Version del catalogo despues de la recarga
+    """
+    nuevos = cargar_cultivos_desde_csv()
+    cultivos_panama.clear()
+    cultivos_panama.update(nuevos)
+    return actualizar_version_catalogo()
+
+
+def obtener_arreglos_cultivos():
+    """
+    Retorna los parametros del catalogo como arreglos de NumPy
+    
+    Los arreglos siguen el orden de cultivos_panama y se reconstruyen solo
+    cuando cambia la version del catalogo.
+    
+    Returns:
+        dict: Arreglos por parametro, mas 'claves' y 'mascara_meses'
+              (matriz booleana cultivos x 12 con los meses de siembra)
+    """
+    version = obtener_version_catalogo()
+    if _arreglos_cache['version'] == version:
+        return _arreglos_cache['arreglos']
+    
+    claves = list(cultivos_panama.keys())
+    datos = [cultivos_panama[c] for c in claves]
+    
+    arreglos = {'claves': claves, 'nombres': [d['nombre'] for d in datos]}
+    
+    for campo in ['duracion_dias', 'temp_minima', 'temp_optima', 'temp_maxima',
+                  'precipitacion_min', 'precipitacion_optima', 'precipitacion_max',
+                  'humedad_optima']:
+        arreglos[campo] = np.array([d[campo] for d in datos], dtype=float)
+    
+    arreglos['tolerancia_sequia'] = np.array([d['tolerancia_sequia'] for d in datos], dtype=object)
+    arreglos['tolerancia_lluvia'] = np.array([d['tolerancia_lluvia'] for d in datos], dtype=object)
+    
+    # Mascara de meses de siembra
+    mascara = np.zeros((len(claves), 12), dtype=bool)
+    for i, d in enumerate(datos):
+        meses = [m.lower() for m in d['temporada_siembra']]
+        if 'todo el año' in meses:
+            mascara[i, :] = True
+            continue
+        for j, mes in enumerate(ConfiguracionSistema.MESES):
+            mascara[i, j] = mes in meses
+    arreglos['mascara_meses'] = mascara
+    
+    _arreglos_cache['version'] = version
+    _arreglos_cache['arreglos'] = arreglos
+    return arreglos
+
+
 def obtener_cultivo(nombre_cultivo):
     """
     Obtiene información de un cultivo específico
@@ -224,6 +329,54 @@ def cultivos_por_temporada(mes):
     return cultivos_disponibles
 
 
+def clave_cultivo(nombre):
+    """
+    Convierte un nombre de cultivo en su clave del catálogo
+    (sin tildes, en minúsculas y con guiones bajos: 'Maíz' -> 'maiz')
+    """
+    sin_tildes = unicodedata.normalize('NFKD', str(nombre).strip())
+    sin_tildes = ''.join(c for c in sin_tildes if not unicodedata.combining(c))
+    return '_'.join(sin_tildes.lower().split())
+
+
+def cargar_dataset_cultivos():
+    """
+    Carga el dataset descriptivo de cultivos (temporadas, rendimientos y
+    recomendaciones en texto) con una columna 'clave' compatible con el catálogo
+    
+    Returns:
+        pandas.DataFrame: Dataset con columna 'clave' (vacío si no existe el archivo)
+    """
+    directorio_actual = os.path.dirname(__file__)
+    ruta_csv = os.path.join(directorio_actual, ConfiguracionSistema.ARCHIVO_DATASET)
+    
+    try:
+        df_dataset = pd.read_csv(ruta_csv, encoding='utf-8-sig')
+    except FileNotFoundError:
+        return pd.DataFrame(columns=['clave', 'cultivo', 'recomendaciones'])
+    
+    df_dataset['clave'] = df_dataset['cultivo'].map(clave_cultivo)
+    return df_dataset
+
+
+def obtener_rendimientos():
+    """
+    Rendimiento promedio de cada cultivo según el dataset
+    
+    Returns:
+        dict: Toneladas por hectárea por clave de cultivo ('3.8 t/ha' -> 3.8)
+    """
+    df_dataset = cargar_dataset_cultivos()
+    if 'rendimiento_promedio' not in df_dataset.columns:
+        return {}
+    
+    toneladas = pd.to_numeric(
+        df_dataset['rendimiento_promedio'].astype(str).str.extract(r'([\d.,]+)')[0].str.replace(',', '.'),
+        errors='coerce'
+    )
+    return {clave: float(t) for clave, t in zip(df_dataset['clave'], toneladas) if pd.notna(t)}
+
+
 # Ejemplo de uso
 if __name__ == "__main__":
     print("=== BASE DE DATOS DE CULTIVOS DE PANAMÁ ===")
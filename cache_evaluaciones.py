@@ -0,0 +1,92 @@
+# cache_evaluaciones.py
+"""
+Cache de evaluaciones de cultivos
+Evita repetir evaluaciones mientras la observacion del clima no cambie
+"""
+
+from collections import OrderedDict
+from threading import Lock
+
+from base_datos_cultivos import obtener_version_catalogo
+
+
+class CacheLRU:
+    """
+    Cache de tamaño acotado que descarta primero lo usado hace mas tiempo
+    """
+    
+    def __init__(self, tamaño_maximo=128):
+        self.tamaño_maximo = tamaño_maximo
+        self._datos = OrderedDict()
+        self._lock = Lock()
+        self.aciertos = 0
+        self.fallos = 0
+    
+    def obtener(self, clave):
+        """
+        Retorna el valor guardado para la clave o None si no existe
+        """
+        with self._lock:
+            if clave not in self._datos:
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return self._datos[clave]
+    
+    def guardar(self, clave, valor):
+        """Guarda un valor y descarta las entradas mas antiguas si hace falta"""
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamaño_maximo:
+                self._datos.popitem(last=False)
+    
+    def limpiar(self):
+        """Vacia el cache"""
+        with self._lock:
+            self._datos.clear()
+    
+    def __len__(self):
+        return len(self._datos)
+    
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Entradas, aciertos y fallos del cache
+        """
+        return {
+            'entradas': len(self._datos),
+            'tamaño_maximo': self.tamaño_maximo,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos
+        }
+
+
+def clave_evaluacion(clima_actual, mes, cultivo=None):
+    """
+    Construye la clave de cache de una evaluacion
+    
+    La observacion del proveedor solo cambia cada pocos minutos, por lo que
+    (ubicacion, fecha_hora de la observacion, version del catalogo, mes)
+    identifica por completo el resultado.
+    
+    Args:
+        clima_actual (dict): Datos de ClimaAPI.obtener_clima_actual
+        mes (str): Mes usado para evaluar la temporada de siembra
+        cultivo (str): Clave del cultivo, o None para la evaluacion de todos
+    
+    Returns:
+        tuple: Clave para CacheLRU, o None si la observacion no trae fecha_hora
+    """
+    if not clima_actual.get('fecha_hora'):
+        return None
+    
+    return (
+        clima_actual.get('ciudad'),
+        clima_actual.get('pais'),
+        clima_actual.get('fecha_hora'),
+        obtener_version_catalogo(),
+        mes,
+        cultivo
+    )
@@ -5,9 +5,12 @@ Módulo para conectarse a OpenWeatherMap API y obtener datos climáticos
 
 import requests
 import os
+import threading
 from dotenv import load_dotenv
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
+from config import ConfiguracionSistema
+from normales_climaticas import obtener_normales
 
 # Cargar variables de entorno
 load_dotenv()
@@ -33,6 +36,10 @@ class ClimaAPI:
         
         if not self.api_key:
             raise ValueError("API key no encontrada. Verifica tu archivo .env")
+        
+        # Cache de pronosticos: (ciudad, pais) -> (momento de descarga, DataFrame)
+        self.cache_pronosticos = {}
+        self._lock_pronosticos = threading.Lock()
     
     
     def obtener_clima_actual(self, ciudad, pais="PA"):
@@ -56,7 +63,7 @@ class ClimaAPI:
             }
             
             # Realizar petición
-            response = requests.get(BASE_URL_CURRENT, params=params)
+            response = requests.get(BASE_URL_CURRENT, params=params, timeout=ConfiguracionSistema.API_TIMEOUT)
             response.raise_for_status()  # Lanza error si falla
             
             data = response.json()
@@ -87,6 +94,8 @@ class ClimaAPI:
             
         except requests.exceptions.RequestException as e:
             print(f"Error al conectar con la API: {e}")
+            if self._api_no_disponible(e):
+                return self._respaldo_normales('clima_actual', ciudad)
             return None
         except KeyError as e:
             print(f"Error al procesar datos: {e}")
@@ -104,6 +113,11 @@ class ClimaAPI:
         Returns:
             pandas.DataFrame: Pronóstico organizado en tabla
         """
+        # El pronostico cambia cada 3 horas; reutilizar la descarga reciente
+        cacheado = self._pronostico_en_cache(ciudad, pais)
+        if cacheado is not None:
+            return cacheado
+        
         try:
             # Parámetros de la consulta
             params = {
@@ -114,7 +128,7 @@ class ClimaAPI:
             }
             
             # Realizar petición
-            response = requests.get(BASE_URL_FORECAST, params=params)
+            response = requests.get(BASE_URL_FORECAST, params=params, timeout=ConfiguracionSistema.API_TIMEOUT)
             response.raise_for_status()
             
             data = response.json()
@@ -141,16 +155,94 @@ class ClimaAPI:
             # Convertir a DataFrame
             df_pronostico = pd.DataFrame(pronosticos)
             
-            return df_pronostico
+            with self._lock_pronosticos:
+                self.cache_pronosticos[(ciudad, pais)] = (datetime.now(), df_pronostico)
+            
+            return df_pronostico.copy()
             
         except requests.exceptions.RequestException as e:
             print(f"Error al conectar con la API: {e}")
+            if self._api_no_disponible(e):
+                return self._respaldo_normales('pronostico_5dias', ciudad)
             return None
         except KeyError as e:
             print(f"Error al procesar datos: {e}")
             return None
     
     
+    def _api_no_disponible(self, error):
+        """
+        True si el error es pasajero del servicio: sin conexion, tiempo de
+        espera agotado, error del servidor (5xx) o cuota agotada (429).
+        Una API key invalida o una ciudad inexistente no usan el respaldo.
+        """
+        if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+            return True
+        respuesta = getattr(error, 'response', None)
+        return respuesta is not None and (respuesta.status_code >= 500 or respuesta.status_code == 429)
+    
+    
+    def _respaldo_normales(self, consulta, ciudad):
+        """
+        Datos de las normales climaticas locales cuando la API no responde
+        (sin conexion, error del servidor o cuota agotada)
+        
+        Args:
+            consulta (str): 'clima_actual' o 'pronostico_5dias'
+            ciudad (str): Nombre de la ciudad
+            
+        Returns:
+            dict | DataFrame: Mismo formato que la consulta a la API, o None
+                              si no hay normales de la ciudad
+        """
+        if not ConfiguracionSistema.NORMALES_RESPALDO:
+            return None
+        
+        normales = obtener_normales()
+        if normales is None or not normales.tiene_ciudad(ciudad):
+            return None
+        
+        print(f"Usando normales climaticas locales para {ciudad}")
+        return getattr(normales, consulta)(ciudad)
+    
+    
+    def _pronostico_en_cache(self, ciudad, pais="PA"):
+        """
+        Retorna una copia del pronóstico en cache si sigue vigente
+        """
+        with self._lock_pronosticos:
+            entrada = self.cache_pronosticos.get((ciudad, pais))
+        
+        if entrada is None:
+            return None
+        
+        descargado, df_pronostico = entrada
+        vigencia = timedelta(minutes=ConfiguracionSistema.CACHE_PRONOSTICO_MINUTOS)
+        if datetime.now() - descargado > vigencia:
+            return None
+        
+        return df_pronostico.copy()
+    
+    
+    def pronosticos_en_cache(self):
+        """
+        Pronósticos vigentes de todas las ciudades consultadas
+        
+        Returns:
+            dict: DataFrame de pronóstico por ciudad
+        """
+        with self._lock_pronosticos:
+            claves = list(self.cache_pronosticos.keys())
+        
+        pronosticos = {}
+        for ciudad, pais in claves:
+            df_pronostico = self._pronostico_en_cache(ciudad, pais)
+            if df_pronostico is not None:
+                pronosticos[ciudad] = df_pronostico
+        
+        return pronosticos
+    
+    
     def obtener_resumen_diario(self, ciudad, pais="PA"):
         """
         Obtiene un resumen diario del pronóstico (promedios por día)
@@ -21,15 +21,65 @@ class ConfiguracionSistema:
     ARCHIVO_CULTIVOS = "cultivos_panama.csv"
     ARCHIVO_DATASET = "dataset_cultivos_panama.csv"
     ARCHIVO_HISTORIAL = "historial_consultas.csv"
+    ARCHIVO_HISTORIAL_SQLITE = "historial_consultas.db"
     ARCHIVO_ENV = ".env"
     
     # Configuracion de API
     API_TIMEOUT = 10  # segundos
     REINTENTOS_API = 3
+    CACHE_PRONOSTICO_MINUTOS = 30  # El pronostico se actualiza cada 3 horas
+    
+    # Cache de evaluaciones (entradas maximas, se descarta la menos usada)
+    CACHE_EVALUACIONES_MAX = 256
+    
+    # Lote regional de recomendaciones
+    ARCHIVO_LOTE_RECOMENDACIONES = "recomendaciones_regionales.csv"
+    LOTE_HILOS_DESCARGA = 8
+    LOTE_PROCESOS = None  # None = numero de CPUs
+    LOTE_VIGENCIA_MINUTOS = 60
+    LOTE_RIESGO_ENFERMEDADES = True  # Descargar pronosticos para el indice de hongos
+    
+    # Normales climaticas locales (normales_climaticas.py)
+    ARCHIVO_NORMALES = "normales_climaticas.dat"  # El indice se guarda en normales_climaticas.json
+    NORMALES_RESPALDO = True  # Usar las normales si la API falla o se agota la cuota
+    NORMALES_FILAS_BLOQUE = 100000  # Filas de CSV leidas a la vez al importar
+    
+    # Ingesta de archivos historicos de estaciones (ingesta_historica.py)
+    INGESTA_FILAS_BLOQUE = 50000
+    # Nombres aceptados para cada columna del esquema del pronostico (en minusculas)
+    ALIAS_COLUMNAS_HISTORICAS = {
+        'ciudad': ['ciudad', 'estacion', 'station', 'name'],
+        'fecha_hora': ['fecha_hora', 'fecha', 'datetime', 'date', 'timestamp', 'time'],
+        'temperatura': ['temperatura', 'temp', 'tavg', 'temperature'],
+        'temp_minima': ['temp_minima', 'tmin'],
+        'temp_maxima': ['temp_maxima', 'tmax'],
+        'humedad': ['humedad', 'rhum', 'rh', 'humidity'],
+        'velocidad_viento': ['velocidad_viento', 'wspd', 'wind_speed'],
+        'lluvia_3h': ['lluvia_3h', 'lluvia', 'precipitacion', 'prcp', 'precipitation']
+    }
     
     # Configuracion de historial
-    MAX_CONSULTAS_HISTORIAL = 1000
+    HISTORIAL_BACKEND = "csv"  # 'csv' o 'sqlite' (migra el CSV la primera vez)
+    MAX_CONSULTAS_HISTORIAL = 1000  # Consultas en el CSV activo; las anteriores se archivan por mes
+    HISTORIAL_MARGEN_ROTACION = 500  # Consultas extra antes de rotar (evita rotar en cada escritura)
+    HISTORIAL_MESES_SEGMENTOS = 12  # Meses archivados con detalle; los anteriores se resumen por dia
     CONSULTAS_MOSTRAR_DEFAULT = 10
+    CONSULTAS_BUSQUEDA_MAX = 100  # Resultados maximos al buscar por cultivo
+    HISTORIAL_ESCRITURA_DIFERIDA = True  # Escribir las consultas por lotes desde un hilo
+    HISTORIAL_LOTE_FILAS = 100  # Consultas pendientes que disparan una escritura
+    HISTORIAL_LOTE_SEGUNDOS = 2.0  # Espera maxima de una consulta antes de escribirse
+    HISTORIAL_BLOQUE_LECTURA = 64 * 1024  # Bytes leidos por paso al buscar desde el final
+    HISTORIAL_INDICE_FILAS = 256  # Filas del CSV activo entre entradas del indice de fechas
+    
+    # Analitica del historial (analitica_historial.py)
+    ARCHIVO_ANALITICA_HISTORIAL = "historial_analitica.json"
+    ANALITICA_HORAS_RETENIDAS = 7 * 24  # Horas con agregados por hora
+    ANALITICA_DIAS_RETENIDOS = 365  # Dias con agregados por dia
+    ANALITICA_DIAS_TENDENCIA = 7  # Dias de la ventana reciente (se compara con la anterior)
+    
+    # Exportacion columnar del historial (exportar_historial.py, requiere pyarrow)
+    CARPETA_HISTORIAL_COLUMNAR = "historial_columnar"
+    FORMATO_HISTORIAL_COLUMNAR = "parquet"  # 'parquet' o 'feather'
     
     # Configuracion de visualizaciones
     TAMAÑO_FIGURA_DEFAULT = (10, 6)
@@ -58,8 +108,131 @@ class ConfiguracionSistema:
     
     # Factores de penalizacion
     PENALIZACION_TEMPERATURA = 5
+    PENALIZACION_TEMPERATURA_ALTA = 3
     PENALIZACION_HUMEDAD = 0.5
     PENALIZACION_TEMPORADA = 15
+    UMBRAL_DIFERENCIA_HUMEDAD = 20
+    
+    # Balance hidrico del suelo (balance_hidrico.py)
+    CAPACIDAD_SUELO_MM = 100  # Agua util de la zona de raices
+    HUMEDAD_SUELO_INICIAL = 0.8  # Fraccion de la capacidad al iniciar la simulacion
+    DRENAJE_DIARIO_MM = 25  # Encharcamiento que drena por dia
+    AMPLITUD_TERMICA_CLIMATOLOGIA = 8.0  # Tmax - Tmin tipica para estimar ET0
+    # Agua minima (fraccion de la capacidad) antes de estres por sequia
+    FRACCION_ESTRES_SEQUIA = {'baja': 0.6, 'media': 0.45, 'alta': 0.3}
+    # Encharcamiento maximo (mm) antes de estres por exceso de lluvia
+    ENCHARCAMIENTO_MAXIMO = {'baja': 10, 'media': 25, 'alta': 50}
+    
+    # Riesgos del pronostico: dias de estres tolerados antes de alertar
+    UMBRAL_DIAS_INUNDACION = 0
+    UMBRAL_DIAS_SEQUIA = 0
+    DIAS_RIESGO_ALTO = 2  # Desde cuantos dias de estres el riesgo es ALTO
+    
+    # Riesgo de hongos por horas de humedad (riesgo_enfermedades.py)
+    HUMEDAD_HOJA_MOJADA = 90  # % de humedad a partir del cual se asume hoja mojada
+    TEMP_HONGOS_MINIMA = 15  # Rango de temperatura favorable a los hongos
+    TEMP_HONGOS_MAXIMA = 30
+    VENTANA_HONGOS_HORAS = 24
+    INDICE_HONGOS_MEDIO = 40  # % de horas mojadas en la peor ventana
+    INDICE_HONGOS_ALTO = 75
+    
+    # Planificador de rotacion (rotacion_cultivos.py)
+    ROTACION_HORIZONTE_SEMANAS = 52
+    ROTACION_BONO = 15  # Puntos extra para las rotaciones recomendadas en el dataset
+    ROTACION_PENALIZACION_REPETIR = 10  # Puntos menos por repetir el mismo cultivo
+    
+    # Simulacion Monte Carlo (simulacion_montecarlo.py)
+    MC_TRAYECTORIAS = 1000
+    MC_TAMAÑO_BLOQUE = 500  # Trayectorias en memoria a la vez
+    MC_DESVIACION_TEMPERATURA = 1.0  # grados C
+    MC_PERSISTENCIA_TEMPERATURA = 0.8  # Autocorrelacion diaria de la anomalia
+    MC_FORMA_GAMMA_LLUVIA = 0.8  # Variabilidad diaria de la lluvia
+    MC_DESVIACION_LLUVIA_TEMPORADA = 0.25  # Variabilidad de la lluvia de toda la temporada
+    MC_BLOQUE_BOOTSTRAP_DIAS = 10
+    MC_FRACCION_ESTRES_MAXIMA = 0.1  # Fraccion del ciclo con sequia o inundacion tolerada para considerar exito
+    
+    # Asignacion de tierras (asignacion_tierras.py)
+    ASIGNACION_FRACCION_MAXIMA = 0.5  # Parte maxima de la finca para un solo cultivo
+    ASIGNACION_ITERACIONES = 60  # Pasos de biseccion del precio del agua
+    
+    # Clima tipico mensual (enero a diciembre) para la idoneidad por mes
+    CLIMA_MENSUAL_PANAMA = {
+        'temperatura': [27.2, 27.6, 28.1, 28.4, 27.9, 27.5, 27.5, 27.4, 27.0, 26.8, 26.8, 27.0],
+        'humedad': [73, 70, 69, 74, 83, 85, 84, 85, 86, 87, 86, 80]
+    }
+    
+    # Optimizador de fechas de siembra (ventanas_siembra.py)
+    PESO_AGUA_SIEMBRA = 0.6  # El resto del puntaje corresponde a la temperatura
+    
+    # Grados-dia de crecimiento (grados_dia.py)
+    TEMPERATURA_REFERENCIA_GDD = 27.0  # Media tipica de tierras bajas; a esta temperatura el ciclo dura duracion_dias
+    GDD_HORIZONTE_DIAS = 730
+    
+    # Evapotranspiracion y riego (evapotranspiracion.py)
+    LATITUD_DEFAULT = 8.5  # Centro de Panama, para ciudades sin latitud conocida
+    LATITUDES_CIUDADES = {
+        "Panama City": 8.98,
+        "San Miguelito": 9.03,
+        "David": 8.43,
+        "Santiago": 8.10,
+        "Chitre": 7.96,
+        "Colon": 9.36,
+        "Las Tablas": 7.77,
+        "Arraijan": 8.95,
+        "La Chorrera": 8.88,
+        "Pacora": 9.08
+    }
+    # Coeficiente de cultivo (Kc) de la etapa media, FAO-56
+    KC_DEFAULT = 1.0
+    KC_CULTIVOS = {
+        'maiz': 1.20,
+        'arroz': 1.20,
+        'tomate': 1.15,
+        'yuca': 0.80,
+        'frijol': 1.15,
+        'platano': 1.10,
+        'cebolla': 1.05,
+        'sandia': 1.00
+    }
+    FRACCION_LLUVIA_EFECTIVA = 0.8
+    
+    # Reglas declarativas de evaluacion de cultivos
+    # Se compilan una vez en evaluadores vectorizados (ver reglas_evaluacion.py).
+    # Tipos: 'minimo' (valor < limite), 'maximo' (valor > limite),
+    # 'desviacion' (|valor - referencia| > umbral) y 'temporada' (mes fuera de temporada)
+    REGLAS_EVALUACION = [
+        {'nombre': 'temperatura_baja', 'grupo': 'temperatura', 'variable': 'temperatura',
+         'tipo': 'minimo', 'limite': 'temp_minima', 'penalizacion': PENALIZACION_TEMPERATURA},
+        {'nombre': 'temperatura_alta', 'grupo': 'temperatura', 'variable': 'temperatura',
+         'tipo': 'maximo', 'limite': 'temp_maxima', 'penalizacion': PENALIZACION_TEMPERATURA_ALTA},
+        {'nombre': 'humedad', 'grupo': 'humedad', 'variable': 'humedad',
+         'tipo': 'desviacion', 'referencia': 'humedad_optima', 'umbral': UMBRAL_DIFERENCIA_HUMEDAD,
+         'penalizacion': PENALIZACION_HUMEDAD},
+        {'nombre': 'temporada', 'grupo': 'temporada', 'variable': 'mes',
+         'tipo': 'temporada', 'penalizacion': PENALIZACION_TEMPORADA},
+    ]
+    
+    # Reglas de riesgo sobre los indicadores del pronostico
+    REGLAS_RIESGO = [
+        {'nombre': 'inundacion', 'variable': 'dias_inundacion', 'tipo': 'maximo',
+         'umbral': UMBRAL_DIAS_INUNDACION},
+        {'nombre': 'sequia', 'variable': 'dias_sequia', 'tipo': 'maximo',
+         'umbral': UMBRAL_DIAS_SEQUIA},
+        {'nombre': 'calor', 'variable': 'temp_max', 'tipo': 'maximo', 'limite': 'temp_maxima'},
+        {'nombre': 'frio', 'variable': 'temp_min', 'tipo': 'minimo', 'limite': 'temp_minima'},
+    ]
+    
+    # Meses del año en español (indice 0 = enero)
+    MESES = [
+        'enero', 'febrero', 'marzo', 'abril', 'mayo', 'junio',
+        'julio', 'agosto', 'septiembre', 'octubre', 'noviembre', 'diciembre'
+    ]
+    
+    # Rejilla de la tabla precalculada de idoneidad
+    TABLA_TEMP_MINIMA = -10.0  # grados C
+    TABLA_TEMP_MAXIMA = 60.0
+    TABLA_PASO_TEMPERATURA = 0.1
+    TABLA_PASO_HUMEDAD = 1.0  # porcentaje
     
     # Mensajes del sistema
     MENSAJES = {
@@ -87,12 +260,7 @@ class ConfiguracionSistema:
     @classmethod
     def obtener_mes_actual(cls):
         """Retorna el mes actual en español"""
-        meses = {
-            1: 'enero', 2: 'febrero', 3: 'marzo', 4: 'abril',
-            5: 'mayo', 6: 'junio', 7: 'julio', 8: 'agosto',
-            9: 'septiembre', 10: 'octubre', 11: 'noviembre', 12: 'diciembre'
-        }
-        return meses[datetime.now().month]
+        return cls.MESES[datetime.now().month - 1]
     
     @classmethod
     def validar_archivos_requeridos(cls):
@@ -0,0 +1,116 @@
+# escritor_diferido.py
+"""
+Escritura diferida por lotes
+Acumula registros en memoria y los escribe por lotes desde un hilo, al
+llegar a un numero de filas, despues de un tiempo maximo o al cerrar
+"""
+
+import atexit
+import threading
+
+from config import ConfiguracionSistema
+
+
+class EscritorDiferido:
+    """
+    Cola de registros que un hilo en segundo plano entrega por lotes a
+    una funcion de escritura
+    
+    Los lotes se escriben en el orden en que llegaron. Si una escritura
+    falla, sus filas vuelven al inicio de la cola para el siguiente intento.
+    """
+    
+    def __init__(self, escribir_lote, max_filas=None, intervalo=None):
+        """
+        Args:
+            escribir_lote (callable): Recibe una lista de filas y las guarda
+            max_filas (int): Filas pendientes que disparan una escritura
+            intervalo (float): Segundos maximos que una fila espera en memoria
+        """
+        self.escribir_lote = escribir_lote
+        self.max_filas = max_filas or ConfiguracionSistema.HISTORIAL_LOTE_FILAS
+        self.intervalo = intervalo or ConfiguracionSistema.HISTORIAL_LOTE_SEGUNDOS
+        
+        self._pendientes = []
+        self._condicion = threading.Condition()
+        self._lock_escritura = threading.Lock()
+        self._cerrado = False
+        self.lotes_escritos = 0
+        self.filas_escritas = 0
+        
+        self._hilo = threading.Thread(target=self._ciclo, name='escritor-diferido', daemon=True)
+        self._hilo.start()
+        
+        # Red de seguridad si el programa termina sin llamar a cerrar()
+        atexit.register(self.cerrar)
+    
+    def agregar(self, fila):
+        """Encola una fila; despues de cerrar se escribe de inmediato"""
+        with self._condicion:
+            if not self._cerrado:
+                self._pendientes.append(fila)
+                if len(self._pendientes) >= self.max_filas:
+                    self._condicion.notify()
+                return
+        
+        self.escribir_lote([fila])
+    
+    def pendientes(self):
+        """Numero de filas que aun no se escriben"""
+        with self._condicion:
+            return len(self._pendientes)
+    
+    def _ciclo(self):
+        """Hilo de fondo: espera filas suficientes o el intervalo y escribe"""
+        while True:
+            with self._condicion:
+                if not self._cerrado and len(self._pendientes) < self.max_filas:
+                    self._condicion.wait(self.intervalo)
+                if self._cerrado:
+                    return
+            
+            if not self.vaciar():
+                # Reintentar despues del intervalo sin ocupar el procesador
+                with self._condicion:
+                    self._condicion.wait(self.intervalo)
+    
+    def vaciar(self):
+        """
+        Escribe ahora todo lo pendiente
+        
+        Returns:
+            bool: True si no quedaron filas sin escribir
+        """
+        with self._lock_escritura:
+            with self._condicion:
+                filas, self._pendientes = self._pendientes, []
+            if not filas:
+                return True
+            
+            try:
+                self.escribir_lote(filas)
+            except Exception as error:
+                print(f"Error en escritura diferida ({len(filas)} filas pendientes): {error}")
+                with self._condicion:
+                    self._pendientes[:0] = filas
+                return False
+            
+            self.lotes_escritos += 1
+            self.filas_escritas += len(filas)
+            return True
+    
+    def cerrar(self):
+        """
+        Detiene el hilo y escribe lo pendiente antes de retornar
+        
+        Returns:
+            bool: True si no quedaron filas sin escribir
+        """
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify()
+        if self._hilo.is_alive() and self._hilo is not threading.current_thread():
+            self._hilo.join()
+        
+        atexit.unregister(self.cerrar)
+        return self.vaciar()
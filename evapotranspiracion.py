@@ -0,0 +1,230 @@
+# evapotranspiracion.py
+"""
+Evapotranspiracion y necesidades de riego
+Calcula ET0 (Hargreaves) sobre los pronosticos de todas las ciudades y la
+convierte en riego diario por cultivo con coeficientes Kc
+"""
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+
+
+LITROS_POR_MM_HECTAREA = 10000
+
+INTERVALOS_DIA = 8  # Pronostico cada 3 horas
+
+
+def radiacion_extraterrestre(latitudes, dias_año):
+    """
+    Radiacion extraterrestre Ra (FAO-56, ec. 21) en mm/dia equivalentes
+    
+    Args:
+        latitudes (ndarray): Latitud de cada ciudad en grados
+        dias_año (ndarray): Dia juliano (1-366)
+    
+    Returns:
+        ndarray: Ra, matriz ciudades x dias
+    """
+    phi = np.radians(np.asarray(latitudes, dtype=float))[:, np.newaxis]
+    angulo = 2 * np.pi * np.asarray(dias_año, dtype=float)[np.newaxis, :] / 365
+    
+    distancia = 1 + 0.033 * np.cos(angulo)
+    declinacion = 0.409 * np.sin(angulo - 1.39)
+    angulo_puesta = np.arccos(np.clip(-np.tan(phi) * np.tan(declinacion), -1, 1))
+    
+    ra_mj = (24 * 60 / np.pi) * 0.0820 * distancia * (
+        angulo_puesta * np.sin(phi) * np.sin(declinacion)
+        + np.cos(phi) * np.cos(declinacion) * np.sin(angulo_puesta)
+    )
+    return 0.408 * ra_mj
+
+
+def et0_hargreaves(temp_min, temp_max, temp_media, ra):
+    """
+    Evapotranspiracion de referencia de Hargreaves en mm/dia
+    
+    ET0 = 0.0023 x Ra x (Tmedia + 17.8) x raiz(Tmax - Tmin)
+    """
+    amplitud = np.sqrt(np.maximum(temp_max - temp_min, 0.0))
+    return np.maximum(0.0023 * ra * (temp_media + 17.8) * amplitud, 0.0)
+
+
+def coeficientes_cultivo(cultivos):
+    """
+    Kc de cada cultivo (KC_DEFAULT si no esta en KC_CULTIVOS)
+    
+    Returns:
+        ndarray: Coeficientes en el orden de cultivos
+    """
+    config = ConfiguracionSistema
+    return np.array([config.KC_CULTIVOS.get(c, config.KC_DEFAULT) for c in cultivos])
+
+
+def arreglos_pronostico(pronosticos):
+    """
+    Agrega los pronosticos de 3 horas a valores diarios, todas las ciudades a la vez
+    
+    El primer y el ultimo dia del pronostico suelen tener solo algunos
+    intervalos: 'fraccion' es la parte del dia cubierta (intervalos / 8) y
+    'lluvia' es la de esos intervalos, no la del dia completo.
+    
+    Args:
+        pronosticos (dict): DataFrame de obtener_pronostico_5dias por ciudad
+    
+    Returns:
+        dict: 'ciudades', 'fechas' y matrices ciudades x dias 'temp_min',
+              'temp_max', 'temp_media', 'lluvia' y 'fraccion' (NaN donde no hay datos)
+    """
+    ciudades = [c for c, df in pronosticos.items() if df is not None and not df.empty]
+    if not ciudades:
+        return {'ciudades': [], 'fechas': []}
+    
+    # Se agrupa por posicion para admitir cualquier clave de ciudad (incluso None)
+    posiciones = range(len(ciudades))
+    todos = pd.concat([pronosticos[c] for c in ciudades], keys=posiciones, names=['ciudad', None])
+    diario = todos.groupby(['ciudad', 'fecha']).agg(
+        temp_min=('temp_minima', 'min'),
+        temp_max=('temp_maxima', 'max'),
+        temp_media=('temperatura', 'mean'),
+        lluvia=('lluvia_3h', 'sum'),
+        fraccion=('lluvia_3h', 'size')
+    )
+    diario['fraccion'] = np.minimum(diario['fraccion'] / INTERVALOS_DIA, 1.0)
+    
+    fechas = sorted(diario.index.get_level_values('fecha').unique())
+    arreglos = {'ciudades': ciudades, 'fechas': fechas}
+    for columna in diario.columns:
+        tabla = diario[columna].unstack('fecha').reindex(index=posiciones, columns=fechas)
+        arreglos[columna] = tabla.to_numpy(dtype=float)
+    
+    return arreglos
+
+
+def latitudes_ciudades(ciudades):
+    """Latitud de cada ciudad (LATITUD_DEFAULT si no esta configurada)"""
+    config = ConfiguracionSistema
+    return [config.LATITUDES_CIUDADES.get(c, config.LATITUD_DEFAULT) for c in ciudades]
+
+
+def et0_pronostico(datos):
+    """
+    ET0 diaria de los pronosticos agregados por arreglos_pronostico
+    
+    Los dias incompletos solo tienen algunas horas, asi que su rango de
+    temperatura no es el del dia: usan la tasa del dia completo mas cercano
+    de la ciudad, ponderada por la fraccion cubierta igual que la lluvia,
+    para que ambas correspondan a las mismas horas.
+    
+    Returns:
+        ndarray: ET0 en mm, matriz ciudades x dias
+    """
+    dias_año = pd.to_datetime(datos['fechas']).dayofyear.to_numpy()
+    ra = radiacion_extraterrestre(latitudes_ciudades(datos['ciudades']), dias_año)
+    tasa = et0_hargreaves(datos['temp_min'], datos['temp_max'], datos['temp_media'], ra)
+    
+    completa = pd.DataFrame(np.where(datos['fraccion'] >= 1.0, tasa, np.nan))
+    cercana = completa.ffill(axis=1).bfill(axis=1).to_numpy()
+    tasa = np.where(np.isnan(cercana), tasa, cercana)
+    return tasa * datos['fraccion']
+
+
+def necesidades_riego(pronosticos, cultivos=None):
+    """
+    Riego diario por ciudad y cultivo para el horizonte del pronostico
+    
+    Una sola pasada: ET0 se calcula como matriz ciudades x dias y se
+    multiplica por el vector Kc para obtener ETc de todos los cultivos. En
+    el primer y el ultimo dia solo cuentan las horas con pronostico.
+    
+    Args:
+        pronosticos (dict): DataFrame de pronostico por ciudad
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+    
+    Returns:
+        dict: 'ciudades', 'fechas', 'cultivos', 'et0' y 'lluvia_efectiva'
+              (ciudades x dias), 'etc' y 'riego' (ciudades x cultivos x dias)
+    """
+    config = ConfiguracionSistema
+    cultivos = list(cultivos or obtener_arreglos_cultivos()['claves'])
+    datos = arreglos_pronostico(pronosticos)
+    
+    if not datos['ciudades']:
+        return {'ciudades': [], 'fechas': [], 'cultivos': cultivos}
+    
+    et0 = et0_pronostico(datos)
+    etc = et0[:, np.newaxis, :] * coeficientes_cultivo(cultivos)[np.newaxis, :, np.newaxis]
+    
+    lluvia_efectiva = datos['lluvia'] * config.FRACCION_LLUVIA_EFECTIVA
+    riego = np.maximum(etc - lluvia_efectiva[:, np.newaxis, :], 0.0)
+    
+    return {
+        'ciudades': datos['ciudades'],
+        'fechas': datos['fechas'],
+        'cultivos': cultivos,
+        'et0': et0,
+        'lluvia_efectiva': lluvia_efectiva,
+        'etc': etc,
+        'riego': riego
+    }
+
+
+def tabla_riego(resultado):
+    """
+    Convierte el resultado de necesidades_riego en una tabla larga
+    
+    Returns:
+        DataFrame: ciudad, fecha, cultivo, et0, etc, lluvia_efectiva,
+                   riego_mm y riego_litros_ha (sin dias sin datos)
+    """
+    columnas = ['ciudad', 'fecha', 'cultivo', 'et0', 'etc', 'lluvia_efectiva',
+                'riego_mm', 'riego_litros_ha']
+    if not resultado['ciudades']:
+        return pd.DataFrame(columns=columnas)
+    
+    n_ciudades, n_cultivos, n_dias = resultado['riego'].shape
+    i, j, d = np.indices((n_ciudades, n_cultivos, n_dias)).reshape(3, -1)
+    
+    tabla = pd.DataFrame({
+        'ciudad': np.asarray(resultado['ciudades'])[i],
+        'fecha': np.asarray(resultado['fechas'])[d],
+        'cultivo': np.asarray(resultado['cultivos'])[j],
+        'et0': resultado['et0'][i, d],
+        'etc': resultado['etc'][i, j, d],
+        'lluvia_efectiva': resultado['lluvia_efectiva'][i, d],
+        'riego_mm': resultado['riego'][i, j, d]
+    })
+    tabla['riego_litros_ha'] = tabla['riego_mm'] * LITROS_POR_MM_HECTAREA
+    
+    return tabla.dropna(subset=['et0']).round(2).reset_index(drop=True)[columnas]
+
+
+def riego_ciudades_en_cache(clima_api, cultivos=None):
+    """
+    Necesidades de riego de todas las ciudades con pronostico en cache
+    
+    Args:
+        clima_api (ClimaAPI): Conexion con pronosticos ya consultados
+        cultivos (list): Claves de cultivos
+    
+    Returns:
+        DataFrame: Tabla de tabla_riego
+    """
+    return tabla_riego(necesidades_riego(clima_api.pronosticos_en_cache(), cultivos))
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    from conexion_clima import ClimaAPI
+    
+    clima_api = ClimaAPI()
+    for ciudad in ConfiguracionSistema.CIUDADES_PANAMA:
+        clima_api.obtener_pronostico_5dias(ciudad)
+    
+    tabla = riego_ciudades_en_cache(clima_api)
+    
+    print("=== NECESIDADES DE RIEGO (5 DIAS) ===")
+    resumen = tabla.groupby(['ciudad', 'cultivo'])['riego_mm'].sum().unstack('cultivo')
+    print(resumen.round(1))
@@ -0,0 +1,308 @@
+# exportar_historial.py
+"""
+Exportacion columnar del historial de consultas
+Convierte el CSV activo y sus segmentos mensuales en un dataset Parquet (o
+Feather) particionado por año y mes, con tipos propios en cada columna, y
+lo consulta leyendo solo las columnas y particiones necesarias
+"""
+
+import argparse
+import json
+import operator
+import os
+import shutil
+import time
+from datetime import datetime, timedelta
+from functools import reduce
+
+import pandas as pd
+
+from config import ConfiguracionSistema
+from historial import COLUMNAS_HISTORIAL, HistorialConsultas
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+COLUMNAS_CATEGORICAS = ['ciudad', 'cultivo', 'nivel', 'tipo_consulta']
+COLUMNAS_NUMERICAS = ['temperatura', 'humedad', 'puntaje']
+
+EXTENSIONES = {'parquet': '.parquet', 'feather': '.feather'}
+
+# Archivos que empiezan con '_' no forman parte del dataset
+ARCHIVO_FUENTES = '_fuentes.json'
+
+
+def _requiere_pyarrow():
+    """Error claro si falta la dependencia opcional"""
+    if pa is None:
+        raise ImportError("La exportacion columnar requiere pyarrow (pip install pyarrow)")
+
+
+def _esquema():
+    """
+    Esquema fijo del dataset
+    
+    Las columnas categoricas se guardan como diccionario con indices int32
+    para que todas las particiones compartan el mismo esquema.
+    """
+    tipos = {'fecha_hora': pa.timestamp('s')}
+    tipos.update({columna: pa.dictionary(pa.int32(), pa.string()) for columna in COLUMNAS_CATEGORICAS})
+    tipos.update({columna: pa.float32() for columna in COLUMNAS_NUMERICAS})
+    return pa.schema([(columna, tipos[columna]) for columna in COLUMNAS_HISTORIAL])
+
+
+def tipar_consultas(consultas):
+    """
+    Convierte las columnas del historial (texto) a sus tipos
+    
+    Args:
+        consultas (DataFrame): Columnas de COLUMNAS_HISTORIAL como texto
+    
+    Returns:
+        DataFrame: fecha_hora como fecha, ciudad, cultivo, nivel y tipo como
+                   categorias y los valores numericos como float32. Se
+                   descartan las filas sin fecha valida.
+    """
+    tipadas = pd.DataFrame({
+        'fecha_hora': pd.to_datetime(consultas['fecha_hora'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    })
+    for columna in COLUMNAS_CATEGORICAS:
+        tipadas[columna] = consultas[columna].fillna('').astype('category')
+    for columna in COLUMNAS_NUMERICAS:
+        tipadas[columna] = pd.to_numeric(consultas[columna], errors='coerce').astype('float32')
+    
+    return tipadas[COLUMNAS_HISTORIAL].dropna(subset=['fecha_hora'])
+
+
+def _leer_csv(ruta):
+    """Filas completas de un CSV o segmento gzip del historial, como texto"""
+    consultas = pd.read_csv(ruta, dtype=str, keep_default_na=False, usecols=COLUMNAS_HISTORIAL,
+                            on_bad_lines='skip')
+    # Una ultima linea a medio escribir queda sin tipo de consulta
+    return consultas.dropna(subset=['tipo_consulta'])
+
+
+def _mes_segmento(ruta):
+    """Mes ('AAAA-MM') de un segmento consultas_AAAA-MM.csv.gz"""
+    return os.path.basename(ruta)[10:17]
+
+
+def _leer_fuentes(destino):
+    """Registro de la ultima exportacion: formato y firma de cada fuente"""
+    ruta = os.path.join(destino, ARCHIVO_FUENTES)
+    if not os.path.exists(ruta):
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def _escribir_particion(consultas, destino, mes, formato):
+    """Reemplaza el archivo de la particion año=AAAA/mes=M"""
+    año, numero = mes.split('-')
+    carpeta = os.path.join(destino, f"año={int(año)}", f"mes={int(numero)}")
+    os.makedirs(carpeta, exist_ok=True)
+    
+    tabla = pa.Table.from_pandas(consultas.sort_values('fecha_hora'), schema=_esquema(), preserve_index=False)
+    temporal = os.path.join(carpeta, '_escribiendo' + EXTENSIONES[formato])
+    if formato == 'parquet':
+        pq.write_table(tabla, temporal)
+    else:
+        feather.write_feather(tabla, temporal)
+    os.replace(temporal, os.path.join(carpeta, 'consultas' + EXTENSIONES[formato]))
+
+
+def exportar_historial(archivo_csv=None, destino=None, formato=None, completo=False):
+    """
+    Exporta el historial a un dataset columnar particionado por año y mes
+    
+    Solo se reescriben los meses cuyas fuentes cambiaron desde la ultima
+    exportacion (su segmento mensual o sus consultas en el CSV activo). Los
+    meses cuyos segmentos ya se compactaron en resumen diario conservan en
+    el dataset todo su detalle.
+    
+    Args:
+        archivo_csv (str): CSV activo del historial (por defecto ARCHIVO_HISTORIAL)
+        destino (str): Carpeta del dataset (por defecto CARPETA_HISTORIAL_COLUMNAR)
+        formato (str): 'parquet' o 'feather' (por defecto FORMATO_HISTORIAL_COLUMNAR)
+        completo (bool): Borrar el dataset y exportar todo de nuevo
+    
+    Returns:
+        dict: Meses reescritos, consultas exportadas y segundos
+    """
+    _requiere_pyarrow()
+    config = ConfiguracionSistema
+    archivo_csv = archivo_csv or config.ARCHIVO_HISTORIAL
+    destino = destino or config.CARPETA_HISTORIAL_COLUMNAR
+    formato = formato or config.FORMATO_HISTORIAL_COLUMNAR
+    if formato not in EXTENSIONES:
+        raise ValueError(f"Formato de exportacion desconocido: {formato}")
+    
+    inicio = time.perf_counter()
+    registro = _leer_fuentes(destino)
+    if registro.get('formato', formato) != formato:
+        completo = True  # No mezclar formatos en un mismo dataset
+    if completo and os.path.isdir(destino):
+        shutil.rmtree(destino)
+        registro = {}
+    os.makedirs(destino, exist_ok=True)
+    
+    historial = HistorialConsultas(archivo_csv, escritura_diferida=False)
+    segmentos = {_mes_segmento(ruta): ruta for ruta in historial.segmentos()}
+    
+    firmas = {}
+    for ruta in list(segmentos.values()) + [archivo_csv]:
+        estado = os.stat(ruta)
+        firmas[ruta] = [estado.st_size, estado.st_mtime_ns]
+    cambiadas = [ruta for ruta, firma in firmas.items() if registro.get('fuentes', {}).get(ruta) != firma]
+    
+    # El CSV activo es pequeño: se lee siempre para saber sus meses
+    activo = _leer_csv(archivo_csv)
+    activo_mes = activo['fecha_hora'].str[:7]
+    
+    meses = set()
+    for ruta in cambiadas:
+        if ruta == archivo_csv:
+            meses.update(activo_mes.unique())
+        else:
+            meses.add(_mes_segmento(ruta))
+    
+    exportadas = 0
+    reescritos = []
+    for mes in sorted(meses):
+        partes = [activo[activo_mes == mes]]
+        if mes in segmentos:
+            partes.insert(0, _leer_csv(segmentos[mes]))
+        consultas = tipar_consultas(pd.concat(partes, ignore_index=True))
+        if consultas.empty:
+            continue
+        
+        _escribir_particion(consultas, destino, mes, formato)
+        exportadas += len(consultas)
+        reescritos.append(mes)
+    
+    with open(os.path.join(destino, ARCHIVO_FUENTES), 'w', encoding='utf-8') as archivo:
+        json.dump({'formato': formato, 'fuentes': firmas}, archivo, indent=2)
+    
+    return {
+        'meses': reescritos,
+        'consultas': exportadas,
+        'segundos': time.perf_counter() - inicio
+    }
+
+
+def _abrir_dataset(destino):
+    """Dataset columnar exportado, con las particiones año/mes"""
+    if not os.path.exists(os.path.join(destino, ARCHIVO_FUENTES)):
+        raise FileNotFoundError(f"No hay historial exportado en {destino} (ejecute exportar_historial)")
+    
+    formato = _leer_fuentes(destino)['formato']
+    return ds.dataset(destino, format=formato, partitioning='hive')
+
+
+def _leer_tabla(columnas, desde=None, hasta=None, ciudades=None, cultivos=None, destino=None):
+    """
+    Tabla de Arrow con las columnas pedidas y las filas que pasan los filtros
+    
+    El rango de fechas descarta meses completos por su particion antes de
+    abrir los archivos; el resto de los filtros se aplica al leer.
+    """
+    _requiere_pyarrow()
+    dataset = _abrir_dataset(destino or ConfiguracionSistema.CARPETA_HISTORIAL_COLUMNAR)
+    año, mes, fecha = ds.field('año'), ds.field('mes'), ds.field('fecha_hora')
+    
+    condiciones = []
+    if desde is not None:
+        desde = pd.Timestamp(desde)
+        condiciones.append((año > desde.year) | ((año == desde.year) & (mes >= desde.month)))
+        condiciones.append(fecha >= pa.scalar(desde.to_pydatetime(), pa.timestamp('s')))
+    if hasta is not None:
+        hasta = pd.Timestamp(hasta)
+        condiciones.append((año < hasta.year) | ((año == hasta.year) & (mes <= hasta.month)))
+        condiciones.append(fecha < pa.scalar(hasta.to_pydatetime(), pa.timestamp('s')))
+    if ciudades:
+        condiciones.append(ds.field('ciudad').isin(list(ciudades)))
+    if cultivos:
+        condiciones.append(ds.field('cultivo').isin(list(cultivos)))
+    
+    return dataset.to_table(columns=list(columnas),
+                            filter=reduce(operator.and_, condiciones) if condiciones else None)
+
+
+def consultar_historial(columnas=None, desde=None, hasta=None, ciudades=None, cultivos=None, destino=None):
+    """
+    Lee del dataset columnar solo las columnas y particiones necesarias
+    
+    Args:
+        columnas (list): Columnas a leer (por defecto COLUMNAS_HISTORIAL)
+        desde (datetime): Fecha y hora minima (incluida)
+        hasta (datetime): Fecha y hora maxima (excluida)
+        ciudades (list): Ciudades a incluir (por defecto todas)
+        cultivos (list): Cultivos a incluir (por defecto todos)
+        destino (str): Carpeta del dataset (por defecto CARPETA_HISTORIAL_COLUMNAR)
+    
+    Returns:
+        DataFrame: Consultas con sus tipos (ciudad y cultivo como categorias)
+    """
+    return _leer_tabla(columnas or COLUMNAS_HISTORIAL, desde, hasta, ciudades, cultivos, destino).to_pandas()
+
+
+def resumir_consultas(por='ciudad', desde=None, hasta=None, destino=None):
+    """
+    Consultas y promedios por grupo, leyendo solo las columnas usadas
+    
+    La agrupacion se hace en Arrow, sin pasar las filas a pandas.
+    
+    Args:
+        por (str o list): Columnas de agrupacion ('ciudad', 'cultivo', 'nivel', 'tipo_consulta')
+        desde (datetime): Fecha y hora minima (incluida)
+        hasta (datetime): Fecha y hora maxima (excluida)
+        destino (str): Carpeta del dataset (por defecto CARPETA_HISTORIAL_COLUMNAR)
+    
+    Returns:
+        DataFrame: Por grupo, consultas y promedios de temperatura, humedad y puntaje
+    """
+    por = [por] if isinstance(por, str) else list(por)
+    tabla = _leer_tabla(por + COLUMNAS_NUMERICAS, desde, hasta, destino=destino)
+    
+    agregados = [(por[0], 'count', pc.CountOptions(mode='all'))]
+    agregados += [(columna, 'mean') for columna in COLUMNAS_NUMERICAS]
+    resumen = tabla.group_by(por).aggregate(agregados).to_pandas()
+    
+    resumen = resumen.rename(columns={f"{por[0]}_count": 'consultas'})
+    resumen = resumen.rename(columns={f"{c}_mean": f"{c}_promedio" for c in COLUMNAS_NUMERICAS})
+    resumen[por] = resumen[por].astype(str)
+    resumen = resumen[por + ['consultas'] + [f"{c}_promedio" for c in COLUMNAS_NUMERICAS]]
+    return resumen.round(1).sort_values('consultas', ascending=False).reset_index(drop=True)
+
+
+def main():
+    """Exporta el historial y muestra un resumen desde la linea de comandos"""
+    parser = argparse.ArgumentParser(description='Exportacion columnar del historial de consultas')
+    parser.add_argument('--csv', help='CSV activo del historial (por defecto ARCHIVO_HISTORIAL)')
+    parser.add_argument('--destino', help='Carpeta del dataset (por defecto CARPETA_HISTORIAL_COLUMNAR)')
+    parser.add_argument('--formato', choices=sorted(EXTENSIONES), help='Formato de los archivos')
+    parser.add_argument('--completo', action='store_true', help='Exportar todo de nuevo')
+    parser.add_argument('--resumen', default='ciudad', help='Columna para resumir el ultimo año')
+    args = parser.parse_args()
+    
+    resultado = exportar_historial(args.csv, args.destino, args.formato, args.completo)
+    print(f"Meses reescritos: {len(resultado['meses'])} ({resultado['consultas']} consultas) "
+          f"en {resultado['segundos']:.2f} s")
+    
+    inicio = time.perf_counter()
+    resumen = resumir_consultas(args.resumen, desde=datetime.now() - timedelta(days=365), destino=args.destino)
+    duracion = (time.perf_counter() - inicio) * 1000
+    
+    print(f"\nConsultas del ultimo año por {args.resumen} ({duracion:.1f} ms):")
+    print(resumen.to_string(index=False) if not resumen.empty else "Sin consultas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# grados_dia.py
+"""
+Motor de grados-dia de crecimiento (GDD)
+Predice la fecha de cosecha de cada parcela acumulando grados-dia sobre
+series de temperatura (pronostico + climatologia) en lugar de usar solo duracion_dias
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+
+
+def requerimiento_grados_dia(indices=None):
+    """
+    Grados-dia que necesita cada cultivo para madurar
+    
+    Se calibra para que, a la temperatura de referencia, el ciclo dure
+    exactamente duracion_dias: duracion x (min(T_ref, optima) - minima).
+    
+    Args:
+        indices (ndarray): Indices de cultivos en el catalogo (todos por defecto)
+    
+    Returns:
+        ndarray: Grados-dia requeridos por cultivo
+    """
+    arreglos = obtener_arreglos_cultivos()
+    if indices is None:
+        indices = np.arange(len(arreglos['claves']))
+    
+    referencia = np.minimum(ConfiguracionSistema.TEMPERATURA_REFERENCIA_GDD,
+                            arreglos['temp_optima'][indices])
+    return arreglos['duracion_dias'][indices] * (referencia - arreglos['temp_minima'][indices])
+
+
+def grados_dia_diarios(temperaturas, temp_base, temp_tope):
+    """
+    Grados-dia de cada dia con corte horizontal en la temperatura optima
+    
+    Args:
+        temperaturas (ndarray): Temperatura media diaria, ... x dias
+        temp_base (ndarray): temp_minima, con forma compatible
+        temp_tope (ndarray): temp_optima, con forma compatible
+    
+    Returns:
+        ndarray: max(min(T, tope) - base, 0)
+    """
+    return np.maximum(np.minimum(temperaturas, temp_tope) - temp_base, 0.0)
+
+
+def construir_serie(climatologia, fecha_inicio, dias, pronosticos=None):
+    """
+    Serie diaria de temperatura por ciudad: pronostico primero y luego climatologia
+    
+    Args:
+        climatologia (dict): 'ciudades' y 'temperatura' (ciudades x 365),
+                             como en ventanas_siembra.climatologia_desde_dataframe
+        fecha_inicio (datetime): Primer dia de la serie
+        dias (int): Largo de la serie
+        pronosticos (dict): Temperaturas medias diarias por ciudad que
+                            reemplazan los primeros dias de la climatologia
+    
+    Returns:
+        ndarray: Temperaturas ciudades x dias
+    """
+    dia_año = fecha_inicio.timetuple().tm_yday - 1
+    indices = (dia_año + np.arange(dias)) % 365
+    serie = np.asarray(climatologia['temperatura'], dtype=float)[:, indices]
+    
+    for i, ciudad in enumerate(climatologia['ciudades']):
+        pronostico = (pronosticos or {}).get(ciudad)
+        if pronostico is not None and len(pronostico):
+            n = min(len(pronostico), dias)
+            serie[i, :n] = np.asarray(pronostico, dtype=float)[:n]
+    
+    return serie
+
+
+def predecir_cosechas(temperaturas, ciudades, cultivos, dias_siembra):
+    """
+    Dias hasta la cosecha para muchas parcelas a la vez
+    
+    Acumula grados-dia con una suma acumulada por cada par (ciudad, cultivo)
+    presente en las parcelas y encuentra el dia de madurez con una sola
+    busqueda binaria: las filas se concatenan con un desplazamiento creciente
+    para que el arreglo plano siga ordenado. Cultivos desconocidos, ciudades
+    fuera de la serie o siembras fuera de 0..dias de la serie dan ValueError.
+    
+    Args:
+        temperaturas (ndarray): Serie ciudades x dias (ver construir_serie)
+        ciudades (array): Indice de ciudad de cada parcela
+        cultivos (array): Clave de cultivo de cada parcela
+        dias_siembra (array): Dia de siembra de cada parcela (indice en la serie)
+    
+    Returns:
+        ndarray: Dias de ciclo por parcela (NaN si no madura dentro de la serie)
+    """
+    arreglos = obtener_arreglos_cultivos()
+    posicion = {clave: i for i, clave in enumerate(arreglos['claves'])}
+    n_ciudades, n_dias = temperaturas.shape
+    
+    desconocidos = sorted({c for c in cultivos if c not in posicion})
+    if desconocidos:
+        raise ValueError(f"Cultivos desconocidos: {', '.join(map(str, desconocidos))}")
+    
+    ciudades = np.asarray(ciudades, dtype=int)
+    if ((ciudades < 0) | (ciudades >= n_ciudades)).any():
+        raise ValueError(f"Indices de ciudad fuera de la serie (0 a {n_ciudades - 1})")
+    
+    dias_siembra = np.asarray(dias_siembra, dtype=int)
+    if ((dias_siembra < 0) | (dias_siembra > n_dias)).any():
+        raise ValueError(f"Dias de siembra fuera de la serie (0 a {n_dias}); amplie el horizonte")
+    
+    indices_cultivo = np.array([posicion[c] for c in cultivos], dtype=int)
+    
+    # Solo los pares (ciudad, cultivo) que aparecen en las parcelas
+    pares, fila_parcela = np.unique(ciudades * len(posicion) + indices_cultivo, return_inverse=True)
+    ciudad_par, cultivo_par = np.divmod(pares, len(posicion))
+    
+    diarios = grados_dia_diarios(temperaturas[ciudad_par],
+                                 arreglos['temp_minima'][cultivo_par, np.newaxis],
+                                 arreglos['temp_optima'][cultivo_par, np.newaxis])
+    acumulados = np.concatenate([np.zeros((len(pares), 1)), np.cumsum(diarios, axis=1)], axis=1)
+    
+    # Desplazamiento por fila mayor que cualquier acumulado para aplanar sin perder el orden
+    desplazamiento = acumulados[:, -1].max() + 1.0
+    base = np.arange(len(pares))[:, np.newaxis] * desplazamiento
+    plano = (acumulados + base).ravel()
+    
+    objetivo = (acumulados[fila_parcela, dias_siembra]
+                + requerimiento_grados_dia(indices_cultivo)
+                + base[fila_parcela, 0])
+    encontrado = np.searchsorted(plano, objetivo, side='left') - fila_parcela * (n_dias + 1)
+    
+    dias_ciclo = (encontrado - dias_siembra).astype(float)
+    dias_ciclo[encontrado > n_dias] = np.nan
+    return dias_ciclo
+
+
+def calendario_cosechas(parcelas, climatologia, fecha_inicio=None, dias=None, pronosticos=None):
+    """
+    Calendario de cosechas esperadas para una tabla de parcelas
+    
+    Args:
+        parcelas (DataFrame): Columnas ciudad, cultivo y fecha_siembra
+        climatologia (dict): Climatologia diaria por ciudad
+        fecha_inicio (datetime): Inicio de la serie (por defecto la siembra mas temprana)
+        dias (int): Horizonte de la serie (por defecto GDD_HORIZONTE_DIAS)
+        pronosticos (dict): Temperaturas medias diarias de pronostico por ciudad
+    
+    Returns:
+        DataFrame: Parcelas con fecha_cosecha, dias_ciclo, duracion_catalogo y diferencia_dias
+    """
+    siembras = pd.to_datetime(parcelas['fecha_siembra'])
+    fecha_inicio = fecha_inicio or siembras.min().to_pydatetime()
+    dias = dias or ConfiguracionSistema.GDD_HORIZONTE_DIAS
+    
+    temperaturas = construir_serie(climatologia, fecha_inicio, dias, pronosticos)
+    indice_ciudad = {ciudad: i for i, ciudad in enumerate(climatologia['ciudades'])}
+    
+    dias_ciclo = predecir_cosechas(
+        temperaturas,
+        parcelas['ciudad'].map(indice_ciudad).to_numpy(),
+        parcelas['cultivo'].to_numpy(),
+        (siembras - pd.Timestamp(fecha_inicio)).dt.days.to_numpy()
+    )
+    
+    arreglos = obtener_arreglos_cultivos()
+    duracion = dict(zip(arreglos['claves'], arreglos['duracion_dias']))
+    
+    calendario = parcelas.copy()
+    calendario['dias_ciclo'] = dias_ciclo
+    calendario['fecha_cosecha'] = siembras + pd.to_timedelta(dias_ciclo, unit='D')
+    calendario['duracion_catalogo'] = calendario['cultivo'].map(duracion).astype(int)
+    calendario['diferencia_dias'] = calendario['dias_ciclo'] - calendario['duracion_catalogo']
+    return calendario
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    
+    dias_año = np.arange(365)
+    ciudades = ConfiguracionSistema.CIUDADES_PANAMA
+    climatologia = {
+        'ciudades': ciudades,
+        'temperatura': (27 + 1.5 * np.cos((dias_año - 90) / 365 * 2 * np.pi)
+                        - np.linspace(0, 6, len(ciudades))[:, np.newaxis])
+    }
+    
+    # 10.000 parcelas aleatorias sembradas durante el proximo año
+    rng = np.random.default_rng(0)
+    n = 10000
+    hoy = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    parcelas = pd.DataFrame({
+        'ciudad': rng.choice(ciudades, n),
+        'cultivo': rng.choice(obtener_arreglos_cultivos()['claves'], n),
+        'fecha_siembra': [hoy + timedelta(days=int(d)) for d in rng.integers(0, 365, n)]
+    })
+    
+    inicio = time.perf_counter()
+    calendario = calendario_cosechas(parcelas, climatologia, fecha_inicio=hoy)
+    duracion = time.perf_counter() - inicio
+    
+    print("=== CALENDARIO DE COSECHAS (GRADOS-DIA) ===")
+    print(calendario.head(10).to_string(index=False))
+    print(f"\n{n} parcelas calculadas en {duracion * 1000:.1f} ms")
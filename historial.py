@@ -2,12 +2,168 @@
 """
 Sistema de historial de consultas simplificado
 Guarda y recupera consultas de usuarios
+
+Las consultas recientes estan en el CSV activo; las anteriores se archivan
+por mes en segmentos gzip y, pasado HISTORIAL_MESES_SEGMENTOS, se resumen
+por dia en resumen_diario.csv
 """
 
+import argparse
 import csv
+import glob
+import gzip
+import io
+import json
 import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime
 
+from config import ConfiguracionSistema
+from escritor_diferido import EscritorDiferido
+
+try:
+    import fcntl  # Bloqueos entre procesos (Linux, macOS)
+except ImportError:
+    fcntl = None
+
+
+COLUMNAS_HISTORIAL = [
+    'fecha_hora', 'ciudad', 'cultivo', 'temperatura',
+    'humedad', 'puntaje', 'nivel', 'tipo_consulta'
+]
+
+COLUMNAS_RESUMEN = [
+    'fecha', 'ciudad', 'cultivo', 'tipo_consulta', 'consultas',
+    'temperatura_promedio', 'humedad_promedio', 'puntaje_promedio'
+]
+
+
+def fecha_historial(valor):
+    """Fecha como se guarda en el historial ('AAAA-MM-DD HH:MM:SS'); el texto se deja igual"""
+    if isinstance(valor, datetime):
+        return valor.strftime('%Y-%m-%d %H:%M:%S')
+    return str(valor)
+
+
+def nueva_generacion():
+    """Identificador de una generacion del historial (cambia cada vez que se vacia)"""
+    return uuid.uuid4().hex
+
+
+class EstadoJSON:
+    """
+    Datos guardados en un JSON con reemplazo atomico
+    
+    Recuerda la version del archivo que cargo o guardo para saber si otro
+    proceso lo guardo despues (guardado_por_otro).
+    """
+    
+    def __init__(self, archivo_json, iniciales=None):
+        """
+        Args:
+            archivo_json (str): Archivo donde se guardan los datos
+            iniciales (callable): Devuelve los datos vacios (por defecto el metodo iniciales)
+        """
+        self.archivo_json = archivo_json
+        if iniciales is not None:
+            self.iniciales = iniciales
+        self.cargar()
+    
+    def iniciales(self):
+        """Datos vacios"""
+        return {}
+    
+    def cargar(self):
+        """Lee los datos guardados (vacios si no hay archivo valido)"""
+        self.reiniciar()
+        self._firma = self._firma_archivo()
+        if self._firma is None:
+            return
+        
+        try:
+            with open(self.archivo_json, 'r', encoding='utf-8') as archivo:
+                self.datos.update(json.load(archivo))
+        except (OSError, ValueError) as error:
+            print(f"Datos no validos en {self.archivo_json}, se recalculan: {error}")
+            self.reiniciar()
+    
+    def _firma_archivo(self):
+        """Identifica la version guardada del JSON (None si no existe)"""
+        try:
+            estado = os.stat(self.archivo_json)
+        except FileNotFoundError:
+            return None
+        return (estado.st_ino, estado.st_size, estado.st_mtime_ns)
+    
+    def guardado_por_otro(self):
+        """True si otro proceso guardo despues de la ultima carga o guardado propio"""
+        return self._firma_archivo() != self._firma
+    
+    def reiniciar(self):
+        """Deja los datos vacios"""
+        self.datos = self.iniciales()
+    
+    def guardar(self):
+        """
+        Escribe los datos (reemplazo atomico del archivo)
+        
+        Cada proceso usa su propio temporal; gana el ultimo en reemplazar.
+        """
+        temporal = f"{self.archivo_json}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, 'w', encoding='utf-8') as archivo:
+                json.dump(self.datos, archivo, ensure_ascii=False)
+            os.replace(temporal, self.archivo_json)
+            self._firma = self._firma_archivo()
+        except OSError as error:
+            print(f"Error al guardar {self.archivo_json}: {error}")
+
+
+class ContadoresHistorial(EstadoJSON):
+    """
+    Contadores acumulados del historial (total, por ciudad, cultivo, tipo y
+    dia) guardados en un JSON junto al archivo de historial
+    
+    'posicion' indica hasta donde del historial estan contadas las filas
+    (bytes del CSV o ultimo id de SQLite); solo se leen las filas nuevas.
+    Con CSV, 'inodo' identifica el archivo activo y 'activas' cuenta sus
+    filas; las consultas archivadas siguen sumadas en los demas contadores.
+    'indice' guarda [fecha_hora, byte de inicio] cada HISTORIAL_INDICE_FILAS
+    filas del archivo activo. 'generacion' cambia cuando el historial se
+    vacia o el archivo activo se reemplaza fuera de la rotacion, para que
+    las marcas de consultas_nuevas anteriores no se apliquen al historial
+    nuevo. Como cada proceso guarda con su propio
+    temporal y gana el ultimo, la posicion siempre corresponde a los
+    contadores guardados.
+    """
+    
+    def iniciales(self):
+        """Contadores en cero"""
+        return {'posicion': 0, 'inodo': None, 'generacion': None, 'activas': 0, 'indice': [], 'total': 0,
+                'ciudades': {}, 'cultivos': {}, 'tipos': {}, 'dias': {}}
+    
+    def agregar(self, consulta):
+        """Suma una consulta (diccionario con las columnas del historial)"""
+        datos = self.datos
+        datos['total'] += 1
+        
+        for contador, valor in (('ciudades', consulta.get('ciudad')),
+                                ('cultivos', consulta.get('cultivo')),
+                                ('tipos', consulta.get('tipo_consulta')),
+                                ('dias', str(consulta.get('fecha_hora') or '')[:10])):
+            if valor:
+                datos[contador][valor] = datos[contador].get(valor, 0) + 1
+    
+    def mas_frecuentes(self, contador, n=5):
+        """Los n valores mas frecuentes de un contador"""
+        return sorted(self.datos[contador].items(), key=lambda x: x[1], reverse=True)[:n]
+
 
 class HistorialConsultas:
     """
@@ -15,20 +171,44 @@ class HistorialConsultas:
     Version simplificada usando CSV
     """
     
-    def __init__(self, archivo_csv="historial_consultas.csv"):
+    DESCRIPCION = "CSV local"
+    
+    def __init__(self, archivo_csv="historial_consultas.csv", escritura_diferida=None):
         self.archivo_csv = archivo_csv
+        self.carpeta_segmentos = os.path.splitext(archivo_csv)[0] + '_segmentos'
         self.crear_archivo_si_no_existe()
+        self.contadores = ContadoresHistorial(archivo_csv + '.estadisticas.json')
+        self._iniciar_escritura(escritura_diferida)
+    
+    def _iniciar_escritura(self, escritura_diferida=None):
+        """
+        Prepara la escritura directa o diferida por lotes
+        
+        Args:
+            escritura_diferida (bool): Por defecto HISTORIAL_ESCRITURA_DIFERIDA
+        """
+        if escritura_diferida is None:
+            escritura_diferida = ConfiguracionSistema.HISTORIAL_ESCRITURA_DIFERIDA
+        
+        self._lock_contadores = threading.RLock()
+        self.escritor = None
+        if escritura_diferida:
+            self.escritor = EscritorDiferido(lambda filas: self._escribir_filas(filas, sincronizar=True))
     
     def crear_archivo_si_no_existe(self):
-        """Crea el archivo CSV si no existe"""
-        if not os.path.exists(self.archivo_csv):
-            with open(self.archivo_csv, 'w', newline='', encoding='utf-8') as archivo:
-                writer = csv.writer(archivo)
-                writer.writerow([
-                    'fecha_hora', 'ciudad', 'cultivo', 'temperatura', 
-                    'humedad', 'puntaje', 'nivel', 'tipo_consulta'
-                ])
-            print(f"Archivo de historial creado: {self.archivo_csv}")
+        """Crea el archivo CSV si no existe (un solo proceso escribe el encabezado)"""
+        if os.path.exists(self.archivo_csv):
+            return
+        
+        try:
+            descriptor = os.open(self.archivo_csv, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            return
+        
+        with open(descriptor, 'w', newline='', encoding='utf-8') as archivo:
+            writer = csv.writer(archivo)
+            writer.writerow(COLUMNAS_HISTORIAL)
+        print(f"Archivo de historial creado: {self.archivo_csv}")
     
     def guardar_consulta(self, ciudad, cultivo="", temperatura=0, humedad=0, 
                         puntaje=0, nivel="", tipo_consulta="consulta_general"):
@@ -44,47 +224,530 @@ class HistorialConsultas:
             nivel (str): Nivel de recomendacion
             tipo_consulta (str): Tipo de consulta realizada
         """
+        fila = [
+            datetime.now().strftime('%Y-%m-%d %H:%M:%S'), ciudad, cultivo, temperatura,
+            humedad, puntaje, nivel, tipo_consulta
+        ]
+        
+        # Con escritura diferida la fila se escribe en el siguiente lote
+        if self.escritor is not None:
+            self.escritor.agregar(fila)
+            return True
+        
         try:
-            fecha_hora = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            with open(self.archivo_csv, 'a', newline='', encoding='utf-8') as archivo:
-                writer = csv.writer(archivo)
-                writer.writerow([
-                    fecha_hora, ciudad, cultivo, temperatura, 
-                    humedad, puntaje, nivel, tipo_consulta
-                ])
-            
+            self._escribir_filas([fila])
             return True
             
         except Exception as error:
             print(f"Error al guardar consulta: {error}")
             return False
     
+    def _escribir_filas(self, filas, sincronizar=False):
+        """
+        Agrega filas al CSV de forma segura entre procesos
+        
+        Todo el lote se arma en memoria y se escribe con una sola llamada
+        sobre un descriptor en modo O_APPEND, con bloqueo exclusivo (flock)
+        donde existe. Asi las lineas de varios procesos nunca se mezclan.
+        Si el archivo activo supera MAX_CONSULTAS_HISTORIAL mas el margen,
+        se rota.
+        
+        Args:
+            filas (list): Filas en el orden de COLUMNAS_HISTORIAL
+            sincronizar (bool): Forzar la escritura a disco (fsync)
+        """
+        texto = io.StringIO()
+        csv.writer(texto).writerows(filas)
+        registro = texto.getvalue().encode('utf-8')
+        
+        with self._archivo_bloqueado() as descriptor:
+            escritos = 0
+            while escritos < len(registro):
+                escritos += os.write(descriptor, registro[escritos:])
+            if sincronizar:
+                os.fsync(descriptor)
+        
+        self.actualizar_contadores()
+        
+        config = ConfiguracionSistema
+        if self.contadores.datos['activas'] > config.MAX_CONSULTAS_HISTORIAL + config.HISTORIAL_MARGEN_ROTACION:
+            self.rotar_historial()
+    
+    @contextmanager
+    def _archivo_bloqueado(self, modo=os.O_WRONLY | os.O_APPEND):
+        """
+        Descriptor del CSV activo con bloqueo exclusivo entre procesos
+        
+        Si al obtener el bloqueo el archivo ya fue reemplazado (rotacion o
+        limpieza en otro proceso), se abre de nuevo el archivo actual.
+        Cerrar el descriptor libera el bloqueo.
+        """
+        while True:
+            self.crear_archivo_si_no_existe()
+            descriptor = os.open(self.archivo_csv, modo | getattr(os, 'O_BINARY', 0))
+            if fcntl is not None:
+                fcntl.flock(descriptor, fcntl.LOCK_EX)
+            
+            try:
+                vigente = os.stat(self.archivo_csv).st_ino == os.fstat(descriptor).st_ino
+            except FileNotFoundError:
+                vigente = False
+            if vigente:
+                break
+            os.close(descriptor)
+        
+        try:
+            yield descriptor
+        finally:
+            os.close(descriptor)
+    
+    def _reemplazar_activo(self, contenido):
+        """Reemplaza el CSV activo de forma atomica (llamar con el bloqueo tomado)"""
+        temporal = f"{self.archivo_csv}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(temporal, self.archivo_csv)
+    
+    def _ruta_segmento(self, mes):
+        """Segmento gzip de un mes ('AAAA-MM')"""
+        return os.path.join(self.carpeta_segmentos, f"consultas_{mes}.csv.gz")
+    
+    def segmentos(self):
+        """Segmentos mensuales archivados, del mas antiguo al mas reciente"""
+        return sorted(glob.glob(self._ruta_segmento('*')))
+    
+    def _leer_segmento(self, ruta):
+        """Filas validas de un segmento, en orden del archivo"""
+        return list(self._recorrer_segmento(ruta))
+    
+    def _recorrer_segmento(self, ruta):
+        """Generador de las filas validas de un segmento"""
+        with gzip.open(ruta, 'rt', encoding='utf-8', errors='replace', newline='') as archivo:
+            for fila in csv.DictReader(archivo):
+                if None not in fila and None not in fila.values():
+                    yield fila
+    
+    def _construir_indice(self, inicio, lineas):
+        """Entradas del indice de fechas para lineas del CSV activo que empiezan en el byte inicio"""
+        cada = ConfiguracionSistema.HISTORIAL_INDICE_FILAS
+        indice = []
+        for numero, linea in enumerate(lineas):
+            if numero % cada == 0:
+                indice.append([linea[:19].decode('utf-8', errors='replace'), inicio])
+            inicio += len(linea)
+        return indice
+    
+    def rotar_historial(self, conservar=None):
+        """
+        Archiva las consultas antiguas del CSV activo en segmentos por mes
+        
+        Las filas que exceden las ultimas 'conservar' se agregan al segmento
+        gzip de su mes y el CSV activo se reescribe solo con las recientes.
+        Despues se compactan los segmentos viejos (compactar_segmentos).
+        
+        Args:
+            conservar (int): Consultas que quedan activas (por defecto MAX_CONSULTAS_HISTORIAL)
+            
+        Returns:
+            int: Consultas archivadas
+        """
+        conservar = conservar or ConfiguracionSistema.MAX_CONSULTAS_HISTORIAL
+        
+        with self._lock_contadores, self._archivo_bloqueado(os.O_RDWR) as descriptor:
+            # Contar antes de mover para no perder filas en las estadisticas
+            self._contar_filas_nuevas(self.contadores)
+            
+            with open(descriptor, 'rb', closefd=False) as archivo:
+                encabezado = archivo.readline()
+                lineas = archivo.readlines()
+            
+            incompleta = b''
+            if lineas and not lineas[-1].endswith(b'\n'):
+                incompleta = lineas.pop()  # Escritura sin bloqueo en curso
+            if len(lineas) <= conservar:
+                return 0
+            
+            archivar, activas = lineas[:-conservar], lineas[-conservar:]
+            por_mes = {}
+            for linea in archivar:
+                mes = linea[:7].decode('ascii', errors='replace')
+                por_mes.setdefault(mes if re.fullmatch(r'\d{4}-\d{2}', mes) else '0000-00', []).append(linea)
+            
+            os.makedirs(self.carpeta_segmentos, exist_ok=True)
+            for mes, lineas_mes in por_mes.items():
+                ruta = self._ruta_segmento(mes)
+                nuevo = not os.path.exists(ruta)
+                # Cada agregado es un miembro gzip nuevo; gzip los lee como un solo archivo
+                with gzip.open(ruta, 'ab') as segmento:
+                    if nuevo:
+                        segmento.write(encabezado)
+                    segmento.writelines(lineas_mes)
+            
+            self._reemplazar_activo(encabezado + b''.join(activas) + incompleta)
+            
+            datos = self.contadores.datos
+            datos['posicion'] = len(encabezado) + sum(map(len, activas))
+            datos['inodo'] = os.stat(self.archivo_csv).st_ino
+            datos['activas'] = len(activas)
+            datos['indice'] = self._construir_indice(len(encabezado), activas)
+            self.contadores.guardar()
+            
+            self.compactar_segmentos()
+        
+        return len(archivar)
+    
+    def compactar_segmentos(self, meses=None):
+        """
+        Resume por dia los segmentos con mas de 'meses' de antiguedad
+        
+        Por dia, ciudad, cultivo y tipo de consulta se guardan el numero de
+        consultas y los promedios de temperatura, humedad y puntaje en
+        resumen_diario.csv; luego se borra el segmento.
+        
+        Args:
+            meses (int): Meses que conservan el detalle (por defecto HISTORIAL_MESES_SEGMENTOS)
+            
+        Returns:
+            int: Segmentos compactados
+        """
+        meses = meses or ConfiguracionSistema.HISTORIAL_MESES_SEGMENTOS
+        hoy = datetime.now()
+        limite = hoy.year * 12 + hoy.month - 1 - meses
+        
+        compactados = 0
+        for ruta in self.segmentos():
+            año, mes = os.path.basename(ruta)[10:17].split('-')
+            if int(año) * 12 + int(mes) - 1 >= limite:
+                continue
+            
+            resumen = {}
+            for fila in self._leer_segmento(ruta):
+                clave = (fila['fecha_hora'][:10], fila['ciudad'], fila['cultivo'], fila['tipo_consulta'])
+                acumulado = resumen.setdefault(clave, [0, [], [], []])
+                acumulado[0] += 1
+                for valores, columna in zip(acumulado[1:], ('temperatura', 'humedad', 'puntaje')):
+                    try:
+                        valores.append(float(fila[columna]))
+                    except ValueError:
+                        pass
+            
+            ruta_resumen = os.path.join(self.carpeta_segmentos, 'resumen_diario.csv')
+            nuevo = not os.path.exists(ruta_resumen)
+            with open(ruta_resumen, 'a', newline='', encoding='utf-8') as archivo:
+                writer = csv.writer(archivo)
+                if nuevo:
+                    writer.writerow(COLUMNAS_RESUMEN)
+                for clave, (consultas, *valores) in sorted(resumen.items()):
+                    promedios = [round(sum(v) / len(v), 1) if v else '' for v in valores]
+                    writer.writerow([*clave, consultas, *promedios])
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            
+            os.remove(ruta)
+            compactados += 1
+        
+        return compactados
+    
+    def obtener_resumen_diario(self):
+        """
+        Resumen por dia de las consultas compactadas
+        
+        Returns:
+            list: Filas de resumen_diario.csv (columnas de COLUMNAS_RESUMEN)
+        """
+        ruta_resumen = os.path.join(self.carpeta_segmentos, 'resumen_diario.csv')
+        if not os.path.exists(ruta_resumen):
+            return []
+        with open(ruta_resumen, 'r', encoding='utf-8', newline='') as archivo:
+            return list(csv.DictReader(archivo))
+    
+    def _leer_filas(self, posicion=0, fin=None, archivo=None):
+        """
+        Recorre las filas del CSV desde una posicion en bytes
+        
+        Tolera escritores concurrentes: se detiene en una ultima linea sin
+        salto (escritura en curso) y omite lineas con otro numero de campos.
+        
+        Args:
+            posicion (int): Byte desde donde leer (0 = inicio, salta el encabezado)
+            fin (int): Byte donde dejar de leer (None = hasta el final)
+            archivo (file): CSV ya abierto en modo binario (por defecto se abre el activo)
+        
+        Yields:
+            tuple: (posicion despues de la fila, fila como diccionario)
+        """
+        if archivo is None:
+            with open(self.archivo_csv, 'rb') as archivo:
+                yield from self._leer_filas(posicion, fin, archivo)
+            return
+        
+        archivo.seek(posicion)
+        if posicion == 0:
+            posicion += len(archivo.readline())  # Encabezado
+        
+        for linea in archivo:
+            if not linea.endswith(b'\n') or (fin is not None and posicion >= fin):
+                break
+            posicion += len(linea)
+            fila = next(csv.reader([linea.decode('utf-8', errors='replace')]), None)
+            if fila and len(fila) == len(COLUMNAS_HISTORIAL):
+                yield posicion, dict(zip(COLUMNAS_HISTORIAL, fila))
+    
+    def vaciar_pendientes(self):
+        """Escribe las consultas que esperan en la escritura diferida"""
+        if self.escritor is not None:
+            self.escritor.vaciar()
+    
+    def cerrar(self):
+        """Escribe lo pendiente y detiene la escritura diferida (llamar al salir)"""
+        if self.escritor is not None:
+            self.escritor.cerrar()
+    
     def obtener_historial(self, limite=10):
         """
         Obtiene las ultimas consultas del historial
         
+        Lee el archivo activo desde el final por bloques y solo procesa las
+        ultimas lineas, asi que el tiempo no depende del tamaño del historial.
+        Los segmentos archivados solo se leen si el archivo activo no tiene
+        suficientes consultas.
+        
         Args:
-            limite (int): Numero maximo de consultas a retornar
+            limite (int): Numero maximo de consultas a retornar (None = todas las detalladas)
             
         Returns:
-            list: Lista de consultas
+            list: Lista de consultas (mas recientes primero)
         """
+        self.vaciar_pendientes()
+        
         try:
-            consultas = []
+            if not limite:
+                filas = [fila for ruta in self.segmentos() for fila in self._leer_segmento(ruta)]
+                filas.extend(fila for _, fila in self._leer_filas())
+                return filas[::-1]
             
-            with open(self.archivo_csv, 'r', encoding='utf-8') as archivo:
-                reader = csv.DictReader(archivo)
-                for fila in reader:
-                    consultas.append(fila)
+            ultimas = self._leer_ultimas(limite)
+            for ruta in reversed(self.segmentos()):
+                if len(ultimas) >= limite:
+                    break
+                ultimas = self._leer_segmento(ruta)[-(limite - len(ultimas)):] + ultimas
+            return ultimas[::-1]
             
-            # Retornar las ultimas consultas (mas recientes primero)
-            return consultas[-limite:][::-1] if consultas else []
+        except Exception as error:
+            print(f"Error al leer historial: {error}")
+            return []
+    
+    def _leer_ultimas(self, limite):
+        """
+        Lee las ultimas filas del CSV buscando desde el final del archivo
+        
+        Retrocede de a HISTORIAL_BLOQUE_LECTURA bytes hasta juntar limite
+        lineas completas. Los campos del historial no contienen saltos de
+        linea, por lo que cada linea es un registro.
+        
+        Args:
+            limite (int): Numero de filas a leer
+            
+        Returns:
+            list: Filas como diccionarios, en orden del archivo
+        """
+        bloque = ConfiguracionSistema.HISTORIAL_BLOQUE_LECTURA
+        
+        with open(self.archivo_csv, 'rb') as archivo:
+            encabezado = next(csv.reader([archivo.readline().decode('utf-8')]), COLUMNAS_HISTORIAL)
+            inicio_datos = archivo.tell()
+            
+            archivo.seek(0, os.SEEK_END)
+            posicion = archivo.tell()
+            partes = []
+            saltos = 0
+            
+            # Hace falta un salto extra para saber que la primera linea esta completa
+            while posicion > inicio_datos and saltos <= limite:
+                leer = min(bloque, posicion - inicio_datos)
+                posicion -= leer
+                archivo.seek(posicion)
+                parte = archivo.read(leer)
+                partes.append(parte)
+                saltos += parte.count(b'\n')
+        
+        # La ultima parte no termina en salto de linea: vacia o escritura en curso
+        lineas = b''.join(reversed(partes)).split(b'\n')[:-1]
+        if posicion > inicio_datos:
+            lineas = lineas[1:]  # Primera linea incompleta
+        
+        lineas = [linea.decode('utf-8', errors='replace').rstrip('\r') for linea in lineas if linea.strip()]
+        filas = [fila for fila in csv.reader(lineas) if len(fila) == len(encabezado)]
+        return [dict(zip(encabezado, fila)) for fila in filas[-limite:]]
+    
+    def buscar_por_cultivo(self, texto, limite=None):
+        """
+        Consultas de los cultivos cuyo nombre empieza con el texto (sin
+        distinguir mayusculas), en el archivo activo y, si faltan, en los
+        segmentos archivados
+        
+        Args:
+            texto (str): Inicio del nombre del cultivo
+            limite (int): Maximo de consultas (por defecto CONSULTAS_BUSQUEDA_MAX)
+            
+        Returns:
+            list: Consultas encontradas (mas recientes primero)
+        """
+        limite = limite or ConfiguracionSistema.CONSULTAS_BUSQUEDA_MAX
+        texto = texto.lower()
+        self.vaciar_pendientes()
+        
+        try:
+            encontradas = list(deque(
+                (fila for _, fila in self._leer_filas()
+                 if fila['cultivo'].lower().startswith(texto)),
+                maxlen=limite))
+            
+            for ruta in reversed(self.segmentos()):
+                if len(encontradas) >= limite:
+                    break
+                del_segmento = [fila for fila in self._leer_segmento(ruta)
+                                if fila['cultivo'].lower().startswith(texto)]
+                encontradas = del_segmento[-(limite - len(encontradas)):] + encontradas
+            return encontradas[::-1]
             
         except Exception as error:
             print(f"Error al leer historial: {error}")
             return []
     
+    def consultas_entre(self, desde, hasta=None):
+        """
+        Consultas con desde <= fecha_hora < hasta, en orden cronologico
+        
+        Los segmentos archivados se eligen por su mes y se omiten si el rango
+        empieza despues de la primera fila del CSV activo. En el CSV activo, una
+        busqueda binaria en el indice de fechas (una entrada cada
+        HISTORIAL_INDICE_FILAS filas) da los bytes donde empieza y termina
+        el rango, y solo esas filas se leen; se lee un bloque extra en cada
+        extremo por si varios procesos escribieron un poco fuera de orden.
+        Los meses ya compactados en el resumen diario no se incluyen.
+        
+        Args:
+            desde (datetime o str): Inicio del rango ('AAAA-MM-DD HH:MM:SS' o un prefijo)
+            hasta (datetime o str): Fin del rango, excluido (None = sin limite)
+        
+        Yields:
+            dict: Consultas del rango, sin cargarlas todas en memoria
+        """
+        desde = fecha_historial(desde)
+        hasta = fecha_historial(hasta) if hasta is not None else None
+        
+        def en_rango(fila):
+            return desde <= fila['fecha_hora'] and (hasta is None or fila['fecha_hora'] < hasta)
+        
+        self.vaciar_pendientes()
+        self.actualizar_contadores()
+        with self._lock_contadores:
+            indice = list(self.contadores.datos['indice'])
+            inodo = self.contadores.datos['inodo']
+            cada = ConfiguracionSistema.HISTORIAL_INDICE_FILAS
+            completo = len(indice) == -(-self.contadores.datos['activas'] // cada)
+        
+        # Los segmentos tienen las filas anteriores a la primera del archivo activo
+        if not (completo and indice and desde > indice[0][0]):
+            for ruta in self.segmentos():
+                mes = os.path.basename(ruta)[10:17]
+                if mes >= desde[:7] and (hasta is None or mes <= hasta[:7]):
+                    yield from filter(en_rango, self._recorrer_segmento(ruta))
+        
+        with open(self.archivo_csv, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_ino != inodo:
+                indice = []  # Rotado entre tanto: se recorre todo el archivo
+            
+            fechas = [fecha for fecha, _ in indice]
+            i = bisect_left(fechas, desde) - 2
+            inicio = indice[i][1] if i >= 0 else 0
+            fin = None
+            if hasta is not None:
+                j = bisect_right(fechas, hasta) + 1
+                fin = indice[j][1] if j < len(indice) else None
+            
+            for _, fila in self._leer_filas(inicio, fin, archivo):
+                if en_rango(fila):
+                    yield fila
+    
+    def consultas_nuevas(self, marca=None):
+        """
+        Consultas escritas despues de una marca, en el orden del registro
+        
+        La marca no depende de fecha_hora, asi que tambien aparecen las
+        consultas que otro proceso escribio con una fecha anterior. Guarda
+        el numero de la fila en el registro ('secuencia'), y el byte
+        ('posicion') e 'inodo' del archivo activo donde termina la fila.
+        Mientras el archivo activo no se rote ('inicio_activo', las filas
+        archivadas hasta entonces, no cambia), se sigue leyendo desde ese
+        byte. Si se roto, las filas pendientes que pasaron a los segmentos se
+        toman del final de estos, y el resto del archivo activo se ubica con
+        el indice de los contadores. Una marca de otra 'generacion' (el
+        historial se vacio despues) se ignora y se lee desde el inicio. Las
+        filas ya compactadas en el resumen diario no se incluyen.
+        
+        Args:
+            marca (dict): Marca de la ultima consulta procesada (None = desde el inicio)
+        
+        Yields:
+            tuple: (marca de la consulta, consulta como diccionario)
+        """
+        self.vaciar_pendientes()
+        self.actualizar_contadores()
+        with self._lock_contadores:
+            datos = self.contadores.datos
+            indice = list(datos['indice'])
+            inodo, activas, total = datos['inodo'], datos['activas'], datos['total']
+            generacion = datos['generacion']
+        cada = ConfiguracionSistema.HISTORIAL_INDICE_FILAS
+        inicio_activo = total - activas
+        
+        if not marca or marca.get('generacion') != generacion:
+            marca = {}
+        secuencia = marca.get('secuencia', 0)
+        
+        if marca.get('inodo') == inodo and marca.get('inicio_activo') == inicio_activo:
+            inicio, saltar = marca['posicion'], 0
+        else:
+            pendientes_archivadas = inicio_activo - secuencia
+            if pendientes_archivadas > 0:
+                archivadas = []
+                for ruta in reversed(self.segmentos()):
+                    archivadas[:0] = self._leer_segmento(ruta)
+                    if len(archivadas) >= pendientes_archivadas:
+                        break
+                secuencia = inicio_activo - min(len(archivadas), pendientes_archivadas)
+                for fila in archivadas[-pendientes_archivadas:]:
+                    secuencia += 1
+                    yield {'generacion': generacion, 'secuencia': secuencia}, fila
+            
+            fila_activa = secuencia - inicio_activo
+            if len(indice) == -(-activas // cada) and fila_activa // cada < len(indice):
+                inicio, saltar = indice[fila_activa // cada][1], fila_activa % cada
+            else:
+                inicio, saltar = 0, fila_activa
+        
+        with open(self.archivo_csv, 'rb') as archivo:
+            if os.fstat(archivo.fileno()).st_ino != inodo:
+                return  # Rotado entre tanto: la proxima llamada sigue desde la marca
+            
+            for posicion, fila in self._leer_filas(inicio, archivo=archivo):
+                if saltar:
+                    saltar -= 1
+                    continue
+                secuencia += 1
+                yield {'generacion': generacion, 'secuencia': secuencia, 'inicio_activo': inicio_activo,
+                       'inodo': inodo, 'posicion': posicion}, fila
+    
+    def generacion(self):
+        """Generacion actual del historial (ver consultas_nuevas)"""
+        self.actualizar_contadores()
+        with self._lock_contadores:
+            return self.contadores.datos['generacion']
+    
     def mostrar_historial_simple(self, limite=5):
         """
         Muestra el historial de forma simple en consola
@@ -115,46 +778,78 @@ class HistorialConsultas:
             print(f"   Tipo: {consulta['tipo_consulta']}")
             print()
     
-    def obtener_estadisticas(self):
+    def _contar_filas_nuevas(self, contadores):
         """
-        Obtiene estadisticas basicas del historial
+        Suma las filas escritas en el CSV despues de contadores.posicion
         
-        Returns:
-            dict: Estadisticas del historial
+        Solo cuenta lineas completas, por si otro proceso esta escribiendo.
+        Se llama con el bloqueo del archivo: si otro proceso guardo contadores
+        (tambien al rotar o limpiar), se parte de los suyos. Si no corresponden
+        al archivo activo (reemplazado o mas corto), se recuenta desde cero.
         """
-        consultas = self.obtener_historial(limite=1000)  # Todas las consultas
+        if contadores.guardado_por_otro():
+            contadores.cargar()
         
-        if not consultas:
-            return {
-                'total_consultas': 0,
-                'cultivos_mas_consultados': [],
-                'ciudades_mas_consultadas': []
-            }
-        
-        # Contar cultivos
-        cultivos_count = {}
-        ciudades_count = {}
-        
-        for consulta in consultas:
-            # Contar cultivos
-            if consulta['cultivo']:
-                cultivo = consulta['cultivo']
-                cultivos_count[cultivo] = cultivos_count.get(cultivo, 0) + 1
+        estado = os.stat(self.archivo_csv)
+        if contadores.datos['inodo'] != estado.st_ino or estado.st_size < contadores.datos['posicion']:
+            contadores.reiniciar()
+            contadores.datos['inodo'] = estado.st_ino
+        if not contadores.datos['generacion']:
+            contadores.datos['generacion'] = nueva_generacion()
+        
+        datos = contadores.datos
+        cada = ConfiguracionSistema.HISTORIAL_INDICE_FILAS
+        inicio = datos['posicion']
+        for posicion, fila in self._leer_filas(datos['posicion']):
+            if datos['activas'] % cada == 0:
+                datos['indice'].append([fila['fecha_hora'], inicio])
+            contadores.agregar(fila)
+            datos['posicion'] = inicio = posicion
+            datos['activas'] += 1
+    
+    def _bloqueo_contadores(self):
+        """
+        Bloqueo entre procesos para contar y guardar los contadores
+        
+        Con el mismo bloqueo que la rotacion, ningun proceso guarda
+        contadores de un archivo activo que ya fue reemplazado.
+        """
+        return self._archivo_bloqueado(os.O_RDONLY)
+    
+    def actualizar_contadores(self):
+        """Lleva los contadores hasta el final del historial y los guarda"""
+        with self._lock_contadores, self._bloqueo_contadores():
+            posicion = self.contadores.datos['posicion']
+            generacion = self.contadores.datos['generacion']
+            try:
+                self._contar_filas_nuevas(self.contadores)
+            except Exception as error:
+                print(f"Error al actualizar contadores del historial: {error}")
+                return
             
-            # Contar ciudades
-            ciudad = consulta['ciudad']
-            ciudades_count[ciudad] = ciudades_count.get(ciudad, 0) + 1
+            if (self.contadores.datos['posicion'], self.contadores.datos['generacion']) != (posicion, generacion):
+                self.contadores.guardar()
+    
+    def obtener_estadisticas(self):
+        """
+        Obtiene estadisticas de todo el historial
         
-        # Ordenar por frecuencia
-        cultivos_mas_consultados = sorted(cultivos_count.items(), 
-                                        key=lambda x: x[1], reverse=True)[:5]
-        ciudades_mas_consultadas = sorted(ciudades_count.items(), 
-                                        key=lambda x: x[1], reverse=True)[:5]
+        Usa los contadores acumulados: solo se leen las filas agregadas desde
+        la ultima actualizacion (por ejemplo, por otro proceso).
+        
+        Returns:
+            dict: Estadisticas del historial
+        """
+        self.vaciar_pendientes()
+        self.actualizar_contadores()
+        contadores = self.contadores
         
         return {
-            'total_consultas': len(consultas),
-            'cultivos_mas_consultados': cultivos_mas_consultados,
-            'ciudades_mas_consultadas': ciudades_mas_consultadas
+            'total_consultas': contadores.datos['total'],
+            'cultivos_mas_consultados': contadores.mas_frecuentes('cultivos'),
+            'ciudades_mas_consultadas': contadores.mas_frecuentes('ciudades'),
+            'tipos_consulta': contadores.mas_frecuentes('tipos', n=None),
+            'consultas_por_dia': sorted(contadores.datos['dias'].items())[-7:]
         }
     
     def mostrar_estadisticas(self):
@@ -174,16 +869,66 @@ class HistorialConsultas:
             print(f"\nCiudades mas consultadas:")
             for ciudad, count in stats['ciudades_mas_consultadas']:
                 print(f"  - {ciudad}: {count} consultas")
+        
+        if stats.get('tipos_consulta'):
+            print(f"\nTipos de consulta:")
+            for tipo, count in stats['tipos_consulta']:
+                print(f"  - {tipo}: {count}")
+        
+        if stats.get('consultas_por_dia'):
+            print(f"\nConsultas de los ultimos dias con actividad:")
+            for dia, count in stats['consultas_por_dia']:
+                print(f"  - {dia}: {count}")
     
     def limpiar_historial(self):
         """Limpia completamente el historial"""
         respuesta = input("Esta seguro de limpiar todo el historial? (si/no): ").lower()
         
         if respuesta == 'si':
-            self.crear_archivo_si_no_existe()  # Esto recrea el archivo vacio
+            self._vaciar()
             print("Historial limpiado correctamente")
         else:
             print("Operacion cancelada")
+    
+    def _vaciar(self):
+        """Deja el historial sin consultas (archivo activo, segmentos y resumen)"""
+        self.vaciar_pendientes()
+        
+        with self._lock_contadores, self._archivo_bloqueado(os.O_RDWR):
+            for ruta in self.segmentos() + [os.path.join(self.carpeta_segmentos, 'resumen_diario.csv')]:
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            
+            texto = io.StringIO()
+            csv.writer(texto).writerow(COLUMNAS_HISTORIAL)
+            self._reemplazar_activo(texto.getvalue().encode('utf-8'))
+            
+            self.contadores.reiniciar()
+            self.contadores.datos['inodo'] = os.stat(self.archivo_csv).st_ino
+            self.contadores.datos['generacion'] = nueva_generacion()
+            self.contadores.guardar()
+
+
+def crear_historial(backend=None):
+    """
+    Crea el historial con el almacenamiento configurado
+    
+    Args:
+        backend (str): 'csv' o 'sqlite' (por defecto HISTORIAL_BACKEND)
+    
+    Returns:
+        HistorialConsultas: Historial listo para usar
+    """
+    backend = backend or ConfiguracionSistema.HISTORIAL_BACKEND
+    
+    if backend == 'sqlite':
+        from historial_sqlite import HistorialSQLite
+        return HistorialSQLite(ConfiguracionSistema.ARCHIVO_HISTORIAL_SQLITE,
+                               ConfiguracionSistema.ARCHIVO_HISTORIAL)
+    if backend == 'csv':
+        return HistorialConsultas(ConfiguracionSistema.ARCHIVO_HISTORIAL)
+    
+    raise ValueError(f"Almacenamiento de historial desconocido: {backend}")
 
 
 # Funcion para probar el sistema de historial
@@ -216,5 +961,93 @@ def test_historial():
     historial.mostrar_estadisticas()
 
 
+def _proceso_escritor(archivo_csv, consultas):
+    """Proceso de prueba que agrega consultas sin escritura diferida"""
+    historial = HistorialConsultas(archivo_csv, escritura_diferida=False)
+    for i in range(consultas):
+        historial.guardar_consulta("Panama City", "maiz", 28, 75, i % 101, "BUENO", "prueba_concurrencia")
+
+
+def prueba_concurrencia(procesos=4, consultas_por_proceso=500):
+    """
+    Varios procesos agregan consultas al mismo CSV a la vez y se verifica
+    que ninguna linea quede cortada o mezclada (incluye rotaciones si se
+    supera MAX_CONSULTAS_HISTORIAL)
+    
+    Args:
+        procesos (int): Procesos escritores simultaneos
+        consultas_por_proceso (int): Consultas que agrega cada proceso
+    
+    Returns:
+        dict: filas esperadas, filas validas (con las archivadas), lineas
+              invalidas, total de las estadisticas y consultas por segundo
+    """
+    import multiprocessing
+    import tempfile
+    
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo_csv = os.path.join(carpeta, 'historial_concurrente.csv')
+        HistorialConsultas(archivo_csv, escritura_diferida=False).crear_archivo_si_no_existe()
+        
+        inicio = time.perf_counter()
+        trabajadores = [multiprocessing.Process(target=_proceso_escritor, args=(archivo_csv, consultas_por_proceso))
+                        for _ in range(procesos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+        
+        historial = HistorialConsultas(archivo_csv, escritura_diferida=False)
+        with open(archivo_csv, 'r', encoding='utf-8', newline='') as archivo:
+            invalidas = sum(1 for fila in list(csv.reader(archivo))[1:] if len(fila) != len(COLUMNAS_HISTORIAL))
+        validas = len(historial.obtener_historial(None))
+        contadas = historial.obtener_estadisticas()['total_consultas']
+    
+    esperadas = procesos * consultas_por_proceso
+    resultado = {
+        'esperadas': esperadas,
+        'validas': validas,
+        'invalidas': invalidas,
+        'contadas': contadas,
+        'consultas_por_segundo': round(esperadas / duracion, 1)
+    }
+    
+    print(f"{procesos} procesos x {consultas_por_proceso} consultas: "
+          f"{validas}/{esperadas} filas validas, {invalidas} invalidas, {contadas} en estadisticas, "
+          f"{resultado['consultas_por_segundo']} consultas/s"
+          f"{'' if fcntl else ' (sin fcntl: solo O_APPEND)'}")
+    return resultado
+
+
+def main():
+    """Prueba del historial desde la linea de comandos"""
+    parser = argparse.ArgumentParser(description="Historial de consultas")
+    parser.add_argument('--concurrencia', type=int, metavar='PROCESOS',
+                        help="Probar escrituras simultaneas con varios procesos")
+    parser.add_argument('--consultas', type=int, default=500,
+                        help="Consultas por proceso en la prueba de concurrencia")
+    parser.add_argument('--rotar', action='store_true',
+                        help="Archivar ahora las consultas que exceden MAX_CONSULTAS_HISTORIAL")
+    parser.add_argument('--entre', nargs=2, metavar=('DESDE', 'HASTA'),
+                        help="Contar las consultas entre dos fechas (AAAA-MM-DD)")
+    args = parser.parse_args()
+    
+    if args.entre:
+        historial = crear_historial()
+        inicio = time.perf_counter()
+        total = sum(1 for _ in historial.consultas_entre(*args.entre))
+        print(f"Consultas entre {args.entre[0]} y {args.entre[1]}: {total} "
+              f"({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+        historial.cerrar()
+    elif args.rotar:
+        historial = HistorialConsultas(ConfiguracionSistema.ARCHIVO_HISTORIAL, escritura_diferida=False)
+        print(f"Consultas archivadas: {historial.rotar_historial()}")
+    elif args.concurrencia:
+        prueba_concurrencia(args.concurrencia, args.consultas)
+    else:
+        test_historial()
+
+
 if __name__ == "__main__":
-    test_historial()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,311 @@
+# historial_sqlite.py
+"""
+Historial de consultas sobre SQLite
+Misma interfaz que HistorialConsultas, con modo WAL (lectores y escritor
+concurrentes) e indices para que las busquedas cubran todo el historial
+sin recorrer el archivo
+"""
+
+import csv
+import gzip
+import os
+import sqlite3
+from contextlib import closing, nullcontext
+from datetime import datetime
+
+from config import ConfiguracionSistema
+from historial import COLUMNAS_HISTORIAL, ContadoresHistorial, HistorialConsultas, fecha_historial, nueva_generacion
+
+
+ESQUEMA_HISTORIAL = """
+CREATE TABLE IF NOT EXISTS consultas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fecha_hora TEXT NOT NULL,
+    ciudad TEXT COLLATE NOCASE,
+    cultivo TEXT COLLATE NOCASE,
+    temperatura NUMERIC,
+    humedad NUMERIC,
+    puntaje NUMERIC,
+    nivel TEXT,
+    tipo_consulta TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_consultas_fecha ON consultas (fecha_hora);
+CREATE INDEX IF NOT EXISTS idx_consultas_ciudad ON consultas (ciudad, fecha_hora);
+CREATE INDEX IF NOT EXISTS idx_consultas_cultivo ON consultas (cultivo, fecha_hora);
+CREATE INDEX IF NOT EXISTS idx_consultas_tipo ON consultas (tipo_consulta, fecha_hora);
+CREATE TABLE IF NOT EXISTS metadatos (
+    clave TEXT PRIMARY KEY,
+    valor TEXT
+);
+"""
+
+COLUMNAS_SQL = ', '.join(COLUMNAS_HISTORIAL)
+
+
+class HistorialSQLite(HistorialConsultas):
+    """
+    Historial de consultas guardado en una base SQLite
+    
+    La primera vez migra las filas del CSV de historial, si existe.
+    """
+    
+    DESCRIPCION = "SQLite local (WAL)"
+    
+    def __init__(self, archivo_db=None, archivo_csv=None, escritura_diferida=None):
+        self.archivo_db = archivo_db or ConfiguracionSistema.ARCHIVO_HISTORIAL_SQLITE
+        self.archivo_csv = archivo_csv or ConfiguracionSistema.ARCHIVO_HISTORIAL
+        self.crear_archivo_si_no_existe()
+        self.contadores = ContadoresHistorial(self.archivo_db + '.estadisticas.json')
+        self.migrar_desde_csv(self.archivo_csv)
+        self._iniciar_escritura(escritura_diferida)
+    
+    def _conectar(self):
+        """Conexion con filas como diccionario"""
+        conexion = sqlite3.connect(self.archivo_db, timeout=30)
+        conexion.row_factory = sqlite3.Row
+        conexion.execute('PRAGMA synchronous=NORMAL')
+        return conexion
+    
+    def crear_archivo_si_no_existe(self):
+        """Crea la base, la tabla y los indices si no existen"""
+        nueva = not os.path.exists(self.archivo_db)
+        with closing(self._conectar()) as conexion:
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.executescript(ESQUEMA_HISTORIAL)
+            self._actualizar_esquema(conexion)
+            with conexion:
+                conexion.execute("INSERT OR IGNORE INTO metadatos VALUES ('generacion', ?)",
+                                 (nueva_generacion(),))
+        if nueva:
+            print(f"Base de historial creada: {self.archivo_db}")
+    
+    def _actualizar_esquema(self, conexion):
+        """
+        Reconstruye una tabla de consultas creada sin AUTOINCREMENT
+        
+        Sin AUTOINCREMENT, SQLite reutiliza los id despues de borrar las
+        consultas, y las posiciones guardadas (contadores, marcas) apuntarian
+        a filas que no corresponden. Se conservan los id existentes.
+        """
+        def con_autoincrement():
+            sql = conexion.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'consultas'").fetchone()[0]
+            return 'AUTOINCREMENT' in sql.upper()
+        
+        if con_autoincrement():
+            return
+        
+        conexion.execute('BEGIN IMMEDIATE')
+        try:
+            if not con_autoincrement():  # Otro proceso pudo reconstruirla mientras tanto
+                conexion.execute("ALTER TABLE consultas RENAME TO consultas_anterior")
+                for sentencia in ESQUEMA_HISTORIAL.split(';'):
+                    conexion.execute(sentencia)
+                conexion.execute(f"INSERT INTO consultas (id, {COLUMNAS_SQL}) "
+                                 f"SELECT id, {COLUMNAS_SQL} FROM consultas_anterior ORDER BY id")
+                conexion.execute("DROP TABLE consultas_anterior")
+                for sentencia in ESQUEMA_HISTORIAL.split(';'):
+                    conexion.execute(sentencia)  # Indices, que se borraron con la tabla anterior
+            conexion.execute('COMMIT')
+        except sqlite3.Error:
+            conexion.execute('ROLLBACK')
+            raise
+    
+    def migrar_desde_csv(self, archivo_csv):
+        """
+        Copia una sola vez las consultas del historial CSV a la base
+        
+        Incluye los segmentos mensuales archivados (del mas antiguo al mas
+        reciente) y despues el CSV activo. El resumen diario de los meses
+        compactados no tiene consultas individuales: no se migra y se avisa.
+        
+        Args:
+            archivo_csv (str): CSV activo con las columnas de COLUMNAS_HISTORIAL
+        
+        Returns:
+            int: Filas migradas (0 si ya se habia migrado o no hay archivo)
+        """
+        with closing(self._conectar()) as conexion:
+            migrado = conexion.execute(
+                "SELECT valor FROM metadatos WHERE clave = 'migracion_csv'").fetchone()
+            if migrado or not os.path.exists(archivo_csv):
+                return 0
+            
+            historial_csv = HistorialConsultas(archivo_csv, escritura_diferida=False)
+            fuentes = [(ruta, gzip.open) for ruta in historial_csv.segmentos()] + [(archivo_csv, open)]
+            
+            total = 0
+            with conexion:
+                for ruta, abrir in fuentes:
+                    with abrir(ruta, 'rt', encoding='utf-8', newline='') as archivo:
+                        filas = ([fila.get(c, '') for c in COLUMNAS_HISTORIAL] for fila in csv.DictReader(archivo))
+                        cursor = conexion.executemany(
+                            f"INSERT INTO consultas ({COLUMNAS_SQL}) VALUES ({', '.join('?' * len(COLUMNAS_HISTORIAL))})",
+                            filas)
+                        total += cursor.rowcount
+                conexion.execute("INSERT INTO metadatos VALUES ('migracion_csv', ?)",
+                                 (f"{archivo_csv} ({total} filas de {len(fuentes)} archivos, "
+                                  f"{datetime.now():%Y-%m-%d %H:%M:%S})",))
+        
+        if total:
+            print(f"Historial migrado desde {archivo_csv}: {total} consultas")
+        
+        resumen = os.path.join(historial_csv.carpeta_segmentos, 'resumen_diario.csv')
+        if os.path.exists(resumen):
+            print(f"Aviso: {resumen} solo tiene totales por dia de los meses compactados; "
+                  f"esas consultas no se migran a SQLite")
+        return total
+    
+    def _escribir_filas(self, filas, sincronizar=False):
+        """
+        Inserta filas en una sola transaccion
+        
+        Args:
+            filas (list): Filas en el orden de COLUMNAS_HISTORIAL
+            sincronizar (bool): Esperar a que la transaccion llegue a disco
+        """
+        with closing(self._conectar()) as conexion:
+            if sincronizar:
+                conexion.execute('PRAGMA synchronous=FULL')
+            with conexion:
+                conexion.executemany(
+                    f"INSERT INTO consultas ({COLUMNAS_SQL}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", filas)
+        
+        self.actualizar_contadores()
+    
+    def _consultar(self, sql, parametros=()):
+        """Filas de una consulta como lista de diccionarios"""
+        try:
+            with closing(self._conectar()) as conexion:
+                return [dict(fila) for fila in conexion.execute(sql, parametros)]
+        except sqlite3.Error as error:
+            print(f"Error al leer historial: {error}")
+            return []
+    
+    def obtener_historial(self, limite=10):
+        """
+        Obtiene las ultimas consultas del historial
+        
+        Args:
+            limite (int): Numero maximo de consultas a retornar (None = todas)
+        
+        Returns:
+            list: Lista de consultas (mas recientes primero)
+        """
+        self.vaciar_pendientes()
+        return self._consultar(f"SELECT {COLUMNAS_SQL} FROM consultas ORDER BY id DESC LIMIT ?",
+                               (limite or -1,))
+    
+    def buscar_por_cultivo(self, texto, limite=None):
+        """
+        Consultas de los cultivos cuyo nombre empieza con el texto (sin
+        distinguir mayusculas), usando el indice de cultivo
+        
+        Args:
+            texto (str): Inicio del nombre del cultivo
+            limite (int): Maximo de consultas (por defecto CONSULTAS_BUSQUEDA_MAX)
+        
+        Returns:
+            list: Consultas encontradas (mas recientes primero)
+        """
+        limite = limite or ConfiguracionSistema.CONSULTAS_BUSQUEDA_MAX
+        self.vaciar_pendientes()
+        patron = texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self._consultar(
+            f"SELECT {COLUMNAS_SQL} FROM consultas WHERE cultivo LIKE ? ESCAPE '\\' "
+            f"ORDER BY id DESC LIMIT ?", (patron, limite))
+    
+    def consultas_entre(self, desde, hasta=None):
+        """
+        Consultas con desde <= fecha_hora < hasta, en orden cronologico,
+        usando el indice de fecha
+        
+        Args:
+            desde (datetime o str): Inicio del rango
+            hasta (datetime o str): Fin del rango, excluido (None = sin limite)
+        
+        Yields:
+            dict: Consultas del rango, leidas del cursor una a una
+        """
+        self.vaciar_pendientes()
+        sql = f"SELECT {COLUMNAS_SQL} FROM consultas WHERE fecha_hora >= ?"
+        parametros = [fecha_historial(desde)]
+        if hasta is not None:
+            sql += " AND fecha_hora < ?"
+            parametros.append(fecha_historial(hasta))
+        
+        with closing(self._conectar()) as conexion:
+            for fila in conexion.execute(sql + " ORDER BY fecha_hora, id", parametros):
+                yield dict(fila)
+    
+    def consultas_nuevas(self, marca=None):
+        """
+        Consultas escritas despues de una marca, en orden de id
+        
+        La generacion y las filas se leen en la misma transaccion; una marca
+        de otra generacion (la base se vacio despues) se ignora.
+        
+        Args:
+            marca (dict): Marca de la ultima consulta procesada (None = desde el inicio)
+        
+        Yields:
+            tuple: ({'generacion': ..., 'id': id de la consulta}, consulta como diccionario)
+        """
+        self.vaciar_pendientes()
+        
+        with closing(self._conectar()) as conexion:
+            conexion.execute('BEGIN')  # Una sola instantanea de la base (WAL)
+            generacion = self._generacion(conexion)
+            ultimo_procesado = marca['id'] if marca and marca.get('generacion') == generacion else 0
+            
+            filas = conexion.execute(f"SELECT id, {COLUMNAS_SQL} FROM consultas WHERE id > ? ORDER BY id",
+                                     (ultimo_procesado,))
+            for fila in filas:
+                consulta = dict(fila)
+                yield {'generacion': generacion, 'id': consulta.pop('id')}, consulta
+    
+    def _generacion(self, conexion):
+        """Generacion guardada en metadatos"""
+        return conexion.execute("SELECT valor FROM metadatos WHERE clave = 'generacion'").fetchone()[0]
+    
+    def generacion(self):
+        """Generacion actual de la base (cambia al vaciarla)"""
+        with closing(self._conectar()) as conexion:
+            return self._generacion(conexion)
+    
+    def _contar_filas_nuevas(self, contadores):
+        """Suma las filas con id mayor que contadores.posicion"""
+        with closing(self._conectar()) as conexion:
+            ultimo = conexion.execute("SELECT COALESCE(MAX(id), 0) FROM consultas").fetchone()[0]
+            if ultimo < contadores.datos['posicion']:
+                contadores.reiniciar()
+            
+            filas = conexion.execute(f"SELECT id, {COLUMNAS_SQL} FROM consultas WHERE id > ? ORDER BY id",
+                                     (contadores.datos['posicion'],))
+            for fila in filas:
+                contadores.agregar(dict(fila))
+                contadores.datos['posicion'] = fila['id']
+    
+    def _bloqueo_contadores(self):
+        """SQLite ya aisla las lecturas; no hace falta bloquear un archivo"""
+        return nullcontext()
+    
+    def _vaciar(self):
+        """Elimina todas las consultas de la base y empieza una generacion nueva"""
+        self.vaciar_pendientes()
+        with closing(self._conectar()) as conexion, conexion:
+            conexion.execute("DELETE FROM consultas")
+            conexion.execute("UPDATE metadatos SET valor = ? WHERE clave = 'generacion'", (nueva_generacion(),))
+        self.contadores.reiniciar()
+        self.contadores.guardar()
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    historial = HistorialSQLite()
+    historial.guardar_consulta("Panama City", "Tomate", 29.9, 73, 100, "EXCELENTE",
+                               "recomendaciones_cultivos")
+    
+    historial.mostrar_historial_simple()
+    historial.mostrar_estadisticas()
+    print(f"\nConsultas de tomate: {len(historial.buscar_por_cultivo('tom'))}")
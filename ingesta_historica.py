@@ -0,0 +1,293 @@
+# ingesta_historica.py
+"""
+Ingesta por bloques de archivos historicos de estaciones
+Lee CSV de cualquier tamaño en bloques fijos, los normaliza al esquema de
+ClimaAPI.obtener_pronostico_5dias y acumula estadisticas de idoneidad por
+estacion y cultivo sin guardar las filas, asi que la memoria no depende del
+tamaño del archivo.
+
+Uso:
+    python ingesta_historica.py estacion_david.csv estacion_chitre.csv --salida idoneidad_historica.csv
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import ConfiguracionSistema
+from motor_analisis import obtener_motor
+from normales_climaticas import columnas_origen
+
+
+COLUMNAS_PRONOSTICO = [
+    'fecha_hora', 'fecha', 'hora', 'temperatura', 'temp_minima', 'temp_maxima', 'humedad',
+    'descripcion', 'velocidad_viento', 'probabilidad_lluvia', 'lluvia_3h'
+]
+
+NIVELES = ['EXCELENTE', 'BUENO', 'REGULAR', 'MALO']
+
+
+def normalizar_bloque(bloque, estacion):
+    """
+    Convierte un bloque de un CSV de estacion al esquema del pronostico
+    
+    Las columnas se reconocen por ALIAS_COLUMNAS_HISTORICAS. Sin minima o
+    maxima se usa la temperatura; sin temperatura, el promedio de minima y
+    maxima. lluvia_3h guarda la lluvia del intervalo de cada registro.
+    
+    Args:
+        bloque (DataFrame): Filas leidas del archivo
+        estacion (str): Nombre a usar si el archivo no tiene columna de ciudad
+    
+    Returns:
+        DataFrame: Columna ciudad mas COLUMNAS_PRONOSTICO, sin filas sin fecha
+    """
+    origen = columnas_origen(bloque.columns)
+    if 'fecha_hora' not in origen:
+        raise ValueError(f"No se encontro columna de fecha en el archivo de {estacion}")
+    
+    def columna(nombre):
+        if nombre in origen:
+            return pd.to_numeric(bloque[origen[nombre]], errors='coerce').to_numpy(dtype=float)
+        return np.full(len(bloque), np.nan)
+    
+    momentos = pd.to_datetime(bloque[origen['fecha_hora']], errors='coerce')
+    fecha_hora = momentos.dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    temperatura = columna('temperatura')
+    temp_minima = columna('temp_minima')
+    temp_maxima = columna('temp_maxima')
+    temperatura = np.where(np.isnan(temperatura), (temp_minima + temp_maxima) / 2, temperatura)
+    lluvia = np.nan_to_num(columna('lluvia_3h'))
+    
+    normalizado = pd.DataFrame({
+        'ciudad': bloque[origen['ciudad']].astype(str).to_numpy() if 'ciudad' in origen else estacion,
+        'fecha_hora': fecha_hora.to_numpy(),
+        'fecha': fecha_hora.str[:10].to_numpy(),
+        'hora': fecha_hora.str[11:16].to_numpy(),
+        'temperatura': temperatura,
+        'temp_minima': np.where(np.isnan(temp_minima), temperatura, temp_minima),
+        'temp_maxima': np.where(np.isnan(temp_maxima), temperatura, temp_maxima),
+        'humedad': columna('humedad'),
+        'descripcion': 'historico',
+        'velocidad_viento': columna('velocidad_viento'),
+        # Los registros historicos no tienen probabilidad: 100% si llovio
+        'probabilidad_lluvia': np.where(lluvia > 0, 100.0, 0.0),
+        'lluvia_3h': lluvia
+    })
+    return normalizado[momentos.notna().to_numpy()]
+
+
+def leer_historico(archivo, filas_bloque=None):
+    """
+    Generador de bloques normalizados de un archivo historico
+    
+    Args:
+        archivo (str): Ruta del CSV
+        filas_bloque (int): Filas por bloque (por defecto INGESTA_FILAS_BLOQUE)
+    
+    Yields:
+        DataFrame: Bloque con el esquema de normalizar_bloque
+    """
+    filas_bloque = filas_bloque or ConfiguracionSistema.INGESTA_FILAS_BLOQUE
+    estacion = os.path.splitext(os.path.basename(archivo))[0]
+    for bloque in pd.read_csv(archivo, chunksize=filas_bloque):
+        yield normalizar_bloque(bloque, estacion)
+
+
+def ingerir_historicos(archivos, filas_bloque=None):
+    """
+    Generador de bloques normalizados de varios archivos, uno tras otro
+    
+    Yields:
+        DataFrame: Bloque con el esquema de normalizar_bloque
+    """
+    for archivo in archivos:
+        yield from leer_historico(archivo, filas_bloque)
+
+
+class EstadisticasIdoneidad:
+    """
+    Estadisticas de idoneidad por estacion y cultivo acumuladas bloque a bloque
+    
+    Solo guarda sumas y conteos por estacion x cultivo: registros, suma y
+    suma de cuadrados del puntaje, minimo, maximo y registros por nivel.
+    """
+    
+    def __init__(self, cultivos=None):
+        self.reglas = obtener_motor().reglas_evaluacion
+        self.reglas.compiladas()
+        claves = self.reglas.claves
+        self.cultivos = list(cultivos or claves)
+        self.indices = np.array([claves.index(c) for c in self.cultivos], dtype=int)
+        
+        self.estaciones = {}
+        forma = (0, len(self.cultivos))
+        self.registros = np.zeros(forma)
+        self.suma = np.zeros(forma)
+        self.suma_cuadrados = np.zeros(forma)
+        self.minimo = np.full(forma, np.inf)
+        self.maximo = np.full(forma, -np.inf)
+        self.por_nivel = np.zeros(forma + (len(NIVELES),))
+        self.descartadas = 0
+
+
+    def _agregar_estaciones(self, nombres):
+        """Agrega filas a los acumuladores para estaciones nuevas"""
+        nuevas = [e for e in nombres if e not in self.estaciones]
+        if not nuevas:
+            return
+        for estacion in nuevas:
+            self.estaciones[estacion] = len(self.estaciones)
+        
+        n = len(nuevas)
+        cultivos = len(self.cultivos)
+        self.registros = np.vstack([self.registros, np.zeros((n, cultivos))])
+        self.suma = np.vstack([self.suma, np.zeros((n, cultivos))])
+        self.suma_cuadrados = np.vstack([self.suma_cuadrados, np.zeros((n, cultivos))])
+        self.minimo = np.vstack([self.minimo, np.full((n, cultivos), np.inf)])
+        self.maximo = np.vstack([self.maximo, np.full((n, cultivos), -np.inf)])
+        self.por_nivel = np.concatenate([self.por_nivel, np.zeros((n, cultivos, len(NIVELES)))])
+
+
+    def actualizar(self, bloque):
+        """
+        Evalua un bloque normalizado y suma sus resultados
+        
+        Los registros sin temperatura o humedad se descartan.
+        
+        Args:
+            bloque (DataFrame): Bloque con ciudad, fecha, temperatura y humedad
+        """
+        config = ConfiguracionSistema
+        temperatura = bloque['temperatura'].to_numpy(dtype=float)
+        humedad = bloque['humedad'].to_numpy(dtype=float)
+        validas = ~(np.isnan(temperatura) | np.isnan(humedad))
+        self.descartadas += int((~validas).sum())
+        if not validas.any():
+            return
+        
+        ciudades = bloque['ciudad'].to_numpy()[validas]
+        self._agregar_estaciones(pd.unique(ciudades))
+        fila = pd.Series(ciudades).map(self.estaciones).to_numpy(dtype=int)
+        meses = pd.Series(bloque['fecha'].to_numpy()[validas]).str[5:7].astype(int).to_numpy()
+        
+        evaluacion = self.reglas.evaluar({
+            'temperatura': temperatura[validas],
+            'humedad': humedad[validas],
+            'mes': meses
+        })
+        puntajes = np.clip(evaluacion['puntajes'][:, self.indices], 0, config.PUNTAJE_MAXIMO)
+        nivel = np.select([puntajes >= config.PUNTAJE_EXCELENTE, puntajes >= config.PUNTAJE_BUENO,
+                           puntajes >= config.PUNTAJE_REGULAR], [0, 1, 2], 3)
+        
+        # Sumas por estacion con un solo bincount por estadistica
+        n_estaciones, n_cultivos = self.registros.shape
+        celda = (fila[:, np.newaxis] * n_cultivos + np.arange(n_cultivos)).ravel()
+        largo = n_estaciones * n_cultivos
+        
+        def sumar(pesos=None):
+            return np.bincount(celda, weights=pesos, minlength=largo).reshape(n_estaciones, n_cultivos)
+        
+        valores = puntajes.ravel()
+        self.registros += sumar()
+        self.suma += sumar(valores)
+        self.suma_cuadrados += sumar(valores ** 2)
+        np.minimum.at(self.minimo.reshape(-1), celda, valores)
+        np.maximum.at(self.maximo.reshape(-1), celda, valores)
+        self.por_nivel += np.bincount(celda * len(NIVELES) + nivel.ravel(),
+                                      minlength=largo * len(NIVELES)).reshape(self.por_nivel.shape)
+
+
+    def tabla(self):
+        """
+        Estadisticas acumuladas en formato largo
+        
+        Returns:
+            DataFrame: Por estacion y cultivo, registros, promedio, desviacion,
+                       minimo, maximo y porcentaje de registros por nivel
+        """
+        i, j = np.nonzero(self.registros)
+        registros = self.registros[i, j]
+        promedio = self.suma[i, j] / registros
+        varianza = np.maximum(self.suma_cuadrados[i, j] / registros - promedio ** 2, 0.0)
+        
+        tabla = pd.DataFrame({
+            'ciudad': np.asarray(list(self.estaciones), dtype=object)[i],
+            'cultivo': np.asarray(self.cultivos)[j],
+            'registros': registros.astype(int),
+            'puntaje_promedio': promedio.round(1),
+            'puntaje_desviacion': np.sqrt(varianza).round(1),
+            'puntaje_min': self.minimo[i, j].round(1),
+            'puntaje_max': self.maximo[i, j].round(1)
+        })
+        for k, nivel in enumerate(NIVELES):
+            tabla[f'pct_{nivel.lower()}'] = (100 * self.por_nivel[i, j, k] / registros).round(1)
+        return tabla
+
+
+def procesar_historicos(archivos, filas_bloque=None, cultivos=None, mostrar_progreso=False):
+    """
+    Ingesta completa: lee, normaliza y acumula estadisticas de idoneidad
+    
+    Args:
+        archivos (list): Rutas de los CSV de estaciones
+        filas_bloque (int): Filas por bloque
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+        mostrar_progreso (bool): Imprimir filas y velocidad despues de cada bloque
+    
+    Returns:
+        dict: 'estadisticas' (DataFrame), 'filas', 'filas_descartadas',
+              'segundos' y 'filas_por_segundo'
+    """
+    estadisticas = EstadisticasIdoneidad(cultivos)
+    filas = 0
+    inicio = time.perf_counter()
+    
+    for bloque in ingerir_historicos(archivos, filas_bloque):
+        estadisticas.actualizar(bloque)
+        filas += len(bloque)
+        if mostrar_progreso:
+            segundos = time.perf_counter() - inicio
+            print(f"  {filas} filas ({filas / max(segundos, 1e-9):.0f} filas/s)")
+    
+    segundos = time.perf_counter() - inicio
+    return {
+        'estadisticas': estadisticas.tabla(),
+        'filas': filas,
+        'filas_descartadas': estadisticas.descartadas,
+        'segundos': segundos,
+        'filas_por_segundo': filas / max(segundos, 1e-9)
+    }
+
+
+def main():
+    """Procesa archivos historicos desde la linea de comandos"""
+    parser = argparse.ArgumentParser(description='Idoneidad de cultivos sobre archivos historicos de estaciones')
+    parser.add_argument('archivos', nargs='+', help='CSV de estaciones (fecha, temperatura, humedad, ...)')
+    parser.add_argument('--salida', help='CSV donde guardar las estadisticas')
+    parser.add_argument('--filas-bloque', type=int, help='Filas leidas a la vez')
+    parser.add_argument('--progreso', action='store_true', help='Mostrar avance por bloque')
+    args = parser.parse_args()
+    
+    print("Procesando archivos historicos...")
+    resultado = procesar_historicos(args.archivos, args.filas_bloque, mostrar_progreso=args.progreso)
+    
+    print(f"\nFilas leidas: {resultado['filas']} (descartadas sin temperatura o humedad: "
+          f"{resultado['filas_descartadas']})")
+    print(f"Tiempo: {resultado['segundos']:.2f} s ({resultado['filas_por_segundo']:.0f} filas/s)")
+    
+    estadisticas = resultado['estadisticas']
+    if args.salida:
+        estadisticas.to_csv(args.salida, index=False)
+        print(f"Estadisticas guardadas en: {args.salida}")
+    else:
+        print("\nPuntaje promedio por estacion y cultivo:")
+        print(estadisticas.pivot(index='ciudad', columns='cultivo', values='puntaje_promedio'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,377 @@
+# lote_regional.py
+"""
+Lote regional de recomendaciones
+Calcula las recomendaciones de cultivos de todas las ciudades en una sola
+ejecucion y guarda una tabla precalculada para los menus y cualquier API
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from analisis_simple import AnalizadorAgricola
+from base_datos_cultivos import cultivos_panama
+from conexion_clima import ClimaAPI
+from config import ConfiguracionSistema
+from riesgo_enfermedades import presion_enfermedades, tabla_riesgo_enfermedades
+
+
+COLUMNAS_EVALUACION = [
+    'generado', 'ciudad', 'ciudad_api', 'fecha_hora', 'temperatura', 'humedad',
+    'descripcion', 'posicion', 'cultivo', 'puntaje', 'nivel', 'alertas', 'recomendaciones'
+]
+
+COLUMNAS_HONGOS = ['indice_hongos', 'nivel_hongos', 'inicio_pico_hongos', 'fin_pico_hongos']
+
+COLUMNAS_RESULTADO = COLUMNAS_EVALUACION + COLUMNAS_HONGOS
+
+SEPARADOR_TEXTOS = ' | '
+
+# Analizador de cada proceso del pool (se crea una vez por proceso)
+_analizador_proceso = None
+
+
+def _iniciar_proceso():
+    """Inicializa el analizador en cada proceso trabajador"""
+    global _analizador_proceso
+    _analizador_proceso = AnalizadorAgricola()
+
+
+def _evaluar_clima(clima):
+    """Evalua todos los cultivos para el clima de una ciudad (en un proceso del pool)"""
+    if _analizador_proceso is None:
+        _iniciar_proceso()
+    return _analizador_proceso.evaluar_todos_los_cultivos(clima)
+
+
+def cargar_lista_ciudades(archivo):
+    """
+    Lee una lista de ciudades desde un archivo
+    
+    Acepta un CSV con columna 'ciudad' o un texto con una ciudad por linea.
+    
+    Returns:
+        list: Nombres de ciudades
+    """
+    if archivo.lower().endswith('.csv'):
+        df = pd.read_csv(archivo)
+        if 'ciudad' in df.columns:
+            return [c.strip() for c in df['ciudad'].dropna().astype(str) if c.strip()]
+    
+    with open(archivo, 'r', encoding='utf-8') as f:
+        return [linea.strip() for linea in f if linea.strip() and not linea.startswith('#')]
+
+
+def descargar_climas(ciudades, clima_api=None, hilos=None):
+    """
+    Obtiene el clima actual de varias ciudades en paralelo
+    
+    Returns:
+        dict: Clima por ciudad (None si la consulta fallo)
+    """
+    clima_api = clima_api or ClimaAPI()
+    hilos = hilos or ConfiguracionSistema.LOTE_HILOS_DESCARGA
+    
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        climas = list(executor.map(clima_api.obtener_clima_actual, ciudades))
+    
+    return dict(zip(ciudades, climas))
+
+
+def descargar_pronosticos(ciudades, clima_api=None, hilos=None):
+    """
+    Obtiene el pronostico de 5 dias de varias ciudades en paralelo
+    
+    Returns:
+        dict: DataFrame de pronostico por ciudad (solo las que respondieron)
+    """
+    clima_api = clima_api or ClimaAPI()
+    hilos = hilos or ConfiguracionSistema.LOTE_HILOS_DESCARGA
+    
+    with ThreadPoolExecutor(max_workers=hilos) as executor:
+        pronosticos = list(executor.map(clima_api.obtener_pronostico_5dias, ciudades))
+    
+    return {c: p for c, p in zip(ciudades, pronosticos) if p is not None}
+
+
+def evaluar_climas(climas, procesos=None):
+    """
+    Evalua todos los cultivos para cada ciudad en un pool de procesos
+    
+    Args:
+        climas (dict): Clima por ciudad (solo ciudades con datos)
+        procesos (int): Procesos del pool; 1 evalua en el proceso actual
+    
+    Returns:
+        dict: Evaluaciones ordenadas por ciudad
+    """
+    ciudades = list(climas.keys())
+    procesos = procesos or ConfiguracionSistema.LOTE_PROCESOS or os.cpu_count() or 1
+    
+    if procesos <= 1 or len(ciudades) <= 1:
+        resultados = [_evaluar_clima(climas[c]) for c in ciudades]
+    else:
+        tamaño_bloque = max(1, len(ciudades) // (procesos * 4))
+        with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar_proceso) as executor:
+            resultados = list(executor.map(_evaluar_clima, [climas[c] for c in ciudades],
+                                           chunksize=tamaño_bloque))
+    
+    return dict(zip(ciudades, resultados))
+
+
+def construir_tabla(climas, evaluaciones, riesgo_hongos=None):
+    """
+    Convierte las evaluaciones en una tabla plana (una fila por ciudad y cultivo)
+    
+    Args:
+        climas (dict): Clima por ciudad
+        evaluaciones (dict): Evaluaciones ordenadas por ciudad
+        riesgo_hongos (DataFrame): Tabla de tabla_riesgo_enfermedades (opcional)
+    
+    Returns:
+        pandas.DataFrame: Tabla con COLUMNAS_RESULTADO
+    """
+    generado = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    filas = []
+    
+    for ciudad, lista in evaluaciones.items():
+        clima = climas[ciudad]
+        for posicion, evaluacion in enumerate(lista, 1):
+            filas.append({
+                'generado': generado,
+                'ciudad': ciudad,
+                'ciudad_api': clima['ciudad'],
+                'fecha_hora': clima['fecha_hora'],
+                'temperatura': clima['temperatura'],
+                'humedad': clima['humedad'],
+                'descripcion': clima['descripcion'],
+                'posicion': posicion,
+                'cultivo': evaluacion['cultivo'],
+                'puntaje': evaluacion['puntaje'],
+                'nivel': evaluacion['nivel'],
+                'alertas': SEPARADOR_TEXTOS.join(evaluacion['alertas']),
+                'recomendaciones': SEPARADOR_TEXTOS.join(evaluacion['recomendaciones'])
+            })
+    
+    tabla = pd.DataFrame(filas, columns=COLUMNAS_EVALUACION)
+    
+    if riesgo_hongos is None or riesgo_hongos.empty:
+        return tabla.reindex(columns=COLUMNAS_RESULTADO)
+    
+    # Las evaluaciones usan el nombre del cultivo, no su clave
+    nombres = {clave: datos['nombre'] for clave, datos in cultivos_panama.items()}
+    hongos = riesgo_hongos.rename(columns={'inicio_pico': 'inicio_pico_hongos',
+                                           'fin_pico': 'fin_pico_hongos'})
+    hongos['cultivo'] = hongos['cultivo'].map(nombres)
+    tabla = tabla.merge(hongos[['ciudad', 'cultivo'] + COLUMNAS_HONGOS],
+                        on=['ciudad', 'cultivo'], how='left')
+    return tabla[COLUMNAS_RESULTADO]
+
+
+def guardar_tabla(df, archivo):
+    """
+    Guarda la tabla en CSV, Parquet o SQLite segun la extension del archivo
+    """
+    extension = os.path.splitext(archivo)[1].lower()
+    
+    if extension == '.parquet':
+        df.to_parquet(archivo, index=False)
+    elif extension in ('.db', '.sqlite', '.sqlite3'):
+        with closing(sqlite3.connect(archivo)) as conexion:
+            df.to_sql('recomendaciones', conexion, if_exists='replace', index=False)
+            conexion.execute('CREATE INDEX IF NOT EXISTS idx_recomendaciones_ciudad '
+                             'ON recomendaciones (ciudad)')
+            conexion.commit()
+    else:
+        df.to_csv(archivo, index=False, encoding='utf-8')
+
+
+def ejecutar_lote(ciudades=None, archivo_salida=None, hilos=None, procesos=None, clima_api=None,
+                  riesgo_enfermedades=None):
+    """
+    Ejecuta el lote completo: descarga, evaluacion y escritura
+    
+    Args:
+        ciudades (list): Ciudades a procesar (por defecto CIUDADES_PANAMA)
+        archivo_salida (str): Destino .csv, .parquet o .db
+        hilos (int): Descargas simultaneas
+        procesos (int): Procesos para evaluar
+        riesgo_enfermedades (bool): Agregar el indice de hongos del pronostico
+                                    (por defecto LOTE_RIESGO_ENFERMEDADES)
+    
+    Returns:
+        dict: Resumen con ciudades procesadas, fallidas y tiempos por etapa
+    """
+    ciudades = ciudades or ConfiguracionSistema.CIUDADES_PANAMA
+    archivo_salida = archivo_salida or ConfiguracionSistema.ARCHIVO_LOTE_RECOMENDACIONES
+    if riesgo_enfermedades is None:
+        riesgo_enfermedades = ConfiguracionSistema.LOTE_RIESGO_ENFERMEDADES
+    clima_api = clima_api or ClimaAPI()
+    tiempos = {}
+    inicio = time.perf_counter()
+    
+    # Etapa 1: descarga concurrente
+    t0 = time.perf_counter()
+    climas = descargar_climas(ciudades, clima_api, hilos)
+    tiempos['descarga'] = time.perf_counter() - t0
+    
+    fallidas = [c for c, clima in climas.items() if not clima]
+    climas = {c: clima for c, clima in climas.items() if clima}
+    
+    # Etapa 2: evaluacion en pool de procesos
+    t0 = time.perf_counter()
+    evaluaciones = evaluar_climas(climas, procesos)
+    tiempos['evaluacion'] = time.perf_counter() - t0
+    
+    # Etapa 3: indice de hongos sobre los pronosticos de todas las ciudades
+    riesgo_hongos = None
+    if riesgo_enfermedades:
+        t0 = time.perf_counter()
+        pronosticos = descargar_pronosticos(list(climas.keys()), clima_api, hilos)
+        riesgo_hongos = tabla_riesgo_enfermedades(presion_enfermedades(pronosticos))
+        tiempos['enfermedades'] = time.perf_counter() - t0
+    
+    # Etapa 4: escritura de la tabla precalculada
+    t0 = time.perf_counter()
+    tabla = construir_tabla(climas, evaluaciones, riesgo_hongos)
+    guardar_tabla(tabla, archivo_salida)
+    tiempos['escritura'] = time.perf_counter() - t0
+    
+    tiempos['total'] = time.perf_counter() - inicio
+    
+    return {
+        'archivo': archivo_salida,
+        'ciudades_procesadas': len(climas),
+        'ciudades_fallidas': fallidas,
+        'filas': len(tabla),
+        'tiempos': tiempos
+    }
+
+
+def leer_tabla(archivo, ciudad=None):
+    """
+    Lee la tabla precalculada, opcionalmente solo las filas de una ciudad
+    
+    Returns:
+        pandas.DataFrame: Filas encontradas (vacio si el archivo no existe)
+    """
+    if not os.path.exists(archivo):
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO)
+    
+    extension = os.path.splitext(archivo)[1].lower()
+    
+    if extension in ('.db', '.sqlite', '.sqlite3'):
+        with closing(sqlite3.connect(archivo)) as conexion:
+            if ciudad is None:
+                return pd.read_sql('SELECT * FROM recomendaciones', conexion)
+            return pd.read_sql('SELECT * FROM recomendaciones WHERE ciudad = ? ORDER BY posicion',
+                               conexion, params=(ciudad,))
+    
+    if extension == '.parquet':
+        df = pd.read_parquet(archivo)
+    else:
+        df = pd.read_csv(archivo, keep_default_na=False)
+    
+    if ciudad is not None:
+        df = df[df['ciudad'] == ciudad].sort_values('posicion')
+    return df
+
+
+def cargar_recomendaciones_precalculadas(ciudad, k=None, archivo=None, vigencia_minutos=None):
+    """
+    Recomendaciones de una ciudad desde la tabla del lote, si estan vigentes
+    
+    Args:
+        ciudad (str): Ciudad tal como se paso al lote
+        k (int): Numero de cultivos a retornar (todos por defecto)
+        archivo (str): Tabla precalculada
+        vigencia_minutos (int): Antiguedad maxima aceptada
+    
+    Returns:
+        dict: Mismo formato que recomendar_cultivos, o None si no hay datos vigentes
+    """
+    archivo = archivo or ConfiguracionSistema.ARCHIVO_LOTE_RECOMENDACIONES
+    vigencia_minutos = vigencia_minutos or ConfiguracionSistema.LOTE_VIGENCIA_MINUTOS
+    
+    try:
+        df = leer_tabla(archivo, ciudad)
+    except Exception as error:
+        print(f"Error al leer recomendaciones precalculadas: {error}")
+        return None
+    
+    if df.empty:
+        return None
+    
+    generado = datetime.strptime(str(df['generado'].iloc[0]), '%Y-%m-%d %H:%M:%S')
+    if datetime.now() - generado > timedelta(minutes=vigencia_minutos):
+        return None
+    
+    if k is not None:
+        df = df.head(k)
+    
+    def separar(texto):
+        return [t for t in str(texto).split(SEPARADOR_TEXTOS) if t] if texto else []
+    
+    primera = df.iloc[0]
+    clima = {
+        'ciudad': primera['ciudad_api'],
+        'fecha_hora': primera['fecha_hora'],
+        'temperatura': float(primera['temperatura']),
+        'humedad': float(primera['humedad']),
+        'descripcion': primera['descripcion']
+    }
+    evaluaciones = [
+        {
+            'cultivo': fila['cultivo'],
+            'puntaje': fila['puntaje'],
+            'nivel': fila['nivel'],
+            'alertas': separar(fila['alertas']),
+            'recomendaciones': separar(fila['recomendaciones'])
+        }
+        for _, fila in df.iterrows()
+    ]
+    
+    return {
+        'clima_actual': clima,
+        'evaluaciones': evaluaciones,
+        'fecha_analisis': generado.strftime('%d/%m/%Y %H:%M'),
+        'precalculado': True
+    }
+
+
+def main():
+    """Ejecuta el lote desde la linea de comandos"""
+    parser = argparse.ArgumentParser(description='Lote regional de recomendaciones de cultivos')
+    parser.add_argument('--ciudades', help='Archivo con ciudades (CSV con columna ciudad o una por linea)')
+    parser.add_argument('--salida', help='Archivo de salida (.csv, .parquet o .db)')
+    parser.add_argument('--hilos', type=int, help='Descargas simultaneas')
+    parser.add_argument('--procesos', type=int, help='Procesos para evaluar')
+    parser.add_argument('--sin-enfermedades', action='store_true',
+                        help='No descargar pronosticos para el indice de hongos')
+    args = parser.parse_args()
+    
+    ciudades = cargar_lista_ciudades(args.ciudades) if args.ciudades else None
+    
+    print("Ejecutando lote regional de recomendaciones...")
+    resumen = ejecutar_lote(ciudades, args.salida, args.hilos, args.procesos,
+                            riesgo_enfermedades=False if args.sin_enfermedades else None)
+    
+    print(f"\nArchivo generado: {resumen['archivo']}")
+    print(f"Ciudades procesadas: {resumen['ciudades_procesadas']}")
+    print(f"Filas escritas: {resumen['filas']}")
+    if resumen['ciudades_fallidas']:
+        print(f"Ciudades sin datos: {', '.join(resumen['ciudades_fallidas'])}")
+    
+    print("\nTiempos por etapa:")
+    for etapa, segundos in resumen['tiempos'].items():
+        print(f"  - {etapa}: {segundos:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+# motor_analisis.py
+"""
+Motor unico de analisis agricola
+Evalua cultivos y riesgos con reglas compiladas y un cache compartido
+por todas las versiones del analizador
+"""
+
+import numpy as np
+
+from balance_hidrico import series_pronostico, simular_balance
+from base_datos_cultivos import cultivos_panama
+from cache_evaluaciones import CacheLRU, clave_evaluacion
+from conexion_clima import ClimaAPI
+from config import ConfiguracionSistema
+from reglas_evaluacion import reglas_evaluacion_config, reglas_riesgo_config
+from tabla_idoneidad import TablaIdoneidad, obtener_tabla_idoneidad
+
+
+class MotorAnalisis:
+    """
+    Calculo numerico de evaluaciones y riesgos para todo el catalogo
+    
+    No genera textos: los adaptadores de presentacion (AnalizadorBase y sus
+    subclases) convierten los resultados en alertas y recomendaciones.
+    """
+    
+    def __init__(self, reglas_evaluacion=None, reglas_riesgo=None, tamaño_cache=None):
+        self.reglas_evaluacion = reglas_evaluacion or reglas_evaluacion_config()
+        self.reglas_riesgo = reglas_riesgo or reglas_riesgo_config()
+        
+        # La tabla compartida corresponde a las reglas de config
+        if reglas_evaluacion is None:
+            self._tabla = None
+        else:
+            self._tabla = TablaIdoneidad(self.reglas_evaluacion)
+        
+        self.cache = CacheLRU(tamaño_cache or ConfiguracionSistema.CACHE_EVALUACIONES_MAX)
+    
+    def tabla(self):
+        """Tabla de idoneidad vigente para las reglas del motor"""
+        if self._tabla is None:
+            return obtener_tabla_idoneidad()
+        return self._tabla.vigente()
+    
+    def evaluar(self, clima_actual, mes):
+        """
+        Evalua todos los cultivos para una observacion del clima
+        
+        Args:
+            clima_actual (dict): Debe incluir 'temperatura' y 'humedad'
+            mes (str): Mes en español para la regla de temporada
+        
+        Returns:
+            dict: 'claves', 'indices', 'puntajes' y por regla 'activas' y
+                  'por_debajo' (arreglos de longitud n_cultivos)
+        """
+        clave = clave_evaluacion(clima_actual, mes)
+        if clave:
+            clave = clave + ('numerico', id(self.reglas_evaluacion))
+            resultado = self.cache.obtener(clave)
+            if resultado is not None:
+                return resultado
+        
+        valores = {
+            'temperatura': [clima_actual['temperatura']],
+            'humedad': [clima_actual['humedad']],
+            'mes': [ConfiguracionSistema.MESES.index(mes.lower()) + 1],
+        }
+        evaluacion = self.reglas_evaluacion.evaluar(valores)
+        
+        por_debajo = {}
+        for regla in self.reglas_evaluacion.compiladas():
+            if regla.tipo == 'desviacion':
+                por_debajo[regla.nombre] = regla.por_debajo(valores[regla.variable])[0]
+        
+        claves = self.reglas_evaluacion.claves
+        resultado = {
+            'claves': claves,
+            'indices': {c: i for i, c in enumerate(claves)},
+            'puntajes': evaluacion['puntajes'][0],
+            'activas': {nombre: activa[0] for nombre, activa in evaluacion['activas'].items()},
+            'por_debajo': por_debajo,
+        }
+        
+        if clave:
+            self.cache.guardar(clave, resultado)
+        return resultado
+    
+    def mejores_cultivos(self, temperatura, humedad, mes, k=5):
+        """
+        Los k cultivos de mayor puntaje segun la tabla de idoneidad
+        
+        Returns:
+            list: Tuplas (clave_cultivo, puntaje) de mejor a peor
+        """
+        return self.tabla().mejores_cultivos(temperatura, humedad, mes, k)
+    
+    def riesgos_ciudades(self, pronosticos, cultivos=None):
+        """
+        Riesgos del pronostico para todas las ciudades y cultivos a la vez
+        
+        Cada pronostico se reduce una sola vez a sus indicadores. Los riesgos
+        de inundacion y sequia salen del balance hidrico del suelo, simulado
+        para ciudades x cultivos a la vez; las reglas de riesgo se aplican
+        como operaciones sobre arreglos ciudades x cultivos.
+        
+        Args:
+            pronosticos (dict): DataFrame de pronostico por ciudad
+            cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+        
+        Returns:
+            dict: 'ciudades', 'cultivos', 'indicadores' (arreglo por ciudad o
+                  matriz ciudades x cultivos) y 'activas' (matriz por regla)
+        """
+        reglas = self.reglas_riesgo.compiladas()
+        claves = self.reglas_riesgo.claves
+        
+        if cultivos is None:
+            cultivos = claves
+        indices = [claves.index(c) for c in cultivos]
+        
+        ciudades = list(pronosticos.keys())
+        indicadores = {
+            'lluvia_total': np.zeros(len(ciudades)),
+            'temp_max': np.zeros(len(ciudades)),
+            'temp_min': np.zeros(len(ciudades)),
+        }
+        
+        # Reducir cada pronostico a sus indicadores (una pasada por ciudad)
+        for i, ciudad in enumerate(ciudades):
+            df = pronosticos[ciudad]
+            indicadores['lluvia_total'][i] = df['lluvia_3h'].sum()
+            indicadores['temp_max'][i] = df['temp_maxima'].max()
+            indicadores['temp_min'][i] = df['temp_minima'].min()
+        
+        # Balance hidrico diario de todas las ciudades y cultivos del catalogo
+        series = series_pronostico(pronosticos)
+        balance = simular_balance(series['lluvia'], series['et0'], claves)
+        filas = [ciudades.index(ciudad) for ciudad in series['ciudades']]
+        for nombre in ('dias_inundacion', 'dias_sequia', 'primer_dia_inundacion', 'primer_dia_sequia'):
+            indicadores[nombre] = np.zeros((len(ciudades), len(claves)), dtype=int)
+            indicadores[nombre][filas] = balance[nombre]
+        
+        activas = {}
+        for regla in reglas:
+            activa, _ = regla.aplicar(indicadores[regla.variable])
+            activas[regla.nombre] = activa[:, indices]
+        
+        for nombre, valores in indicadores.items():
+            if valores.ndim == 2:
+                indicadores[nombre] = valores[:, indices]
+        
+        return {
+            'ciudades': ciudades,
+            'cultivos': list(cultivos),
+            'indicadores': indicadores,
+            'activas': activas,
+        }
+
+
+_motor_compartido = None
+
+
+def obtener_motor():
+    """
+    Retorna el motor compartido por todos los analizadores
+    
+    Usar una sola instancia permite que todas las entradas del sistema
+    aprovechen el mismo cache ya caliente.
+    """
+    global _motor_compartido
+    if _motor_compartido is None:
+        _motor_compartido = MotorAnalisis()
+    return _motor_compartido
+
+
+class AnalizadorBase:
+    """
+    Adaptador de presentacion sobre el motor de analisis
+    
+    Las subclases definen el estilo de salida con MENSAJES (plantillas de
+    alertas y recomendaciones por regla), el redondeo del puntaje y si
+    agregan un color por nivel. Las plantillas pueden usar {valor}, {limite},
+    {meses} y {mes}.
+    """
+    
+    ESTILO = 'base'
+    MENSAJES = {}
+    DECIMALES_PUNTAJE = None
+    COLORES_NIVEL = None
+    
+    def __init__(self, motor=None):
+        self.clima_api = ClimaAPI()
+        self.mes_actual = ConfiguracionSistema.obtener_mes_actual()
+        self.motor = motor or obtener_motor()
+        
+        # Evaluaciones ya calculadas por observacion del clima (compartido)
+        self.cache_evaluaciones = self.motor.cache
+    
+    def evaluar_condiciones_cultivo(self, cultivo, clima_actual):
+        """
+        Evalua si las condiciones actuales son adecuadas para un cultivo
+        
+        Returns:
+            dict: Evaluacion con puntaje y alertas
+        """
+        resultado = self.motor.evaluar(clima_actual, self.mes_actual)
+        return self.formatear_evaluacion(cultivo, resultado, clima_actual)
+    
+    def formatear_evaluacion(self, cultivo, resultado, clima_actual):
+        """
+        Convierte el resultado numerico del motor en el diccionario de evaluacion
+        """
+        config = ConfiguracionSistema
+        datos_cultivo = cultivos_panama[cultivo]
+        i = resultado['indices'][cultivo]
+        
+        evaluacion = {
+            'cultivo': datos_cultivo['nombre'],
+            'puntaje': config.PUNTAJE_MAXIMO,
+            'nivel': 'EXCELENTE',
+            'alertas': [],
+            'recomendaciones': []
+        }
+        
+        campos = {
+            'meses': ', '.join(datos_cultivo['temporada_siembra']),
+            'mes': self.mes_actual.capitalize()
+        }
+        valores = {
+            'temperatura': clima_actual['temperatura'],
+            'humedad': clima_actual['humedad'],
+            'mes': self.mes_actual
+        }
+        
+        # Recorrer las reglas por grupo, en el orden declarado
+        hubo_penalizacion = False
+        penalizaciones_enteras = True
+        grupos = []
+        for regla in self.motor.reglas_evaluacion.compiladas():
+            if not grupos or grupos[-1][0] != regla.grupo:
+                grupos.append((regla.grupo, []))
+            grupos[-1][1].append(regla)
+        
+        for grupo, reglas in grupos:
+            activas = [regla for regla in reglas if resultado['activas'][regla.nombre][i]]
+            
+            if not activas:
+                plantilla = self.MENSAJES.get(f"{grupo}_ok")
+                if plantilla:
+                    self._agregar_mensajes(evaluacion, plantilla, dict(
+                        campos, valor=valores[reglas[0].variable]))
+                continue
+            
+            for regla in activas:
+                hubo_penalizacion = hubo_penalizacion or regla.factor > 0
+                penalizaciones_enteras = (penalizaciones_enteras and regla.tipo == 'temporada'
+                                          and regla.factor.is_integer())
+                nombre = regla.nombre
+                if regla.tipo == 'desviacion':
+                    nombre += '_baja' if resultado['por_debajo'][regla.nombre][i] else '_alta'
+                
+                limite = datos_cultivo[regla.campo] if regla.campo else None
+                self._agregar_mensajes(evaluacion, self.MENSAJES.get(nombre, (None, None)), dict(
+                    campos, valor=valores[regla.variable], limite=limite))
+        
+        if hubo_penalizacion:
+            # Las penalizaciones fijas (temporada) mantienen el puntaje entero
+            puntaje = float(resultado['puntajes'][i])
+            evaluacion['puntaje'] = int(puntaje) if penalizaciones_enteras else puntaje
+        
+        # Determinar nivel segun puntaje
+        puntaje = evaluacion['puntaje']
+        if puntaje >= config.PUNTAJE_EXCELENTE:
+            evaluacion['nivel'] = 'EXCELENTE'
+        elif puntaje >= config.PUNTAJE_BUENO:
+            evaluacion['nivel'] = 'BUENO'
+        elif puntaje >= config.PUNTAJE_REGULAR:
+            evaluacion['nivel'] = 'REGULAR'
+        else:
+            evaluacion['nivel'] = 'MALO'
+        
+        if self.COLORES_NIVEL:
+            evaluacion['color'] = self.COLORES_NIVEL[evaluacion['nivel']]
+        
+        # Asegurar que el puntaje no sea negativo
+        if self.DECIMALES_PUNTAJE is not None:
+            puntaje = round(puntaje, self.DECIMALES_PUNTAJE)
+        evaluacion['puntaje'] = max(0, puntaje)
+        
+        return evaluacion
+    
+    def _agregar_mensajes(self, evaluacion, plantilla, campos):
+        """Agrega la alerta y la recomendacion de una plantilla (alerta, recomendacion)"""
+        alerta, recomendacion = plantilla
+        if alerta:
+            evaluacion['alertas'].append(alerta.format(**campos))
+        if recomendacion:
+            evaluacion['recomendaciones'].append(recomendacion.format(**campos))
+    
+    def _clave_estilo(self, clima_actual, cultivo=None):
+        """Clave de cache para evaluaciones ya formateadas en este estilo"""
+        clave = clave_evaluacion(clima_actual, self.mes_actual, cultivo)
+        return clave + (self.ESTILO, id(self.motor.reglas_evaluacion)) if clave else None
+    
+    def evaluar_cultivo_con_cache(self, cultivo, clima_actual):
+        """
+        Evalua un cultivo reutilizando el resultado si la observacion ya se evaluo
+        
+        Las evaluaciones guardadas se comparten entre llamadas, no deben modificarse.
+        """
+        clave = self._clave_estilo(clima_actual, cultivo)
+        evaluacion = self.cache_evaluaciones.obtener(clave) if clave else None
+        
+        if evaluacion is None:
+            evaluacion = self.evaluar_condiciones_cultivo(cultivo, clima_actual)
+            if clave:
+                self.cache_evaluaciones.guardar(clave, evaluacion)
+        
+        return evaluacion
+    
+    def evaluar_todos_los_cultivos(self, clima_actual):
+        """
+        Evalua todos los cultivos para una observacion, usando el cache
+        
+        Returns:
+            list: Evaluaciones ordenadas por puntaje (mejor primero)
+        """
+        clave = self._clave_estilo(clima_actual)
+        evaluaciones = self.cache_evaluaciones.obtener(clave) if clave else None
+        
+        if evaluaciones is None:
+            resultado = self.motor.evaluar(clima_actual, self.mes_actual)
+            evaluaciones = [
+                self.formatear_evaluacion(cultivo, resultado, clima_actual)
+                for cultivo in resultado['claves']
+            ]
+            
+            # Ordenar por puntaje (mejor primero)
+            evaluaciones.sort(key=lambda x: x['puntaje'], reverse=True)
+            
+            if clave:
+                self.cache_evaluaciones.guardar(clave, evaluaciones)
+        
+        return list(evaluaciones)
+    
+    def evaluar_mejores_cultivos(self, clima_actual, k=5):
+        """
+        Evaluaciones completas solo para los k cultivos de mayor puntaje
+        
+        La tabla de idoneidad preselecciona al menos 2k candidatos, mas los que
+        quedan a menos de un punto del k-esimo (el redondeo del estilo puede
+        empatarlos). Solo los candidatos se evaluan con las reglas, y se ordenan
+        por el puntaje mostrado con los empates en el orden del catalogo,
+        igual que evaluar_todos_los_cultivos.
+        """
+        n = 2 * k
+        while True:
+            candidatos = self.motor.mejores_cultivos(
+                clima_actual['temperatura'], clima_actual['humedad'], self.mes_actual, n
+            )
+            if not candidatos or len(candidatos) < n or candidatos[-1][1] < candidatos[k - 1][1] - 1.0:
+                break
+            n *= 2
+        
+        indices = self.motor.tabla().indices
+        evaluaciones = [self.evaluar_cultivo_con_cache(cultivo, clima_actual)
+                        for cultivo in sorted((c for c, _ in candidatos), key=indices.get)]
+        evaluaciones.sort(key=lambda x: x['puntaje'], reverse=True)
+        return evaluaciones[:k]
+    
+    def construir_recomendaciones(self, clima_actual, evaluaciones):
+        """
+        Arma el resultado de recomendar_cultivos (cada estilo define su formato)
+        """
+        return {
+            'clima_actual': clima_actual,
+            'evaluaciones': evaluaciones
+        }
+    
+    def recomendar_cultivos(self, ciudad):
+        """
+        Genera recomendaciones de cultivos basadas en el clima actual
+        
+        Args:
+            ciudad (str): Nombre de la ciudad
+        
+        Returns:
+            dict: Recomendaciones ordenadas por puntaje
+        """
+        clima = self.clima_api.obtener_clima_actual(ciudad)
+        
+        if not clima:
+            return None
+        
+        # Evaluar todos los cultivos (reutiliza el cache si la observacion no cambio)
+        evaluaciones = self.evaluar_todos_los_cultivos(clima)
+        return self.construir_recomendaciones(clima, evaluaciones)
+    
+    def recomendar_cultivos_top(self, ciudad, k=5):
+        """
+        Genera recomendaciones solo para los k mejores cultivos
+        
+        Args:
+            ciudad (str): Nombre de la ciudad
+            k (int): Numero de cultivos a retornar
+        
+        Returns:
+            dict: Igual que recomendar_cultivos pero con k evaluaciones
+        """
+        clima = self.clima_api.obtener_clima_actual(ciudad)
+        
+        if not clima:
+            return None
+        
+        evaluaciones = self.evaluar_mejores_cultivos(clima, k)
+        return self.construir_recomendaciones(clima, evaluaciones)
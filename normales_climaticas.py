@@ -0,0 +1,474 @@
+# normales_climaticas.py
+"""
+Normales climaticas locales por ciudad
+Guarda la climatologia diaria (ciudades x 365 x variables) en un arreglo
+binario float32 con un indice JSON pequeño. Se abre con np.memmap en modo
+lectura, asi que varios procesos comparten las mismas paginas sin copiarlas.
+Los analizadores la usan como respaldo cuando la API no responde o se agota la cuota.
+
+Importar desde archivos CSV historicos:
+    python normales_climaticas.py estaciones_2015.csv estaciones_2016.csv --salida normales_climaticas.dat
+"""
+
+import argparse
+import json
+import os
+import time
+import unicodedata
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from config import ConfiguracionSistema
+
+
+DIAS_AÑO = 365
+
+VARIABLES_NORMALES = ['temperatura', 'temp_minima', 'temp_maxima', 'humedad',
+                      'precipitacion', 'velocidad_viento']
+
+# Variables sin sustituto: toda ciudad de las normales debe tenerlas
+VARIABLES_REQUERIDAS = ['temperatura', 'humedad']
+
+# Dia del año (0-364) del primer dia de cada mes en un año no bisiesto
+DIAS_ANTES_MES = np.cumsum([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30])
+
+# Normales abiertas por archivo: ruta -> (fecha de modificacion del indice, NormalesClimaticas)
+_normales_abiertas = {}
+
+
+def _normalizar_ciudad(nombre):
+    """Nombre sin acentos ni mayusculas para buscar ciudades"""
+    texto = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(texto.lower().split())
+
+
+def columnas_origen(columnas):
+    """
+    Columna del archivo que corresponde a cada columna del esquema historico,
+    segun ALIAS_COLUMNAS_HISTORICAS (la comparten la ingesta y las normales)
+    
+    Returns:
+        dict: columna del esquema -> columna del archivo (solo las encontradas)
+    """
+    por_nombre = {str(c).strip().lower(): c for c in columnas}
+    origen = {}
+    for destino, alias in ConfiguracionSistema.ALIAS_COLUMNAS_HISTORICAS.items():
+        for nombre in alias:
+            if nombre in por_nombre:
+                origen[destino] = por_nombre[nombre]
+                break
+    return origen
+
+
+def _completar_variables(valores):
+    """
+    Sustituye las variables opcionales sin datos: la minima y la maxima toman
+    la temperatura media (sin ciclo diario) y la precipitacion queda en 0
+    
+    Args:
+        valores (dict): Variable -> valor o arreglo de valores
+    
+    Returns:
+        dict: Los mismos valores completados
+    """
+    valores = dict(valores)
+    for variable in ('temp_minima', 'temp_maxima'):
+        valores[variable] = np.where(np.isnan(valores[variable]), valores['temperatura'], valores[variable])
+    valores['precipitacion'] = np.nan_to_num(valores['precipitacion'])
+    return valores
+
+
+def ruta_indice(archivo):
+    """Ruta del indice JSON de un archivo de normales"""
+    return os.path.splitext(archivo)[0] + '.json'
+
+
+def dias_del_año(fechas):
+    """
+    Dia del año 0-364 de cada fecha; el 29 de febrero cuenta como el 28
+    
+    Args:
+        fechas (Series): Fechas (datetime)
+    
+    Returns:
+        ndarray: Indices de dia
+    """
+    mes = fechas.dt.month.to_numpy()
+    dia = fechas.dt.day.to_numpy()
+    dia = np.where((mes == 2) & (dia == 29), 28, dia)
+    return DIAS_ANTES_MES[mes - 1] + dia - 1
+
+
+def acumular_normales(archivos, filas_bloque=None):
+    """
+    Suma y cuenta los valores diarios de varios CSV, bloque por bloque
+    
+    Las columnas se reconocen por ALIAS_COLUMNAS_HISTORICAS, igual que en la
+    ingesta historica: fecha (o dia_año 1-366 si ya son normales diarias),
+    ciudad (sin ella se usa el nombre del archivo) y las variables que
+    tengan (la lluvia es 'precipitacion'; sin temperatura se usa el promedio
+    de minima y maxima). Al construir se exigen VARIABLES_REQUERIDAS. La
+    memoria depende del numero de ciudades, no del tamaño de los archivos.
+    
+    Args:
+        archivos (list): Rutas de los CSV
+        filas_bloque (int): Filas leidas a la vez (por defecto NORMALES_FILAS_BLOQUE)
+    
+    Returns:
+        dict: 'ciudades', 'sumas' y 'conteos' (ciudades x 365 x variables) y 'filas'
+    """
+    filas_bloque = filas_bloque or ConfiguracionSistema.NORMALES_FILAS_BLOQUE
+    n_variables = len(VARIABLES_NORMALES)
+    ciudades = {}
+    sumas = np.zeros((0, DIAS_AÑO, n_variables))
+    conteos = np.zeros((0, DIAS_AÑO, n_variables))
+    filas = 0
+    
+    for archivo in archivos:
+        estacion = os.path.splitext(os.path.basename(archivo))[0]
+        for bloque in pd.read_csv(archivo, chunksize=filas_bloque):
+            bloque = _normalizar_columnas(bloque, estacion)
+            if 'dia_año' in bloque:
+                bloque = bloque[bloque['dia_año'].between(1, DIAS_AÑO)]
+                dias = bloque['dia_año'].to_numpy(dtype=int) - 1
+            else:
+                fechas = pd.to_datetime(bloque['fecha'], errors='coerce')
+                bloque, fechas = bloque[fechas.notna()], fechas[fechas.notna()]
+                dias = dias_del_año(fechas)
+            
+            # Ciudades nuevas agregan filas a los acumuladores
+            nuevas = [c for c in bloque['ciudad'].dropna().unique() if c not in ciudades]
+            for ciudad in nuevas:
+                ciudades[ciudad] = len(ciudades)
+            if nuevas:
+                extra = np.zeros((len(nuevas), DIAS_AÑO, n_variables))
+                sumas = np.concatenate([sumas, extra])
+                conteos = np.concatenate([conteos, extra])
+            
+            posicion = bloque['ciudad'].map(ciudades)
+            validas = posicion.notna().to_numpy()
+            plano = posicion.to_numpy()[validas].astype(int) * DIAS_AÑO + dias[validas]
+            valores = bloque.reindex(columns=VARIABLES_NORMALES).to_numpy(dtype=float)[validas]
+            
+            largo = len(ciudades) * DIAS_AÑO
+            for v in range(n_variables):
+                presentes = ~np.isnan(valores[:, v])
+                sumas[..., v] += np.bincount(plano[presentes], weights=valores[presentes, v],
+                                             minlength=largo).reshape(-1, DIAS_AÑO)
+                conteos[..., v] += np.bincount(plano[presentes], minlength=largo).reshape(-1, DIAS_AÑO)
+            
+            filas += int(validas.sum())
+    
+    return {'ciudades': list(ciudades), 'sumas': sumas, 'conteos': conteos, 'filas': filas}
+
+
+def _normalizar_columnas(bloque, estacion):
+    """
+    Renombra las columnas de un bloque a ciudad, fecha y VARIABLES_NORMALES
+    
+    Args:
+        bloque (DataFrame): Filas leidas del archivo
+        estacion (str): Ciudad a usar si el archivo no tiene columna de ciudad
+    
+    Returns:
+        DataFrame: Bloque con las columnas renombradas
+    """
+    origen = columnas_origen(bloque.columns)
+    if 'fecha_hora' not in origen and 'dia_año' not in bloque:
+        raise ValueError(f"No se encontro columna de fecha en el archivo de {estacion}")
+    
+    destinos = {'fecha_hora': 'fecha', 'lluvia_3h': 'precipitacion'}
+    columnas = {}
+    for destino, columna in origen.items():
+        destino = destinos.get(destino, destino)
+        if destino == 'fecha' and 'dia_año' in bloque:
+            continue
+        columnas[destino] = bloque[columna] if destino in ('ciudad', 'fecha') else pd.to_numeric(
+            bloque[columna], errors='coerce')
+    if 'dia_año' in bloque:
+        columnas['dia_año'] = pd.to_numeric(bloque['dia_año'], errors='coerce')
+    
+    normalizado = pd.DataFrame(columnas, index=bloque.index)
+    if 'ciudad' not in normalizado:
+        normalizado['ciudad'] = estacion
+    if {'temp_minima', 'temp_maxima'} <= set(normalizado):
+        promedio = (normalizado['temp_minima'] + normalizado['temp_maxima']) / 2
+        normalizado['temperatura'] = normalizado.get('temperatura', promedio).fillna(promedio)
+    return normalizado
+
+
+def completar_dias(medias):
+    """
+    Interpola circularmente los dias sin datos de cada ciudad y variable
+    
+    Args:
+        medias (ndarray): ciudades x 365 x variables con NaN donde falta el dato
+    
+    Returns:
+        ndarray: Mismo arreglo completado (las series sin ningun dato quedan en NaN)
+    """
+    dias = np.arange(DIAS_AÑO)
+    for i in range(medias.shape[0]):
+        for v in range(medias.shape[2]):
+            serie = medias[i, :, v]
+            conocidos = ~np.isnan(serie)
+            if conocidos.all() or not conocidos.any():
+                continue
+            # Repetir los dias conocidos un año antes y despues para cruzar diciembre-enero
+            x = np.concatenate([dias[conocidos] - DIAS_AÑO, dias[conocidos], dias[conocidos] + DIAS_AÑO])
+            y = np.tile(serie[conocidos], 3)
+            medias[i, :, v] = np.interp(dias, x, y)
+    return medias
+
+
+def construir_normales(archivos, archivo=None, filas_bloque=None):
+    """
+    Construye el archivo de normales desde CSV historicos
+    
+    Cada ciudad debe tener datos de VARIABLES_REQUERIDAS; las demas
+    variables pueden faltar (ver _completar_variables).
+    
+    El arreglo se escribe en un archivo temporal y se reemplaza al final, asi
+    que los procesos que tienen abiertas las normales anteriores no se afectan.
+    
+    Args:
+        archivos (list): Rutas de los CSV
+        archivo (str): Destino (por defecto ARCHIVO_NORMALES); el indice va en .json
+        filas_bloque (int): Filas leidas a la vez
+    
+    Returns:
+        dict: Indice guardado (ciudades, variables, forma, filas, ...)
+    """
+    archivo = archivo or ConfiguracionSistema.ARCHIVO_NORMALES
+    acumulado = acumular_normales(archivos, filas_bloque)
+    if not acumulado['ciudades']:
+        raise ValueError("Los archivos no contienen filas validas de ciudad y fecha")
+    
+    faltantes = []
+    for variable in VARIABLES_REQUERIDAS:
+        con_datos = acumulado['conteos'][..., VARIABLES_NORMALES.index(variable)].any(axis=1)
+        faltantes += [f"{ciudad} ({variable})" for ciudad, hay in zip(acumulado['ciudades'], con_datos) if not hay]
+    if faltantes:
+        raise ValueError(f"Faltan variables requeridas para: {', '.join(faltantes)}")
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        medias = acumulado['sumas'] / acumulado['conteos']
+    medias = completar_dias(medias)
+    
+    temporal = archivo + '.tmp'
+    datos = np.memmap(temporal, dtype=np.float32, mode='w+', shape=medias.shape)
+    datos[:] = medias
+    datos.flush()
+    del datos
+    os.replace(temporal, archivo)
+    
+    indice = {
+        'ciudades': acumulado['ciudades'],
+        'variables': VARIABLES_NORMALES,
+        'forma': list(medias.shape),
+        'dtype': 'float32',
+        'filas': acumulado['filas'],
+        'archivos': [os.path.basename(a) for a in archivos],
+        'creado': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    with open(ruta_indice(archivo) + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False, indent=2)
+    os.replace(ruta_indice(archivo) + '.tmp', ruta_indice(archivo))
+    
+    return indice
+
+
+class NormalesClimaticas:
+    """
+    Normales diarias por ciudad abiertas como arreglo mapeado en memoria
+    """
+    
+    def __init__(self, archivo=None):
+        """
+        Abre el archivo de normales en modo lectura
+        
+        Args:
+            archivo (str): Ruta del arreglo (por defecto ARCHIVO_NORMALES)
+        """
+        self.archivo = archivo or ConfiguracionSistema.ARCHIVO_NORMALES
+        
+        with open(ruta_indice(self.archivo), encoding='utf-8') as f:
+            self.indice = json.load(f)
+        
+        self.ciudades = self.indice['ciudades']
+        self.variables = {v: k for k, v in enumerate(self.indice['variables'])}
+        self.datos = np.memmap(self.archivo, dtype=self.indice['dtype'], mode='r',
+                               shape=tuple(self.indice['forma']))
+        self._posiciones = {_normalizar_ciudad(c): i for i, c in enumerate(self.ciudades)}
+
+
+    def posicion(self, ciudad):
+        """Fila de una ciudad en el arreglo, o None si no esta"""
+        return self._posiciones.get(_normalizar_ciudad(ciudad))
+
+
+    def tiene_ciudad(self, ciudad):
+        """Indica si hay normales para una ciudad"""
+        return self.posicion(ciudad) is not None
+
+
+    def climatologia(self, ciudades=None):
+        """
+        Climatologia en el formato de ventanas_siembra, grados_dia y balance_hidrico
+        
+        Args:
+            ciudades (list): Ciudades a incluir (por defecto todas, sin copiar datos)
+        
+        Returns:
+            dict: 'ciudades' y una matriz ciudades x 365 por variable
+        """
+        if ciudades is None:
+            filas, ciudades = slice(None), list(self.ciudades)
+        else:
+            ciudades = [c for c in ciudades if self.tiene_ciudad(c)]
+            filas = [self.posicion(c) for c in ciudades]
+        
+        climatologia = {'ciudades': ciudades}
+        for variable, v in self.variables.items():
+            climatologia[variable] = self.datos[filas, :, v]
+        return climatologia
+
+
+    def valores_dia(self, ciudad, fecha=None):
+        """
+        Normales de una ciudad para un dia del año
+        
+        Returns:
+            dict: Valor de cada variable (None si no hay ciudad)
+        """
+        i = self.posicion(ciudad)
+        if i is None:
+            return None
+        fecha = fecha or datetime.now()
+        dia = int(dias_del_año(pd.Series([pd.Timestamp(fecha)]))[0])
+        valores = _completar_variables({variable: self.datos[i, dia, v] for variable, v in self.variables.items()})
+        return {variable: float(valor) for variable, valor in valores.items()}
+
+
+    def clima_actual(self, ciudad, fecha=None):
+        """
+        Clima tipico del dia con las claves de ClimaAPI.obtener_clima_actual
+        
+        Returns:
+            dict: Datos del clima normal, o None si no hay normales de la ciudad
+        """
+        fecha = fecha or datetime.now()
+        valores = self.valores_dia(ciudad, fecha)
+        if valores is None:
+            return None
+        
+        def redondear(variable, decimales=1):
+            valor = valores[variable]
+            return None if np.isnan(valor) else round(valor, decimales)
+        
+        return {
+            'ciudad': self.ciudades[self.posicion(ciudad)],
+            'pais': 'PA',
+            'temperatura': redondear('temperatura'),
+            'sensacion_termica': redondear('temperatura'),
+            'temp_minima': redondear('temp_minima'),
+            'temp_maxima': redondear('temp_maxima'),
+            'humedad': redondear('humedad', 0),
+            'presion': None,
+            'descripcion': 'normal climatologica',
+            'velocidad_viento': redondear('velocidad_viento'),
+            'nubosidad': None,
+            'fecha_hora': fecha.strftime('%Y-%m-%d %H:%M:%S'),
+            'lluvia_1h': round(valores['precipitacion'] / 24, 2),
+            'fuente': 'normales'
+        }
+
+
+    def pronostico_5dias(self, ciudad, fecha=None, dias=5):
+        """
+        Pronostico climatologico con las columnas de ClimaAPI.obtener_pronostico_5dias
+        
+        Pasos de 3 horas desde la fecha indicada. La temperatura sigue un ciclo
+        diario entre la minima y la maxima normales (maximo a las 15:00) y la
+        lluvia diaria se reparte en partes iguales.
+        
+        Returns:
+            DataFrame: Pronostico normal, o None si no hay normales de la ciudad
+        """
+        i = self.posicion(ciudad)
+        if i is None:
+            return None
+        
+        fecha = (fecha or datetime.now()).replace(minute=0, second=0, microsecond=0)
+        inicio = fecha - timedelta(hours=fecha.hour % 3)
+        momentos = pd.date_range(inicio + timedelta(hours=3), periods=dias * 8, freq='3h')
+        dia = dias_del_año(pd.Series(momentos))
+        
+        serie = _completar_variables({variable: self.datos[i, dia, v].astype(float)
+                                      for variable, v in self.variables.items()})
+        amplitud = (serie['temp_maxima'] - serie['temp_minima']) / 2
+        ciclo = np.cos((momentos.hour.to_numpy() - 15) / 24 * 2 * np.pi)
+        
+        return pd.DataFrame({
+            'fecha_hora': momentos.strftime('%Y-%m-%d %H:%M:%S'),
+            'fecha': momentos.strftime('%Y-%m-%d'),
+            'hora': momentos.strftime('%H:%M'),
+            'temperatura': (serie['temperatura'] + amplitud * ciclo).round(2),
+            'temp_minima': serie['temp_minima'].round(2),
+            'temp_maxima': serie['temp_maxima'].round(2),
+            'humedad': serie['humedad'].round(0),
+            'descripcion': 'normal climatologica',
+            'velocidad_viento': serie['velocidad_viento'].round(2),
+            # Sin probabilidades en las normales: 100% en dias que normalmente llueven
+            'probabilidad_lluvia': np.where(serie['precipitacion'] >= 1, 100.0, 0.0),
+            'lluvia_3h': (serie['precipitacion'] / 8).round(2)
+        })
+
+
+def obtener_normales(archivo=None):
+    """
+    Retorna las normales compartidas del proceso, reabriendolas si se reconstruyeron
+    
+    Returns:
+        NormalesClimaticas: Normales abiertas, o None si no existe el archivo
+    """
+    archivo = archivo or ConfiguracionSistema.ARCHIVO_NORMALES
+    indice = ruta_indice(archivo)
+    if not (os.path.exists(archivo) and os.path.exists(indice)):
+        return None
+    
+    modificado = os.path.getmtime(indice)
+    abiertas = _normales_abiertas.get(archivo)
+    if abiertas is None or abiertas[0] != modificado:
+        abiertas = (modificado, NormalesClimaticas(archivo))
+        _normales_abiertas[archivo] = abiertas
+    return abiertas[1]
+
+
+def main():
+    """Importa normales climaticas desde CSV historicos"""
+    parser = argparse.ArgumentParser(description='Construye las normales climaticas desde CSV historicos')
+    parser.add_argument('archivos', nargs='+',
+                        help='CSV diarios con fecha (o dia_año), ciudad, temperatura, humedad y otras variables '
+                             '(nombres de ALIAS_COLUMNAS_HISTORICAS)')
+    parser.add_argument('--salida', help='Archivo de normales (por defecto ARCHIVO_NORMALES)')
+    parser.add_argument('--filas-bloque', type=int, help='Filas leidas a la vez')
+    args = parser.parse_args()
+    
+    print("Importando normales climaticas...")
+    inicio = time.perf_counter()
+    indice = construir_normales(args.archivos, args.salida, args.filas_bloque)
+    duracion = time.perf_counter() - inicio
+    
+    archivo = args.salida or ConfiguracionSistema.ARCHIVO_NORMALES
+    print(f"\nArchivo generado: {archivo} (indice: {ruta_indice(archivo)})")
+    print(f"Ciudades: {len(indice['ciudades'])}")
+    print(f"Filas leidas: {indice['filas']} en {duracion:.2f} s "
+          f"({indice['filas'] / max(duracion, 1e-9):.0f} filas/s)")
+    print(f"Tamaño: {os.path.getsize(archivo) / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# reglas_evaluacion.py
+"""
+Reglas declarativas de evaluacion de cultivos
+Compila las reglas de config.py en evaluadores vectorizados sobre el catalogo
+"""
+
+import numpy as np
+
+from base_datos_cultivos import obtener_arreglos_cultivos, obtener_version_catalogo
+from config import ConfiguracionSistema
+
+
+class ReglaCompilada:
+    """
+    Una regla aplicada a todos los cultivos del catalogo a la vez
+    
+    Los limites de cada cultivo se guardan como arreglos, por lo que aplicar la
+    regla a m valores produce matrices m x cultivos sin recorrer el catalogo.
+    """
+    
+    def __init__(self, especificacion, arreglos):
+        self.nombre = especificacion['nombre']
+        self.variable = especificacion['variable']
+        self.tipo = especificacion['tipo']
+        self.grupo = especificacion.get('grupo', self.nombre)
+        self.factor = float(especificacion.get('penalizacion', 0))
+        self.campo = especificacion.get('limite') or especificacion.get('referencia')
+        
+        n_cultivos = len(arreglos['claves'])
+        
+        if self.tipo in ('minimo', 'maximo'):
+            if 'limite' in especificacion:
+                self.limite = arreglos[especificacion['limite']]
+            else:
+                self.limite = np.full(n_cultivos, float(especificacion['umbral']))
+        elif self.tipo == 'desviacion':
+            self.referencia = arreglos[especificacion['referencia']]
+            self.umbral = float(especificacion['umbral'])
+        elif self.tipo == 'temporada':
+            # Fila 0 = enero, para indexar directamente por mes
+            self.mascara_meses = arreglos['mascara_meses'].T
+        else:
+            raise ValueError(f"Tipo de regla desconocido: {self.tipo}")
+        
+        # Filtro opcional por nivel de tolerancia del cultivo
+        self.filtro = None
+        if 'tolerancia' in especificacion:
+            campo, valor = especificacion['tolerancia']
+            self.filtro = arreglos[campo] == valor
+    
+    def aplicar(self, valores):
+        """
+        Aplica la regla a uno o varios valores de su variable
+        
+        Args:
+            valores (array): m valores (para 'temporada', meses 1-12), o una
+                             matriz m x cultivos si la variable depende del cultivo
+        
+        Returns:
+            tuple: (activa, penalizacion), matrices m x cultivos
+        """
+        if self.tipo == 'temporada':
+            meses = np.asarray(valores, dtype=int).reshape(-1)
+            activa = ~self.mascara_meses[meses - 1]
+            penalizacion = np.full(activa.shape, self.factor)
+        else:
+            v = np.asarray(valores, dtype=float)
+            if v.ndim < 2:
+                v = v.reshape(-1, 1)
+            
+            if self.tipo == 'minimo':
+                activa = v < self.limite
+                penalizacion = (self.limite - v) * self.factor
+            elif self.tipo == 'maximo':
+                activa = v > self.limite
+                penalizacion = (v - self.limite) * self.factor
+            else:
+                diferencia = np.abs(v - self.referencia)
+                activa = diferencia > self.umbral
+                penalizacion = diferencia * self.factor
+        
+        if self.filtro is not None:
+            activa = activa & self.filtro
+        
+        return activa, np.where(activa, penalizacion, 0.0)
+    
+    def quiebres(self):
+        """
+        Valores de la variable donde la penalizacion cambia de pendiente o salta
+        
+        Entre dos quiebres consecutivos la penalizacion de cada cultivo es lineal.
+        
+        Returns:
+            numpy.ndarray: Limites de todos los cultivos (vacio para 'temporada')
+        """
+        if self.tipo in ('minimo', 'maximo'):
+            return np.asarray(self.limite, dtype=float)
+        if self.tipo == 'desviacion':
+            return np.concatenate([self.referencia - self.umbral, self.referencia,
+                                   self.referencia + self.umbral]).astype(float)
+        return np.array([])
+    
+    def por_debajo(self, valores):
+        """
+        Indica si el valor esta por debajo de la referencia (reglas de desviacion)
+        
+        Returns:
+            numpy.ndarray: Matriz booleana m x cultivos
+        """
+        v = np.asarray(valores, dtype=float).reshape(-1, 1)
+        return v < self.referencia
+
+
+class ConjuntoReglas:
+    """
+    Lista de reglas declarativas compilada para el catalogo actual
+    
+    La compilacion se hace una sola vez y se repite solo si cambia la
+    version del catalogo.
+    """
+    
+    def __init__(self, especificaciones):
+        self.especificaciones = list(especificaciones)
+        self.version = None
+        self.reglas = []
+        self.claves = []
+    
+    def compiladas(self):
+        """
+        Returns:
+            list: Reglas compiladas para la version actual del catalogo
+        """
+        version = obtener_version_catalogo()
+        if version != self.version:
+            arreglos = obtener_arreglos_cultivos()
+            self.reglas = [ReglaCompilada(e, arreglos) for e in self.especificaciones]
+            self.claves = arreglos['claves']
+            self.version = version
+        return self.reglas
+    
+    def variables(self):
+        """Variables de entrada que usan las reglas, en orden de aparicion"""
+        variables = []
+        for especificacion in self.especificaciones:
+            if especificacion['variable'] not in variables:
+                variables.append(especificacion['variable'])
+        return variables
+    
+    def evaluar(self, valores, puntaje_base=None):
+        """
+        Aplica todas las reglas y descuenta sus penalizaciones del puntaje
+        
+        Las penalizaciones se restan en el orden de las reglas, igual que la
+        evaluacion cultivo por cultivo, para obtener exactamente el mismo puntaje.
+        
+        Args:
+            valores (dict): Arreglo de m valores por variable
+            puntaje_base (float): Puntaje inicial (por defecto PUNTAJE_MAXIMO)
+        
+        Returns:
+            dict: 'puntajes' (m x cultivos), 'activas' y 'penalizaciones' por regla
+        """
+        if puntaje_base is None:
+            puntaje_base = ConfiguracionSistema.PUNTAJE_MAXIMO
+        
+        puntajes = float(puntaje_base)
+        activas = {}
+        penalizaciones = {}
+        
+        for regla in self.compiladas():
+            activa, penalizacion = regla.aplicar(valores[regla.variable])
+            activas[regla.nombre] = activa
+            penalizaciones[regla.nombre] = penalizacion
+            puntajes = puntajes - penalizacion
+        
+        return {'puntajes': puntajes, 'activas': activas, 'penalizaciones': penalizaciones}
+
+
+def reglas_evaluacion_config():
+    """Reglas de evaluacion definidas en ConfiguracionSistema"""
+    return ConjuntoReglas(ConfiguracionSistema.REGLAS_EVALUACION)
+
+
+def reglas_riesgo_config():
+    """Reglas de riesgo del pronostico definidas en ConfiguracionSistema"""
+    return ConjuntoReglas(ConfiguracionSistema.REGLAS_RIESGO)
@@ -0,0 +1,164 @@
+# riesgo_enfermedades.py
+"""
+Riesgo de hongos y plagas por acumulacion de horas de humedad
+Cuenta horas de hoja mojada / humedad alta en ventanas moviles sobre el
+pronostico de todas las ciudades y produce un indice por cultivo
+"""
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+
+
+HORAS_POR_PASO = 3  # El pronostico de OpenWeatherMap viene cada 3 horas
+
+
+def arreglos_horarios(pronosticos):
+    """
+    Alinea los pronosticos de varias ciudades en matrices ciudades x pasos
+    
+    Args:
+        pronosticos (dict): DataFrame de obtener_pronostico_5dias por ciudad
+    
+    Returns:
+        dict: 'ciudades', 'fechas_hora' y matrices 'humedad', 'temperatura'
+              y 'lluvia' (NaN donde una ciudad no tiene dato)
+    """
+    ciudades = [c for c, df in pronosticos.items() if df is not None and not df.empty]
+    if not ciudades:
+        return {'ciudades': [], 'fechas_hora': []}
+    
+    posiciones = range(len(ciudades))
+    todos = pd.concat([pronosticos[c] for c in ciudades], keys=posiciones, names=['ciudad', None])
+    todos = todos.reset_index(level='ciudad')
+    fechas_hora = sorted(todos['fecha_hora'].unique())
+    
+    arreglos = {'ciudades': ciudades, 'fechas_hora': fechas_hora}
+    for columna, origen in [('humedad', 'humedad'), ('temperatura', 'temperatura'), ('lluvia', 'lluvia_3h')]:
+        tabla = (todos.pivot_table(index='ciudad', columns='fecha_hora', values=origen, aggfunc='mean')
+                 .reindex(index=posiciones, columns=fechas_hora))
+        arreglos[columna] = tabla.to_numpy(dtype=float)
+    
+    return arreglos
+
+
+def suma_movil(valores, ventana):
+    """
+    Suma en ventana movil sobre el ultimo eje con sumas acumuladas
+    
+    Returns:
+        ndarray: Sumas de las ventanas completas (largo = pasos - ventana + 1)
+    """
+    acumulada = np.cumsum(valores, axis=-1)
+    acumulada = np.concatenate([np.zeros(acumulada.shape[:-1] + (1,)), acumulada], axis=-1)
+    return acumulada[..., ventana:] - acumulada[..., :-ventana]
+
+
+def presion_enfermedades(pronosticos, cultivos=None):
+    """
+    Indice de riesgo de hongos por ciudad y cultivo
+    
+    Un paso del pronostico cuenta como hoja mojada si llueve, si la humedad
+    llega a HUMEDAD_HOJA_MOJADA o si supera la humedad optima del cultivo en
+    mas de UMBRAL_DIFERENCIA_HUMEDAD, siempre que la temperatura este en el
+    rango favorable a los hongos. El indice es el maximo de horas mojadas en
+    cualquier ventana de VENTANA_HONGOS_HORAS, como porcentaje de la ventana.
+    
+    Args:
+        pronosticos (dict): DataFrame de pronostico por ciudad
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+    
+    Returns:
+        dict: 'ciudades', 'cultivos', 'fechas_hora', 'horas_mojado'
+              (ciudades x cultivos x pasos), 'indice', 'horas_pico',
+              'inicio_pico' y 'fin_pico' (ciudades x cultivos)
+    """
+    config = ConfiguracionSistema
+    arreglos = obtener_arreglos_cultivos()
+    cultivos = list(cultivos or arreglos['claves'])
+    indices = np.array([arreglos['claves'].index(c) for c in cultivos], dtype=int)
+    
+    datos = arreglos_horarios(pronosticos)
+    if not datos['ciudades']:
+        return {'ciudades': [], 'cultivos': cultivos, 'fechas_hora': []}
+    
+    humedad = datos['humedad'][:, np.newaxis, :]
+    temperatura = datos['temperatura'][:, np.newaxis, :]
+    lluvia = datos['lluvia'][:, np.newaxis, :]
+    limite_cultivo = (arreglos['humedad_optima'][indices] + config.UMBRAL_DIFERENCIA_HUMEDAD)[np.newaxis, :, np.newaxis]
+    
+    # Comparaciones con NaN son falsas: los pasos sin dato no suman horas
+    mojado = (lluvia > 0) | (humedad >= config.HUMEDAD_HOJA_MOJADA) | (humedad > limite_cultivo)
+    favorable = (temperatura >= config.TEMP_HONGOS_MINIMA) & (temperatura <= config.TEMP_HONGOS_MAXIMA)
+    horas_mojado = (mojado & favorable) * HORAS_POR_PASO
+    
+    pasos = horas_mojado.shape[-1]
+    ventana = min(max(config.VENTANA_HONGOS_HORAS // HORAS_POR_PASO, 1), pasos)
+    movil = suma_movil(horas_mojado, ventana)
+    
+    pico = movil.argmax(axis=-1)
+    horas_pico = np.take_along_axis(movil, pico[..., np.newaxis], axis=-1)[..., 0]
+    fechas = np.asarray(datos['fechas_hora'])
+    
+    return {
+        'ciudades': datos['ciudades'],
+        'cultivos': cultivos,
+        'fechas_hora': datos['fechas_hora'],
+        'horas_mojado': horas_mojado,
+        'indice': np.round(100 * horas_pico / (ventana * HORAS_POR_PASO), 1),
+        'horas_pico': horas_pico,
+        'inicio_pico': fechas[pico],
+        'fin_pico': fechas[pico + ventana - 1]
+    }
+
+
+def nivel_riesgo(indice):
+    """Nivel de texto para un indice de riesgo de hongos"""
+    if indice >= ConfiguracionSistema.INDICE_HONGOS_ALTO:
+        return 'ALTO'
+    if indice >= ConfiguracionSistema.INDICE_HONGOS_MEDIO:
+        return 'MEDIO'
+    return 'BAJO'
+
+
+def tabla_riesgo_enfermedades(resultado):
+    """
+    Convierte el resultado de presion_enfermedades en una tabla larga
+    
+    Returns:
+        DataFrame: ciudad, cultivo, indice_hongos, nivel_hongos, horas_pico,
+                   inicio_pico y fin_pico
+    """
+    columnas = ['ciudad', 'cultivo', 'indice_hongos', 'nivel_hongos', 'horas_pico',
+                'inicio_pico', 'fin_pico']
+    if not resultado['ciudades']:
+        return pd.DataFrame(columns=columnas)
+    
+    i, j = np.indices(resultado['indice'].shape).reshape(2, -1)
+    tabla = pd.DataFrame({
+        'ciudad': np.asarray(resultado['ciudades'])[i],
+        'cultivo': np.asarray(resultado['cultivos'])[j],
+        'indice_hongos': resultado['indice'][i, j],
+        'horas_pico': resultado['horas_pico'][i, j],
+        'inicio_pico': resultado['inicio_pico'][i, j],
+        'fin_pico': resultado['fin_pico'][i, j]
+    })
+    tabla['nivel_hongos'] = tabla['indice_hongos'].map(nivel_riesgo)
+    return tabla[columnas]
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    from conexion_clima import ClimaAPI
+    
+    clima_api = ClimaAPI()
+    for ciudad in ConfiguracionSistema.CIUDADES_PANAMA:
+        clima_api.obtener_pronostico_5dias(ciudad)
+    
+    resultado = presion_enfermedades(clima_api.pronosticos_en_cache())
+    tabla = tabla_riesgo_enfermedades(resultado)
+    
+    print("=== RIESGO DE HONGOS (INDICE 0-100) ===")
+    print(tabla.pivot(index='ciudad', columns='cultivo', values='indice_hongos'))
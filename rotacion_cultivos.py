@@ -0,0 +1,186 @@
+# rotacion_cultivos.py
+"""
+Planificador de rotacion de cultivos
+Encuentra la mejor secuencia de cultivos para una parcela con programacion
+dinamica sobre (semana, ultimo cultivo), usando la idoneidad mensual del
+catalogo y las reglas de rotacion del dataset como bonos de transicion
+"""
+
+import re
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from base_datos_cultivos import cargar_dataset_cultivos, clave_cultivo, obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+from tabla_idoneidad import obtener_tabla_idoneidad
+
+
+SEMANAS_AÑO = 52
+
+# "Ideal tras cultivos de maíz" -> maiz antes de este cultivo
+PATRON_TRAS = re.compile(r'tras (?:cultivos? de )?(\w+)', re.IGNORECASE)
+# "Ideal en rotación con maíz" -> en ambos sentidos
+PATRON_ROTACION = re.compile(r'rotaci[oó]n con (\w+)', re.IGNORECASE)
+
+
+def reglas_rotacion(claves=None):
+    """
+    Extrae del dataset las transiciones recomendadas entre cultivos
+    
+    Args:
+        claves (list): Claves validas (por defecto las del catalogo)
+    
+    Returns:
+        set: Pares (cultivo_previo, cultivo_siguiente) con bono de rotacion
+    """
+    claves = set(claves or obtener_arreglos_cultivos()['claves'])
+    dataset = cargar_dataset_cultivos()
+    pares = set()
+    
+    for clave, texto in zip(dataset['clave'], dataset['recomendaciones'].fillna('')):
+        for previo in PATRON_TRAS.findall(texto):
+            pares.add((clave_cultivo(previo), clave))
+        for otro in PATRON_ROTACION.findall(texto):
+            pares.add((clave_cultivo(otro), clave))
+            pares.add((clave, clave_cultivo(otro)))
+    
+    return {(a, b) for a, b in pares if a in claves and b in claves and a != b}
+
+
+def matriz_transicion(claves, pares=None):
+    """
+    Ajuste de puntaje por pasar de un cultivo a otro
+    
+    Returns:
+        ndarray: (cultivos + 1) x cultivos; la ultima fila es la parcela sin
+                 cultivo previo. Bono para las rotaciones del dataset y
+                 penalizacion por repetir el mismo cultivo.
+    """
+    config = ConfiguracionSistema
+    pares = reglas_rotacion(claves) if pares is None else pares
+    posicion = {clave: i for i, clave in enumerate(claves)}
+    
+    ajuste = np.zeros((len(claves) + 1, len(claves)))
+    ajuste[np.arange(len(claves)), np.arange(len(claves))] = -config.ROTACION_PENALIZACION_REPETIR
+    for previo, siguiente in pares:
+        ajuste[posicion[previo], posicion[siguiente]] += config.ROTACION_BONO
+    return ajuste
+
+
+def puntajes_mensuales(clima_mensual=None):
+    """
+    Idoneidad de cada cultivo en cada mes con la tabla precalculada
+    
+    Args:
+        clima_mensual (dict): 'temperatura' y 'humedad', 12 valores cada una
+                              (por defecto CLIMA_MENSUAL_PANAMA)
+    
+    Returns:
+        ndarray: Puntajes 12 meses x cultivos
+    """
+    clima_mensual = clima_mensual or ConfiguracionSistema.CLIMA_MENSUAL_PANAMA
+    tabla = obtener_tabla_idoneidad()
+    return np.array([
+        tabla.puntajes(clima_mensual['temperatura'][m], clima_mensual['humedad'][m], m + 1)
+        for m in range(12)
+    ])
+
+
+def planificar_rotacion(fecha_inicio=None, semanas=None, clima_mensual=None,
+                        puntajes=None, pares=None):
+    """
+    Mejor secuencia de cultivos para una parcela
+    
+    Estado: (semana, ultimo cultivo). En cada semana se deja la parcela libre
+    o se siembra un cultivo que ocupa ceil(duracion_dias / 7) semanas y debe
+    terminar dentro del horizonte. Sembrar vale (puntaje del mes de siembra +
+    ajuste de rotacion) x semanas ocupadas / 52, asi que un año entero con
+    puntaje 100 vale 100. Cada semana se resuelve para todos los pares
+    (previo, siguiente) a la vez: O(semanas x cultivos^2).
+    
+    Args:
+        fecha_inicio (datetime): Primera semana del plan (por defecto hoy)
+        semanas (int): Horizonte (por defecto ROTACION_HORIZONTE_SEMANAS)
+        clima_mensual (dict): Clima tipico por mes para la idoneidad
+        puntajes (ndarray): Puntajes 12 x cultivos ya calculados (opcional)
+        pares (set): Transiciones con bono (por defecto las del dataset)
+    
+    Returns:
+        dict: 'plan' (lista de siembras), 'valor' total y 'semanas'
+    """
+    fecha_inicio = fecha_inicio or datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    semanas = semanas or ConfiguracionSistema.ROTACION_HORIZONTE_SEMANAS
+    
+    arreglos = obtener_arreglos_cultivos()
+    claves = arreglos['claves']
+    n = len(claves)
+    
+    if puntajes is None:
+        puntajes = puntajes_mensuales(clima_mensual)
+    ajuste = matriz_transicion(claves, pares)
+    duracion = np.ceil(arreglos['duracion_dias'] / 7).astype(int)
+    
+    # Mes de siembra de cada semana y valor base de sembrar cada cultivo en ella
+    meses = np.array([(fecha_inicio + timedelta(weeks=t)).month - 1 for t in range(semanas)])
+    peso = duracion / SEMANAS_AÑO
+    
+    # mejor[t, c]: valor maximo desde la semana t si el ultimo cultivo fue c (n = ninguno)
+    mejor = np.zeros((semanas + 1, n + 1))
+    eleccion = np.full((semanas, n + 1), -1)
+    cultivo = np.arange(n)
+    
+    for t in range(semanas - 1, -1, -1):
+        fin = t + duracion
+        cabe = fin <= semanas
+        futuro = np.where(cabe, mejor[np.minimum(fin, semanas), cultivo], -np.inf)
+        
+        # candidatos[c, k]: sembrar k en la semana t despues de c
+        candidatos = (puntajes[meses[t]] + ajuste) * peso + futuro
+        k = candidatos.argmax(axis=1)
+        valor = candidatos[np.arange(n + 1), k]
+        
+        # Dejar la parcela libre una semana conserva el ultimo cultivo
+        siembra = valor > mejor[t + 1]
+        mejor[t] = np.where(siembra, valor, mejor[t + 1])
+        eleccion[t] = np.where(siembra, k, -1)
+    
+    # Reconstruir el plan desde la parcela sin cultivo previo
+    plan = []
+    t, previo = 0, n
+    while t < semanas:
+        k = int(eleccion[t, previo])
+        if k < 0:
+            t += 1
+            continue
+        siembra = fecha_inicio + timedelta(weeks=t)
+        plan.append({
+            'cultivo': claves[k],
+            'nombre': arreglos['nombres'][k],
+            'semana_inicio': t,
+            'semana_fin': t + int(duracion[k]),
+            'fecha_siembra': siembra.strftime('%Y-%m-%d'),
+            'fecha_cosecha': (siembra + timedelta(days=int(arreglos['duracion_dias'][k]))).strftime('%Y-%m-%d'),
+            'puntaje_mes': round(float(puntajes[meses[t], k]), 1),
+            'ajuste_rotacion': float(ajuste[previo, k])
+        })
+        t, previo = t + int(duracion[k]), k
+    
+    return {'plan': plan, 'valor': round(float(mejor[0, n]), 2), 'semanas': semanas}
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    
+    print("Reglas de rotacion del dataset:", sorted(reglas_rotacion()))
+    
+    inicio = time.perf_counter()
+    resultado = planificar_rotacion(semanas=104)
+    duracion_ms = (time.perf_counter() - inicio) * 1000
+    
+    print(f"\n=== PLAN DE ROTACION (104 semanas, valor {resultado['valor']}) ===")
+    for siembra in resultado['plan']:
+        print(f"  {siembra['fecha_siembra']} -> {siembra['fecha_cosecha']}: {siembra['nombre']} "
+              f"(puntaje {siembra['puntaje_mes']}, rotacion {siembra['ajuste_rotacion']:+.0f})")
+    print(f"\nCalculado en {duracion_ms:.1f} ms")
@@ -0,0 +1,226 @@
+# simulacion_montecarlo.py
+"""
+Simulacion Monte Carlo del riesgo climatico de una siembra
+Genera miles de trayectorias de clima por ciudad (climatologia + ruido o
+remuestreo de años historicos) y reporta la probabilidad de exito de cada
+cultivo en lugar de un solo puntaje. Las trayectorias se procesan por bloques
+para que la memoria no dependa del numero de simulaciones.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from balance_hidrico import simular_balance
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+from evapotranspiracion import et0_hargreaves, latitudes_ciudades, radiacion_extraterrestre
+from ventanas_siembra import DIAS_AÑO, puntaje_agua, puntaje_temperatura
+
+
+def _dias_del_ciclo(fecha_siembra, dias):
+    """Indices de dia del año (0-364) desde la siembra"""
+    return (fecha_siembra.timetuple().tm_yday - 1 + np.arange(dias)) % DIAS_AÑO
+
+
+def generar_ruido(climatologia, dias_ciclo, n, rng):
+    """
+    Trayectorias de climatologia + ruido
+    
+    La temperatura suma un ruido AR(1) (anomalias persistentes de varios dias).
+    La lluvia se multiplica por un factor gamma de media 1 por dia y por un
+    factor lognormal por trayectoria (temporadas mas secas o humedas).
+    
+    Returns:
+        tuple: (lluvia, temperatura), arreglos ciudades x n x dias
+    """
+    config = ConfiguracionSistema
+    lluvia_media = np.asarray(climatologia['precipitacion'], dtype=float)[:, dias_ciclo]
+    temp_media = np.asarray(climatologia['temperatura'], dtype=float)[:, dias_ciclo]
+    n_ciudades, dias = temp_media.shape
+    
+    forma = config.MC_FORMA_GAMMA_LLUVIA
+    lluvia = lluvia_media[:, np.newaxis, :] * rng.gamma(forma, 1 / forma, size=(n_ciudades, n, dias))
+    sigma = config.MC_DESVIACION_LLUVIA_TEMPORADA
+    lluvia *= rng.lognormal(-sigma ** 2 / 2, sigma, size=(n_ciudades, n, 1))
+    
+    rho = config.MC_PERSISTENCIA_TEMPERATURA
+    innovaciones = rng.normal(0, config.MC_DESVIACION_TEMPERATURA * np.sqrt(1 - rho ** 2),
+                              size=(n_ciudades, n, dias))
+    anomalia = np.empty_like(innovaciones)
+    anomalia[..., 0] = innovaciones[..., 0] / np.sqrt(1 - rho ** 2)
+    for d in range(1, dias):
+        anomalia[..., d] = rho * anomalia[..., d - 1] + innovaciones[..., d]
+    
+    return lluvia, temp_media[:, np.newaxis, :] + anomalia
+
+
+def generar_bootstrap(historico, dias_ciclo, n, rng):
+    """
+    Trayectorias por remuestreo de bloques de dias de años historicos
+    
+    Cada bloque de MC_BLOQUE_BOOTSTRAP_DIAS dias se toma de un año elegido
+    al azar, conservando el dia del año (y por tanto la estacionalidad).
+    
+    Args:
+        historico (dict): 'precipitacion' y 'temperatura', ciudades x años x 365
+    
+    Returns:
+        tuple: (lluvia, temperatura), arreglos ciudades x n x dias
+    """
+    lluvia_hist = np.asarray(historico['precipitacion'], dtype=float)
+    temp_hist = np.asarray(historico['temperatura'], dtype=float)
+    n_ciudades, n_años, _ = temp_hist.shape
+    dias = len(dias_ciclo)
+    
+    bloque = ConfiguracionSistema.MC_BLOQUE_BOOTSTRAP_DIAS
+    años_bloque = rng.integers(0, n_años, size=(n_ciudades, n, -(-dias // bloque)))
+    años = np.repeat(años_bloque, bloque, axis=2)[..., :dias]
+    
+    ciudad = np.arange(n_ciudades)[:, np.newaxis, np.newaxis]
+    dia = dias_ciclo[np.newaxis, np.newaxis, :]
+    return lluvia_hist[ciudad, años, dia], temp_hist[ciudad, años, dia]
+
+
+def simular_siembra(climatologia, fecha_siembra=None, cultivos=None, n_trayectorias=None,
+                    metodo='ruido', historico=None, tamaño_bloque=None, semilla=None):
+    """
+    Distribucion de resultados de sembrar cada cultivo en cada ciudad
+    
+    Por bloque de trayectorias se calcula, para todas las ciudades y cultivos,
+    el puntaje del ciclo (lluvia total y temperatura media, como en
+    ventanas_siembra) y los dias de estres del balance hidrico. Solo se
+    acumulan conteos e histogramas, asi que la memoria depende del bloque.
+    Una siembra es exitosa si su puntaje llega a PUNTAJE_BUENO y sus dias
+    de sequia y de inundacion no superan MC_FRACCION_ESTRES_MAXIMA de la
+    duracion del ciclo del cultivo.
+    
+    Args:
+        climatologia (dict): 'ciudades', 'precipitacion' y 'temperatura' (ciudades x 365)
+        fecha_siembra (datetime): Fecha de siembra (por defecto hoy)
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+        n_trayectorias (int): Simulaciones por ciudad (por defecto MC_TRAYECTORIAS)
+        metodo (str): 'ruido' o 'bootstrap'
+        historico (dict): Años historicos para 'bootstrap' (ciudades x años x 365)
+        tamaño_bloque (int): Trayectorias por bloque (por defecto MC_TAMAÑO_BLOQUE)
+        semilla (int): Semilla del generador aleatorio
+    
+    Returns:
+        DataFrame: Por ciudad y cultivo, probabilidad de exito, percentiles del
+                   puntaje y dias de estres promedio
+    """
+    config = ConfiguracionSistema
+    fecha_siembra = fecha_siembra or datetime.now()
+    n_trayectorias = n_trayectorias or config.MC_TRAYECTORIAS
+    tamaño_bloque = tamaño_bloque or config.MC_TAMAÑO_BLOQUE
+    rng = np.random.default_rng(semilla)
+    
+    if metodo == 'bootstrap' and historico is None:
+        raise ValueError("El metodo 'bootstrap' requiere datos historicos")
+    if metodo not in ('ruido', 'bootstrap'):
+        raise ValueError(f"Metodo de simulacion desconocido: {metodo}")
+    
+    arreglos = obtener_arreglos_cultivos()
+    cultivos = list(cultivos or arreglos['claves'])
+    indices = np.array([arreglos['claves'].index(c) for c in cultivos], dtype=int)
+    duraciones = arreglos['duracion_dias'][indices].astype(int)
+    
+    ciudades = list(climatologia['ciudades'])
+    n_ciudades, n_cultivos = len(ciudades), len(cultivos)
+    dias = int(duraciones.max())
+    dias_ciclo = _dias_del_ciclo(fecha_siembra, dias)
+    
+    # ET0 se estima desde la temperatura con la amplitud termica tipica
+    ra = radiacion_extraterrestre(latitudes_ciudades(ciudades), dias_ciclo + 1)[:, np.newaxis, :]
+    amplitud = config.AMPLITUD_TERMICA_CLIMATOLOGIA
+    
+    # Acumuladores (no dependen del numero de trayectorias)
+    forma = (n_ciudades, n_cultivos)
+    exitos = np.zeros(forma)
+    suma_sequia = np.zeros(forma)
+    suma_inundacion = np.zeros(forma)
+    histograma = np.zeros(forma + (101,))
+    
+    procesadas = 0
+    while procesadas < n_trayectorias:
+        n = min(tamaño_bloque, n_trayectorias - procesadas)
+        
+        if metodo == 'ruido':
+            lluvia, temperatura = generar_ruido(climatologia, dias_ciclo, n, rng)
+        else:
+            lluvia, temperatura = generar_bootstrap(historico, dias_ciclo, n, rng)
+        et0 = et0_hargreaves(temperatura - amplitud / 2, temperatura + amplitud / 2, temperatura, ra)
+        
+        # Sumas acumuladas para cerrar el ciclo de cada cultivo en su propio dia
+        lluvia_acumulada = np.cumsum(lluvia, axis=2)
+        temp_acumulada = np.cumsum(temperatura, axis=2)
+        
+        for j, k in enumerate(indices):
+            d = duraciones[j]
+            lluvia_ciclo = lluvia_acumulada[..., d - 1]
+            temp_ciclo = temp_acumulada[..., d - 1] / d
+            
+            agua = puntaje_agua(lluvia_ciclo, arreglos['precipitacion_min'][k],
+                                arreglos['precipitacion_optima'][k], arreglos['precipitacion_max'][k])
+            calor = puntaje_temperatura(temp_ciclo, arreglos['temp_minima'][k], arreglos['temp_maxima'][k])
+            puntaje = config.PESO_AGUA_SIEMBRA * agua + (1 - config.PESO_AGUA_SIEMBRA) * calor
+            
+            balance = simular_balance(lluvia[..., :d].reshape(-1, d), et0[..., :d].reshape(-1, d),
+                                      [cultivos[j]])
+            sequia = balance['dias_sequia'][:, 0].reshape(n_ciudades, n)
+            inundacion = balance['dias_inundacion'][:, 0].reshape(n_ciudades, n)
+            
+            estres_maximo = config.MC_FRACCION_ESTRES_MAXIMA * d
+            exito = ((puntaje >= config.PUNTAJE_BUENO)
+                     & (sequia <= estres_maximo)
+                     & (inundacion <= estres_maximo))
+            
+            exitos[:, j] += exito.sum(axis=1)
+            suma_sequia[:, j] += sequia.sum(axis=1)
+            suma_inundacion[:, j] += inundacion.sum(axis=1)
+            
+            casilla = np.clip(np.rint(puntaje), 0, 100).astype(int)
+            for i in range(n_ciudades):
+                histograma[i, j] += np.bincount(casilla[i], minlength=101)
+        
+        procesadas += n
+    
+    # Percentiles desde el histograma acumulado (resolucion de 1 punto)
+    acumulado = np.cumsum(histograma, axis=2) / n_trayectorias
+    percentiles = {p: (acumulado < p / 100).sum(axis=2) for p in (10, 50, 90)}
+    
+    i, j = np.indices(forma).reshape(2, -1)
+    return pd.DataFrame({
+        'ciudad': np.asarray(ciudades)[i],
+        'cultivo': np.asarray(cultivos)[j],
+        'probabilidad_exito': (exitos[i, j] / n_trayectorias).round(3),
+        'puntaje_p10': percentiles[10][i, j],
+        'puntaje_p50': percentiles[50][i, j],
+        'puntaje_p90': percentiles[90][i, j],
+        'dias_sequia_promedio': (suma_sequia[i, j] / n_trayectorias).round(1),
+        'dias_inundacion_promedio': (suma_inundacion[i, j] / n_trayectorias).round(1),
+        'trayectorias': n_trayectorias
+    })
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    
+    dias_año = np.arange(DIAS_AÑO)
+    ciudades = ConfiguracionSistema.CIUDADES_PANAMA
+    climatologia = {
+        'ciudades': ciudades,
+        'precipitacion': np.tile(2 + 8 * (np.sin((dias_año - 100) / DIAS_AÑO * 2 * np.pi) > 0),
+                                 (len(ciudades), 1)) * np.linspace(0.7, 1.3, len(ciudades))[:, np.newaxis],
+        'temperatura': 27 + 1.5 * np.cos((dias_año - 90) / DIAS_AÑO * 2 * np.pi) + np.zeros((len(ciudades), 1))
+    }
+    
+    inicio = time.perf_counter()
+    resultado = simular_siembra(climatologia, datetime(2025, 5, 1), n_trayectorias=2000, semilla=0)
+    duracion = time.perf_counter() - inicio
+    
+    print("=== RIESGO DE SIEMBRA (MONTE CARLO, 1 DE MAYO) ===")
+    print(resultado[resultado['ciudad'] == ciudades[0]].to_string(index=False))
+    print(f"\n2000 trayectorias x {len(ciudades)} ciudades en {duracion:.1f} s")
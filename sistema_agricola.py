@@ -86,7 +86,7 @@ class SistemaAgricola:
         print("="*50)
         
         print("Analizando condiciones climaticas...")
-        recomendaciones = self.analizador.recomendar_cultivos(self.ciudad_actual)
+        recomendaciones = self.analizador.recomendar_cultivos_top(self.ciudad_actual, k=5)
         
         if recomendaciones:
             clima = recomendaciones['clima_actual']
@@ -98,7 +98,7 @@ class SistemaAgricola:
             print("RANKING DE CULTIVOS RECOMENDADOS")
             print("-"*50)
             
-            for i, cultivo in enumerate(recomendaciones['evaluaciones'][:5], 1):
+            for i, cultivo in enumerate(recomendaciones['evaluaciones'], 1):
                 print(f"\n{i}. {cultivo['cultivo']} - {cultivo['nivel']}")
                 print(f"   Puntaje: {cultivo['puntaje']}/100")
                 
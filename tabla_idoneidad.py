@@ -0,0 +1,219 @@
+# tabla_idoneidad.py
+"""
+Tabla precalculada de idoneidad de cultivos
+Convierte la evaluacion por temperatura, humedad y mes en busquedas por indice
+"""
+
+import heapq
+
+import numpy as np
+
+from base_datos_cultivos import obtener_version_catalogo
+from config import ConfiguracionSistema
+from reglas_evaluacion import reglas_evaluacion_config
+
+
+class TablaIdoneidad:
+    """
+    Puntajes de todos los cultivos precalculados sobre una rejilla de
+    temperatura x humedad x mes
+    
+    Las penalizaciones de temperatura, humedad y temporada son independientes
+    entre si, por lo que la rejilla completa se guarda factorizada en una tabla
+    por variable (temperaturas x cultivos, humedades x cultivos, 12 meses x cultivos).
+    Cada tabla se obtiene aplicando las reglas de evaluacion a su eje, y el
+    puntaje de un punto de la rejilla es 100 menos la suma de las tres. Los
+    ejes incluyen los limites de cada cultivo, asi que entre dos puntos la
+    penalizacion es lineal y el puntaje coincide con el de las reglas.
+    """
+    
+    def __init__(self, reglas=None, temp_minima=None, temp_maxima=None,
+                 paso_temperatura=None, paso_humedad=None):
+        config = ConfiguracionSistema
+        self.reglas = reglas or reglas_evaluacion_config()
+        self.temp_minima = config.TABLA_TEMP_MINIMA if temp_minima is None else temp_minima
+        self.temp_maxima = config.TABLA_TEMP_MAXIMA if temp_maxima is None else temp_maxima
+        self.paso_temperatura = paso_temperatura or config.TABLA_PASO_TEMPERATURA
+        self.paso_humedad = paso_humedad or config.TABLA_PASO_HUMEDAD
+        
+        self.version = None
+        self.construir()
+    
+    def construir(self):
+        """Calcula las tablas para la version actual del catalogo"""
+        reglas = self.reglas.compiladas()
+        self.claves = self.reglas.claves
+        self.indices = {clave: i for i, clave in enumerate(self.claves)}
+        
+        # Ejes de la rejilla: la rejilla regular mas los quiebres de las reglas,
+        # para que la penalizacion sea lineal dentro de cada tramo
+        n_temp = int(round((self.temp_maxima - self.temp_minima) / self.paso_temperatura)) + 1
+        n_humedad = int(round(100 / self.paso_humedad)) + 1
+        regulares = {
+            'temperatura': self.temp_minima + np.arange(n_temp) * self.paso_temperatura,
+            'humedad': np.arange(n_humedad) * self.paso_humedad,
+        }
+        self.ejes = {'mes': np.arange(1, 13)}
+        for variable, valores in regulares.items():
+            quiebres = [regla.quiebres() for regla in reglas if regla.variable == variable]
+            eje = np.unique(np.concatenate([valores] + quiebres))
+            self.ejes[variable] = eje[(eje >= valores[0]) & (eje <= valores[-1])]
+        
+        # Una tabla de penalizacion por variable (puntos del eje x cultivos) y,
+        # para las variables continuas, la penalizacion a 1/4 y 3/4 de cada tramo
+        self.tablas = {}
+        self.tramos = {}
+        for regla in reglas:
+            if regla.variable not in self.ejes:
+                raise ValueError(f"La tabla no tiene eje para la variable '{regla.variable}'")
+            
+            eje = self.ejes[regla.variable]
+            puntos = [eje]
+            if regla.variable != 'mes':
+                puntos += [eje[:-1] + np.diff(eje) * 0.25, eje[:-1] + np.diff(eje) * 0.75]
+            penalizaciones = [regla.aplicar(valores)[1] for valores in puntos]
+            
+            if regla.variable in self.tablas:
+                self.tablas[regla.variable] = self.tablas[regla.variable] + penalizaciones[0]
+                if regla.variable in self.tramos:
+                    cuartos = self.tramos[regla.variable]
+                    self.tramos[regla.variable] = (cuartos[0] + penalizaciones[1], cuartos[1] + penalizaciones[2])
+            else:
+                self.tablas[regla.variable] = penalizaciones[0]
+                if regla.variable != 'mes':
+                    self.tramos[regla.variable] = (penalizaciones[1], penalizaciones[2])
+        
+        self.version = self.reglas.version
+    
+    def vigente(self):
+        """Reconstruye la tabla si cambio la version del catalogo"""
+        if self.version != obtener_version_catalogo():
+            self.construir()
+        return self
+    
+    def _interpolar(self, variable, valor):
+        """
+        Fila de penalizaciones de la tabla para un valor del eje
+        
+        En un punto del eje se usa su fila. Dentro de un tramo la penalizacion
+        es la recta que pasa por sus valores a 1/4 y 3/4, asi que tambien es
+        exacta junto a un salto (la humedad fuera del umbral penaliza de golpe).
+        Fuera del eje se usa el extremo mas cercano.
+        """
+        tabla = self.tablas[variable]
+        eje = self.ejes[variable]
+        
+        valor = min(max(float(valor), eje[0]), eje[-1])
+        i = int(np.searchsorted(eje, valor, side='right')) - 1
+        if eje[i] == valor:
+            return tabla[i]
+        
+        cuarto, tres_cuartos = (t[i] for t in self.tramos[variable])
+        fraccion = (valor - eje[i]) / (eje[i + 1] - eje[i])
+        return cuarto + (tres_cuartos - cuarto) * (fraccion - 0.25) * 2.0
+    
+    def puntajes(self, temperatura, humedad, mes):
+        """
+        Puntajes de todos los cultivos para unas condiciones
+        
+        Args:
+            temperatura (float): Temperatura en grados C
+            humedad (float): Humedad relativa en porcentaje
+            mes (int | str): Mes 1-12 o nombre del mes en español
+            
+        Returns:
+            numpy.ndarray: Puntajes en el orden de self.claves (0 a 100)
+        """
+        if isinstance(mes, str):
+            if mes.lower() not in ConfiguracionSistema.MESES:
+                raise ValueError(f"Mes desconocido: {mes}")
+            mes = ConfiguracionSistema.MESES.index(mes.lower()) + 1
+        elif mes != int(mes) or not 1 <= mes <= 12:
+            raise ValueError(f"Mes fuera de rango (1-12): {mes}")
+        
+        valores = {'temperatura': temperatura, 'humedad': humedad, 'mes': int(mes)}
+        puntaje = float(ConfiguracionSistema.PUNTAJE_MAXIMO)
+        for variable in self.tablas:
+            puntaje = puntaje - self._interpolar(variable, valores[variable])
+        return np.maximum(puntaje, 0.0)
+    
+    def puntaje(self, cultivo, temperatura, humedad, mes):
+        """Puntaje de un solo cultivo"""
+        return float(self.puntajes(temperatura, humedad, mes)[self.indices[cultivo]])
+    
+    def mejores_cultivos(self, temperatura, humedad, mes, k=5):
+        """
+        Ranking de los k cultivos con mayor puntaje
+        
+        Solo compara numeros: la seleccion es O(n log k) sobre los puntajes y
+        no construye evaluaciones. Los empates conservan el orden del catalogo,
+        igual que el ordenamiento completo de recomendar_cultivos.
+        
+        Args:
+            temperatura (float): Temperatura en grados C
+            humedad (float): Humedad relativa en porcentaje
+            mes (int | str): Mes 1-12 o nombre del mes en español
+            k (int): Numero de cultivos a retornar
+            
+        Returns:
+            list: Tuplas (clave_cultivo, puntaje) de mejor a peor
+        """
+        # Redondear elimina el ruido de la interpolacion para que los empates sean exactos
+        puntajes = np.round(self.puntajes(temperatura, humedad, mes), 6).tolist()
+        indices = heapq.nlargest(k, range(len(puntajes)), key=puntajes.__getitem__)
+        return [(self.claves[i], puntajes[i]) for i in indices]
+    
+    def memoria_bytes(self):
+        """
+        Reporta el tamaño en memoria de la tabla
+        
+        Returns:
+            dict: Bytes por componente, total y lo que ocuparia la rejilla densa
+        """
+        componentes = {variable: tabla.nbytes + sum(t.nbytes for t in self.tramos.get(variable, ()))
+                       for variable, tabla in self.tablas.items()}
+        n_cultivos = len(self.claves)
+        puntos = 1
+        for eje in self.ejes.values():
+            puntos *= len(eje)
+        itemsize = np.dtype(float).itemsize
+        return {
+            'componentes': componentes,
+            'total': sum(componentes.values()),
+            'rejilla_densa_equivalente': n_cultivos * puntos * itemsize,
+            'cultivos': n_cultivos,
+            'puntos_rejilla': puntos,
+        }
+
+
+_tabla_actual = None
+
+
+def obtener_tabla_idoneidad():
+    """
+    Retorna la tabla compartida, reconstruyendola si cambio el catalogo
+    
+    Returns:
+        TablaIdoneidad: Tabla para la version actual del catalogo
+    """
+    global _tabla_actual
+    if _tabla_actual is None:
+        _tabla_actual = TablaIdoneidad()
+    return _tabla_actual.vigente()
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    tabla = obtener_tabla_idoneidad()
+    memoria = tabla.memoria_bytes()
+    
+    print("=== TABLA DE IDONEIDAD PRECALCULADA ===")
+    print(f"Version del catalogo: {tabla.version}")
+    print(f"Cultivos: {memoria['cultivos']}")
+    print(f"Puntos de rejilla: {memoria['puntos_rejilla']}")
+    print(f"Memoria usada: {memoria['total'] / 1024:.1f} KB "
+          f"(rejilla densa: {memoria['rejilla_densa_equivalente'] / 1024 / 1024:.1f} MB)")
+    
+    print("\nPuntajes para 29.9C, 73% humedad en octubre:")
+    for clave, valor in zip(tabla.claves, tabla.puntajes(29.9, 73, 'octubre')):
+        print(f"  - {clave}: {valor:.1f}")
@@ -0,0 +1,219 @@
+# ventanas_siembra.py
+"""
+Optimizador de fechas de siembra
+Desliza el ciclo de cada cultivo (duracion_dias) sobre la climatologia diaria
+de cada ciudad y puntua todas las fechas posibles con sumas acumuladas
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from base_datos_cultivos import obtener_arreglos_cultivos
+from config import ConfiguracionSistema
+
+
+DIAS_AÑO = 365
+
+
+def climatologia_desde_dataframe(df):
+    """
+    Convierte una tabla de climatologia diaria en arreglos ciudades x 365
+    
+    Args:
+        df (DataFrame): Columnas ciudad, dia_año (1-366), precipitacion (mm/dia)
+                        y temperatura (media diaria en grados C)
+    
+    Returns:
+        dict: 'ciudades', 'precipitacion' y 'temperatura' (ciudades x 365).
+              Los dias faltantes se interpolan y el dia 366 se descarta.
+    """
+    df = df[df['dia_año'] <= DIAS_AÑO]
+    ciudades = sorted(df['ciudad'].unique())
+    dias = pd.RangeIndex(1, DIAS_AÑO + 1)
+    
+    arreglos = {'ciudades': ciudades}
+    for variable in ['precipitacion', 'temperatura']:
+        tabla = (df.pivot_table(index='dia_año', columns='ciudad', values=variable, aggfunc='mean')
+                 .reindex(index=dias, columns=ciudades)
+                 .interpolate(limit_direction='both'))
+        arreglos[variable] = tabla.to_numpy(dtype=float).T
+    
+    return arreglos
+
+
+def sumas_ciclo(serie_anual, duraciones):
+    """
+    Suma de una serie diaria sobre el ciclo de cada cultivo, para cada fecha de siembra
+    
+    Usa sumas acumuladas sobre el año repetido, por lo que el costo es O(dias)
+    por ciudad y cultivo, sin importar la duracion del ciclo. Los ciclos de
+    mas de un año suman años completos mas el resto.
+    
+    Args:
+        serie_anual (ndarray): Valores diarios, ciudades x 365
+        duraciones (ndarray): Duracion del ciclo de cada cultivo en dias
+    
+    Returns:
+        ndarray: Sumas ciudades x cultivos x 365 (indice = dia de siembra)
+    """
+    serie_anual = np.atleast_2d(np.asarray(serie_anual, dtype=float))
+    duraciones = np.asarray(duraciones, dtype=int)
+    años_completos, resto = np.divmod(duraciones, DIAS_AÑO)
+    
+    # Año repetido para que las ventanas crucen diciembre -> enero
+    serie_doble = np.concatenate([serie_anual, serie_anual], axis=1)
+    acumulada = np.concatenate(
+        [np.zeros((serie_anual.shape[0], 1)), np.cumsum(serie_doble, axis=1)], axis=1
+    )
+    
+    inicio = np.arange(DIAS_AÑO)
+    fin = inicio[np.newaxis, :] + resto[:, np.newaxis]  # cultivos x 365
+    
+    parcial = acumulada[:, fin] - acumulada[:, inicio][:, np.newaxis, :]
+    total_anual = serie_anual.sum(axis=1)[:, np.newaxis, np.newaxis]
+    
+    return parcial + años_completos[np.newaxis, :, np.newaxis] * total_anual
+
+
+def puntaje_agua(lluvia, minima, optima, maxima):
+    """
+    Puntaje 0-100 de la lluvia del ciclo respecto a los limites del cultivo
+    
+    100 en el optimo, 50 en el minimo o maximo y 0 a la misma distancia
+    fuera del rango.
+    """
+    debajo = 50 + 50 * (lluvia - minima) / np.maximum(optima - minima, 1e-9)
+    encima = 100 - 50 * (lluvia - optima) / np.maximum(maxima - optima, 1e-9)
+    return np.clip(np.where(lluvia <= optima, debajo, encima), 0, 100)
+
+
+def puntaje_temperatura(temperatura, minima, maxima):
+    """
+    Puntaje 0-100 de la temperatura media del ciclo, con las mismas
+    penalizaciones por grado que la evaluacion del clima actual
+    """
+    config = ConfiguracionSistema
+    penalizacion = (np.maximum(minima - temperatura, 0) * config.PENALIZACION_TEMPERATURA
+                    + np.maximum(temperatura - maxima, 0) * config.PENALIZACION_TEMPERATURA_ALTA)
+    return np.clip(config.PUNTAJE_MAXIMO - penalizacion, 0, 100)
+
+
+def optimizar_siembra(climatologia, cultivos=None, solo_temporada=False):
+    """
+    Puntua cada dia del año como fecha de siembra para cada ciudad y cultivo
+    
+    Args:
+        climatologia (dict): Resultado de climatologia_desde_dataframe
+        cultivos (list): Claves de cultivos (por defecto todo el catalogo)
+        solo_temporada (bool): Anula las fechas fuera de temporada_siembra
+    
+    Returns:
+        dict: 'ciudades', 'cultivos', 'puntajes', 'lluvia_ciclo' y
+              'temperatura_ciclo' (arreglos ciudades x cultivos x 365)
+    """
+    config = ConfiguracionSistema
+    arreglos = obtener_arreglos_cultivos()
+    
+    if cultivos is None:
+        cultivos = arreglos['claves']
+    indices = np.array([arreglos['claves'].index(c) for c in cultivos], dtype=int)
+    
+    def columna(campo):
+        return arreglos[campo][indices][np.newaxis, :, np.newaxis]
+    
+    duraciones = arreglos['duracion_dias'][indices].astype(int)
+    
+    lluvia = sumas_ciclo(climatologia['precipitacion'], duraciones)
+    temperatura = sumas_ciclo(climatologia['temperatura'], duraciones) / columna('duracion_dias')
+    
+    agua = puntaje_agua(lluvia, columna('precipitacion_min'), columna('precipitacion_optima'),
+                        columna('precipitacion_max'))
+    calor = puntaje_temperatura(temperatura, columna('temp_minima'), columna('temp_maxima'))
+    
+    puntajes = config.PESO_AGUA_SIEMBRA * agua + (1 - config.PESO_AGUA_SIEMBRA) * calor
+    
+    if solo_temporada:
+        mes_de_dia = np.array([(datetime(2025, 1, 1) + timedelta(days=int(d))).month - 1
+                               for d in range(DIAS_AÑO)])
+        en_temporada = arreglos['mascara_meses'][indices][:, mes_de_dia]
+        puntajes = np.where(en_temporada[np.newaxis, :, :], puntajes, 0.0)
+    
+    return {
+        'ciudades': list(climatologia['ciudades']),
+        'cultivos': list(cultivos),
+        'puntajes': puntajes,
+        'lluvia_ciclo': lluvia,
+        'temperatura_ciclo': temperatura
+    }
+
+
+def dia_a_fecha(dia):
+    """Convierte un indice de dia (0 = 1 de enero) en 'dd de mes'"""
+    fecha = datetime(2025, 1, 1) + timedelta(days=int(dia))
+    return f"{fecha.day} de {ConfiguracionSistema.MESES[fecha.month - 1]}"
+
+
+def mejores_fechas(resultado, n=3):
+    """
+    Las n mejores fechas de siembra por ciudad y cultivo
+    
+    Args:
+        resultado (dict): Salida de optimizar_siembra
+        n (int): Fechas por ciudad y cultivo
+    
+    Returns:
+        DataFrame: ciudad, cultivo, posicion, dia_año, fecha, puntaje,
+                   lluvia_ciclo y temperatura_ciclo
+    """
+    puntajes = resultado['puntajes']
+    n = min(n, puntajes.shape[2])
+    
+    # Seleccion parcial O(dias) y orden solo de los n ganadores
+    candidatos = np.argpartition(-puntajes, n - 1, axis=2)[:, :, :n]
+    valores = np.take_along_axis(puntajes, candidatos, axis=2)
+    orden = np.argsort(-valores, axis=2, kind='stable')
+    mejores = np.take_along_axis(candidatos, orden, axis=2)
+    
+    filas = []
+    for i, ciudad in enumerate(resultado['ciudades']):
+        for j, cultivo in enumerate(resultado['cultivos']):
+            for posicion, dia in enumerate(mejores[i, j], 1):
+                filas.append({
+                    'ciudad': ciudad,
+                    'cultivo': cultivo,
+                    'posicion': posicion,
+                    'dia_año': int(dia) + 1,
+                    'fecha': dia_a_fecha(dia),
+                    'puntaje': round(float(puntajes[i, j, dia]), 1),
+                    'lluvia_ciclo': round(float(resultado['lluvia_ciclo'][i, j, dia]), 1),
+                    'temperatura_ciclo': round(float(resultado['temperatura_ciclo'][i, j, dia]), 1)
+                })
+    
+    return pd.DataFrame(filas)
+
+
+# Ejemplo de uso
+if __name__ == "__main__":
+    import time
+    
+    # Climatologia sintetica: estacion seca dic-abr, lluviosa may-nov
+    dias = np.arange(DIAS_AÑO)
+    ciudades = ConfiguracionSistema.CIUDADES_PANAMA
+    lluvia_base = 2 + 8 * (np.sin((dias - 100) / DIAS_AÑO * 2 * np.pi) > 0)
+    climatologia = {
+        'ciudades': ciudades,
+        'precipitacion': np.tile(lluvia_base, (len(ciudades), 1)) * np.linspace(0.7, 1.3, len(ciudades))[:, None],
+        'temperatura': 27 + 1.5 * np.cos((dias - 90) / DIAS_AÑO * 2 * np.pi) + np.zeros((len(ciudades), 1))
+    }
+    
+    inicio = time.perf_counter()
+    resultado = optimizar_siembra(climatologia)
+    tabla = mejores_fechas(resultado, n=1)
+    duracion = time.perf_counter() - inicio
+    
+    print("=== MEJORES FECHAS DE SIEMBRA ===")
+    print(tabla[tabla['ciudad'] == ciudades[0]].to_string(index=False))
+    print(f"\nCalculado para {len(ciudades)} ciudades y {len(resultado['cultivos'])} cultivos "
+          f"en {duracion * 1000:.1f} ms")